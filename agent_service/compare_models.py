@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from itertools import zip_longest
+
+from langchain.schema import HumanMessage, SystemMessage
+from agent_service.config import (
+    INTENT_ROUTER_EXAMPLES, ORCHESTRATOR_HISTORY_TOKENS, SYNTHESIZER_HISTORY_TOKENS, SYNTHESIZER_SUBAGENT_TOKENS,
+)
+from agent_service.llm import NODE_MODELS, ModelSpec, LLMUsageCallback, build_llm
+from agent_service.prompts import ORCHESTRATOR_PROMPT, SYNTHESIZER_PROMPT
+from agent_service.state import OrchestratorOutput, SynthesizerOutput
+from agent_service.utils.history import format_history
+from agent_service.utils.subagent_format import serialize_subagent_outputs
+
+# Synthesizer samples: (query, subagent outputs) as the graph would hand them over
+SYNTHESIZER_SAMPLES = [
+    ("do you have veg pizza", [{"type": "menu", "parameters": {"search": "pizza", "type": "veg"}, "output": [
+        {"name": "Margherita Pizza", "category_name": "Pizza", "description": "Tomato, mozzarella, basil",
+         "variations": [{"label": "Regular", "final_price": 650}, {"label": "Large", "final_price": 900}]},
+        {"name": "Garden Veggie Pizza", "category_name": "Pizza", "description": "Peppers, olives, mushrooms",
+         "variations": [{"label": "Regular", "final_price": 720}]}]}]),
+    ("what are your opening hours", [{"type": "info", "parameters": {"topic": "opening hours"}, "output": [
+        {"topic": "Opening hours",
+         "content": "Monday–Friday 11:00 AM to 10:00 PM, Saturday–Sunday 10:00 AM to 11:00 PM."}]}]),
+    ("anything spicy under 500", [{"type": "menu", "parameters": {"search": "spicy", "price_max": 500}, "output": []}]),
+    ("can I book a table for 6 tonight", [{"type": "chitchat", "parameters": {}, "output": None}]),
+]
+
+
+def orchestrator_cases(limit: int):
+    """Labelled queries from the intent router's examples; the label is the expected type."""
+    with open(INTENT_ROUTER_EXAMPLES, encoding="utf-8") as f:
+        examples = json.load(f)
+    # Interleave intents so a small limit still covers all of them
+    rounds = zip_longest(*([(query, label) for query in queries] for label, queries in examples.items()))
+    cases = [case for round_ in rounds for case in round_ if case is not None]
+    return cases[:limit]
+
+
+def synthesizer_cases(limit: int):
+    return [(query, outputs) for query, outputs in SYNTHESIZER_SAMPLES][:limit]
+
+
+async def run_case(node: str, model, query, expected):
+    # Same prompt rendering as the graph nodes, for a first turn without history
+    if node == "orchestrator":
+        history = format_history([], "", ORCHESTRATOR_HISTORY_TOKENS)
+        messages = [SystemMessage(content=ORCHESTRATOR_PROMPT),
+                    HumanMessage(content=f"Chat history:\n{history}\nUser query: {query}")]
+        parsed: OrchestratorOutput = await model.ainvoke(messages)
+        types = [item.type for item in parsed.query_types]
+        return expected in types, ",".join(types)
+
+    history = format_history([], "", SYNTHESIZER_HISTORY_TOKENS)
+    subagent_str, _ = serialize_subagent_outputs(expected, SYNTHESIZER_SUBAGENT_TOKENS)
+    messages = [SystemMessage(content=SYNTHESIZER_PROMPT),
+                HumanMessage(content=f"Chat history:\n{history}\nUser query: {query}\nSubagent outputs:\n{subagent_str}")]
+    parsed: SynthesizerOutput = await model.ainvoke(messages)
+    return None, parsed.final_answer
+
+
+async def compare(node: str, spec: ModelSpec, cases, concurrency: int):
+    usage = LLMUsageCallback(f"compare.{node}", spec, keep_records=True)
+    schema = OrchestratorOutput if node == "orchestrator" else SynthesizerOutput
+    kwargs = {"method": spec.structured_method} if spec.structured_method else {}
+    model = build_llm(spec, callbacks=[usage]).with_structured_output(schema, **kwargs)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(query, expected):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                correct, output = await run_case(node, model, query, expected)
+            except Exception as e:
+                results.append({"query": query, "error": str(e)})
+                return
+            results.append({"query": query, "correct": correct, "output": output,
+                            "latency": time.perf_counter() - started})
+
+    await asyncio.gather(*(one(query, expected) for query, expected in cases))
+    return results, usage.records
+
+
+def summarize(spec: ModelSpec, results, records):
+    ok = [r for r in results if "error" not in r]
+    latencies = sorted(r["latency"] for r in ok)
+    scored = [r for r in ok if r["correct"] is not None]
+
+    def pct(q):
+        return 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+    return {
+        "model": spec.label,
+        "calls": len(results),
+        "errors": len(results) - len(ok),
+        "p50_ms": round(pct(0.5)),
+        "p95_ms": round(pct(0.95)),
+        "avg_in_tokens": round(statistics.mean(r["input_tokens"] for r in records)) if records else 0,
+        "avg_out_tokens": round(statistics.mean(r["output_tokens"] for r in records)) if records else 0,
+        "usd_per_1k_turns": round(1000 * statistics.mean(r["cost"] for r in records), 4) if records else 0.0,
+        "accuracy": f"{sum(r['correct'] for r in scored) / len(scored):.1%}" if scored else "-",
+    }
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(row[c])) for row in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+async def main(args):
+    base = NODE_MODELS[args.node]
+    candidates = [base] + [ModelSpec.parse(text, base) for text in args.candidates]
+    cases = orchestrator_cases(args.limit) if args.node == "orchestrator" else synthesizer_cases(args.limit)
+    print(f"Comparing {len(candidates)} model(s) on {len(cases)} {args.node} calls each "
+          f"(the first row is the current configuration)\n")
+
+    rows = []
+    for spec in candidates:
+        results, records = await compare(args.node, spec, cases, args.concurrency)
+        rows.append(summarize(spec, results, records))
+        if args.verbose:
+            for r in results:
+                print(f"[{spec.label}] {r['query']!r} -> {r.get('output', r.get('error'))}")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare latency, cost and (for the orchestrator) accuracy of candidate models for a graph node.",
+        epilog="Example: python -m agent_service.compare_models orchestrator "
+               "google:gemini-2.5-flash-lite openai:qwen2.5-7b-instruct@http://localhost:8000/v1",
+    )
+    parser.add_argument("node", choices=sorted(NODE_MODELS))
+    parser.add_argument("candidates", nargs="*", help='Models to compare against the configured one, as "provider:model[@base_url]".')
+    parser.add_argument("--limit", type=int, default=40, help="Number of sample calls per model.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--verbose", action="store_true", help="Print every output.")
+    asyncio.run(main(parser.parse_args()))
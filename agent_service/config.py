@@ -9,7 +9,159 @@ REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_USERNAME = os.getenv("REDIS_USERNAME", None)
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+# Connection pool size of each async Redis client, per event loop
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
 
 # Chat settings
 CHAT_TTL_SECONDS = int(os.getenv("CHAT_TTL_SECONDS", 3600))
-CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", 10))
\ No newline at end of file
+CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", 10))
+# Chat store backend: "redis" (shared by all processes) or "memory" (in-process LRU of
+# at most CHAT_MEMORY_MAX_CONVERSATIONS, for single-node deployments, benchmarks and tests)
+CHAT_STORE = os.getenv("CHAT_STORE", "redis").lower()
+CHAT_MEMORY_MAX_CONVERSATIONS = int(os.getenv("CHAT_MEMORY_MAX_CONVERSATIONS", 100000))
+
+# Shared HTTP client pool (backend calls from subagents)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+
+# Messenger webhook worker pool
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 32))
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", 1000))
+
+# Meta Graph API
+GRAPH_API_URL = os.getenv("GRAPH_API_URL", "https://graph.facebook.com/v19.0")
+
+# Webhook deduplication (Meta redeliveries keyed on message.mid)
+DEDUP_TTL_SECONDS = int(os.getenv("DEDUP_TTL_SECONDS", 600))
+# Upper bound on each Redis dedup call: it runs before the webhook ack, so a slow or
+# unreachable Redis falls back to the per-process marks instead of delaying the ack
+DEDUP_REDIS_TIMEOUT_SECONDS = float(os.getenv("DEDUP_REDIS_TIMEOUT_SECONDS", 0.1))
+# Share the marks between processes through Redis; off by default with the in-memory chat store
+DEDUP_REDIS = os.getenv("DEDUP_REDIS", "true" if CHAT_STORE == "redis" else "false").lower() in ("true", "1", "t")
+
+# Per-sender debounce: messages arriving within the window are merged into one turn (0 disables)
+DEBOUNCE_WINDOW_MS = int(os.getenv("DEBOUNCE_WINDOW_MS", 1000))
+DEBOUNCE_MAX_WAIT_MS = int(os.getenv("DEBOUNCE_MAX_WAIT_MS", 4000))
+
+# Messenger profile lookups (first/last name); failures are cached for a shorter time
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", 86400))
+PROFILE_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_NEGATIVE_TTL_SECONDS", 60))
+PROFILE_CACHE_MAXSIZE = int(os.getenv("PROFILE_CACHE_MAXSIZE", 10000))
+PROFILE_CACHE_REDIS = os.getenv("PROFILE_CACHE_REDIS", "false").lower() in ("true", "1", "t")
+
+# Outbound Send API: per-page token bucket; messages are retried with jittered backoff only
+# when provably not accepted (connect errors, 429/503)
+SEND_RATE_PER_SECOND = float(os.getenv("SEND_RATE_PER_SECOND", 50))
+SEND_BURST = int(os.getenv("SEND_BURST", 50))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", 4))
+SEND_BACKOFF_BASE_SECONDS = float(os.getenv("SEND_BACKOFF_BASE_SECONDS", 0.5))
+SEND_BACKOFF_MAX_SECONDS = float(os.getenv("SEND_BACKOFF_MAX_SECONDS", 8))
+SEND_TIMEOUT_SECONDS = float(os.getenv("SEND_TIMEOUT_SECONDS", 10))
+SEND_MAX_CONNECTIONS = int(os.getenv("SEND_MAX_CONNECTIONS", 50))
+
+# Stream the synthesizer's answer to Messenger sentence by sentence
+SYNTHESIZER_STREAMING = os.getenv("SYNTHESIZER_STREAMING", "false").lower() in ("true", "1", "t")
+STREAM_MIN_CHUNK_CHARS = int(os.getenv("STREAM_MIN_CHUNK_CHARS", 80))
+
+# Ingress mode: "inline" runs turns inside the webhook process, "stream" only
+# appends events to Redis Streams for `python -m agent_service.worker` processes
+INGRESS_MODE = os.getenv("INGRESS_MODE", "inline")
+STREAM_PREFIX = os.getenv("STREAM_PREFIX", "inbound")
+STREAM_PARTITIONS = int(os.getenv("STREAM_PARTITIONS", 8))
+STREAM_GROUP = os.getenv("STREAM_GROUP", "agent-workers")
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", 100000))
+STREAM_READ_COUNT = int(os.getenv("STREAM_READ_COUNT", 32))
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", 2000))
+STREAM_CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", 60000))
+
+# Orchestrator classification cache (in-process LRU + Redis). Follow-ups that
+# depend on earlier turns bypass it unless ORCHESTRATOR_CACHE_BYPASS_FOLLOWUPS
+# is off, in which case they are keyed on the last few messages too
+ORCHESTRATOR_CACHE_ENABLED = os.getenv("ORCHESTRATOR_CACHE_ENABLED", "true").lower() in ("true", "1", "t")
+ORCHESTRATOR_CACHE_TTL_SECONDS = int(os.getenv("ORCHESTRATOR_CACHE_TTL_SECONDS", 86400))
+ORCHESTRATOR_CACHE_MAXSIZE = int(os.getenv("ORCHESTRATOR_CACHE_MAXSIZE", 5000))
+# Off by default with the in-memory chat store, so a single node runs without Redis
+ORCHESTRATOR_CACHE_REDIS = os.getenv(
+    "ORCHESTRATOR_CACHE_REDIS", "true" if CHAT_STORE == "redis" else "false"
+).lower() in ("true", "1", "t")
+ORCHESTRATOR_CACHE_BYPASS_FOLLOWUPS = os.getenv("ORCHESTRATOR_CACHE_BYPASS_FOLLOWUPS", "true").lower() in ("true", "1", "t")
+ORCHESTRATOR_CACHE_CONTEXT_MESSAGES = int(os.getenv("ORCHESTRATOR_CACHE_CONTEXT_MESSAGES", 2))
+
+# Embedding fast-path intent router ahead of the LLM orchestrator (needs sentence-transformers).
+# Off until the threshold is calibrated: pick INTENT_ROUTER_THRESHOLD from
+# `python -m agent_service.utils.intent_router` first. A share of routed turns is
+# re-checked by the LLM in the background to export live accuracy
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "false").lower() in ("true", "1", "t")
+INTENT_ROUTER_MODEL = os.getenv("INTENT_ROUTER_MODEL", "all-MiniLM-L6-v2")
+INTENT_ROUTER_EXAMPLES = os.getenv(
+    "INTENT_ROUTER_EXAMPLES", os.path.join(os.path.dirname(__file__), "data", "intent_examples.json")
+)
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", 0.55))
+INTENT_ROUTER_MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", 0.08))
+INTENT_ROUTER_SHADOW_RATE = float(os.getenv("INTENT_ROUTER_SHADOW_RATE", 0.05))
+
+# Speculative retrieval: start menu and knowledge base searches on the raw query
+# while the orchestrator runs; agents reuse them when the extracted parameters match
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() in ("true", "1", "t")
+
+# Hedged LLM requests (opt-in per node, e.g. "orchestrator,synthesizer"): a second request
+# is sent once the first is slower than the recent HEDGE_PERCENTILE latency. Only structured
+# (non-streaming) calls are hedged; the streaming synthesizer answer is not
+HEDGE_NODES = [n.strip() for n in os.getenv("HEDGE_NODES", "").split(",") if n.strip()]
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+HEDGE_DEFAULT_DELAY_MS = float(os.getenv("HEDGE_DEFAULT_DELAY_MS", 3000))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", 300))
+HEDGE_MAX_DELAY_MS = float(os.getenv("HEDGE_MAX_DELAY_MS", 8000))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+HEDGE_MAX_FRACTION = float(os.getenv("HEDGE_MAX_FRACTION", 0.1))
+
+# Latency budget: once a turn has used TURN_LATENCY_BUDGET_SECONDS (or the synthesizer call
+# exceeds SYNTHESIZER_TIMEOUT_SECONDS) the reply is templated from the retrieval results
+TURN_LATENCY_BUDGET_SECONDS = float(os.getenv("TURN_LATENCY_BUDGET_SECONDS", 12))
+SYNTHESIZER_TIMEOUT_SECONDS = float(os.getenv("SYNTHESIZER_TIMEOUT_SECONDS", 8))
+SYNTHESIZER_MIN_BUDGET_SECONDS = float(os.getenv("SYNTHESIZER_MIN_BUDGET_SECONDS", 0.5))
+DEGRADED_MENU_ITEMS = int(os.getenv("DEGRADED_MENU_ITEMS", 5))
+
+# Rolling conversation summary: once a chat history reaches HISTORY_SUMMARY_TRIGGER messages
+# (keep it below CHAT_MAX_MESSAGES, which still trims unsummarized history),
+# everything but the last HISTORY_VERBATIM_MESSAGES is folded into a summary in the background.
+# Each node renders summary + recent messages within its own token budget
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() in ("true", "1", "t")
+HISTORY_VERBATIM_MESSAGES = int(os.getenv("HISTORY_VERBATIM_MESSAGES", 4))
+HISTORY_SUMMARY_TRIGGER = int(os.getenv("HISTORY_SUMMARY_TRIGGER", 8))
+HISTORY_SUMMARY_TIMEOUT_SECONDS = float(os.getenv("HISTORY_SUMMARY_TIMEOUT_SECONDS", 20))
+HISTORY_MESSAGE_MAX_CHARS = int(os.getenv("HISTORY_MESSAGE_MAX_CHARS", 600))
+ORCHESTRATOR_HISTORY_TOKENS = int(os.getenv("ORCHESTRATOR_HISTORY_TOKENS", 400))
+SYNTHESIZER_HISTORY_TOKENS = int(os.getenv("SYNTHESIZER_HISTORY_TOKENS", 800))
+
+# Compact serialization of subagent outputs for the synthesizer prompt: results are
+# rendered one line each and the lowest-ranked are dropped first to stay within budget
+SYNTHESIZER_SUBAGENT_TOKENS = int(os.getenv("SYNTHESIZER_SUBAGENT_TOKENS", 1200))
+SUBAGENT_TEXT_MAX_CHARS = int(os.getenv("SUBAGENT_TEXT_MAX_CHARS", 320))
+MENU_DESCRIPTION_MAX_CHARS = int(os.getenv("MENU_DESCRIPTION_MAX_CHARS", 90))
+
+# Previous-turn results: each turn's menu/info results are stored compactly next to the
+# chat history, and follow-ups that refer to them ("which of those is veg?") are
+# answered by filtering that set locally instead of querying the backend again
+TURN_RESULTS_ENABLED = os.getenv("TURN_RESULTS_ENABLED", "true").lower() in ("true", "1", "t")
+TURN_RESULTS_MAX_ITEMS = int(os.getenv("TURN_RESULTS_MAX_ITEMS", 30))
+
+# Semantic answer cache: standalone knowledge base questions whose embedding (intent
+# router model, so it needs INTENT_ROUTER_ENABLED) is at least ANSWER_CACHE_THRESHOLD similar to an earlier one get that
+# earlier answer directly. Entries are tied to the KB content version, re-checked with
+# the backend at most every ANSWER_CACHE_VERSION_TTL_SECONDS. Only queries about a known
+# KB topic are looked up, and a hit also needs the same topic and entities (days, amounts...)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() in ("true", "1", "t")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", 500))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 6 * 3600))
+ANSWER_CACHE_VERSION_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_VERSION_TTL_SECONDS", 5))
+
+# Chat history storage format: "json" (default) or "msgpack" (role codes, zlib-compressed
+# from CHAT_COMPRESS_MIN_BYTES; needs ormsgpack). Both formats are always readable, so
+# switching needs no migration: existing entries age out with the history trim and TTL.
+# Size Redis with `python -m agent_service.utils.memory_report`
+CHAT_ENCODING = os.getenv("CHAT_ENCODING", "json").lower()
+CHAT_COMPRESS_MIN_BYTES = int(os.getenv("CHAT_COMPRESS_MIN_BYTES", 256))
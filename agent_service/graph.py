@@ -1,5 +1,5 @@
 from langgraph.graph import StateGraph, START, END
-from agent_service.nodes import orchestrator_node, menu_agent, info_agent, synthesizer_node, escalation_agent
+from agent_service.nodes import orchestrator_node, menu_agent, info_agent, synthesizer_node, escalation_agent, direct_responder
 from agent_service.state import State
 from agent_service.utils.assign_subagents import assign_subagents
 
@@ -15,19 +15,22 @@ def build_graph():
     workflow_builder.add_node("info_agent", info_agent)
     workflow_builder.add_node("escalation_agent", escalation_agent)
     workflow_builder.add_node("synthesizer", synthesizer_node)
+    workflow_builder.add_node("direct_responder", direct_responder)
 
     # Start edge
     workflow_builder.add_edge(START, "orchestrator")
 
-    workflow_builder.add_conditional_edges("orchestrator", assign_subagents, ["menu_agent", "info_agent", "escalation_agent"])
+    workflow_builder.add_conditional_edges("orchestrator", assign_subagents, ["menu_agent", "info_agent", "escalation_agent", "synthesizer", "direct_responder"])
 
     # Collect subagent outputs and send to synthesizer
     workflow_builder.add_edge("menu_agent", "synthesizer")
     workflow_builder.add_edge("info_agent", "synthesizer")
     workflow_builder.add_edge("escalation_agent", "synthesizer")
 
-    # End edge
+    # End edges
     workflow_builder.add_edge("synthesizer", END)
+    # Ambiguous/chitchat-only turns are answered without the synthesizer
+    workflow_builder.add_edge("direct_responder", END)
 
     return workflow_builder.compile()
 
@@ -1,25 +1,203 @@
 import os
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_openai import ChatOpenAI
 load_dotenv()
 
-# comment this for openroueter llm and uncomment for google gemini llm
 from langchain_google_genai import ChatGoogleGenerativeAI
+from agent_service.config import HEDGE_NODES
+from agent_service.utils.hedging import HedgedRunnable
+from agent_service.utils.metrics import metrics
 
+# USD per 1M input / output tokens, used for cost reporting only.
+# Override per node with <NODE>_LLM_INPUT_COST / <NODE>_LLM_OUTPUT_COST.
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
 
-# for google gemini llm
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    # This is important for compatibility with LangGraph's SystemMessages
-    convert_system_message_to_human=True 
-)
-
-# llm = ChatOpenAI(
-#     api_key=os.getenv("OPENROUTER_API_KEY"),
-#     base_url="https://openrouter.ai/api/v1",
-#     model=os.getenv("MODEL"),
-#     max_completion_tokens=500,
-#     temperature=0  # optional, make deterministic
-# )
-# llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, convert_system_message_to_human=True)
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    Which model a graph node runs on. provider is "google" (Gemini) or "openai",
+    which also covers OpenRouter and local OpenAI-compatible servers via base_url.
+    """
+    provider: str = "google"
+    model: str = "gemini-2.5-flash"
+    temperature: float = 0
+    max_tokens: Optional[int] = None
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    # with_structured_output method, e.g. "function_calling" for servers without json_schema support
+    structured_method: Optional[str] = None
+    input_cost: Optional[float] = None
+    output_cost: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}:{self.model}" + (f"@{self.base_url}" if self.base_url else "")
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        default_in, default_out = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        input_cost = default_in if self.input_cost is None else self.input_cost
+        output_cost = default_out if self.output_cost is None else self.output_cost
+        return (input_tokens * input_cost + output_tokens * output_cost) / 1_000_000
+
+    @classmethod
+    def parse(cls, text: str, base: Optional["ModelSpec"] = None) -> "ModelSpec":
+        """Parses "provider:model[@base_url]", keeping the other settings of `base`."""
+        provider, _, rest = text.partition(":")
+        model, _, base_url = rest.partition("@")
+        return replace(base or cls(), provider=provider, model=model, base_url=base_url or None,
+                       input_cost=None, output_cost=None)
+
+
+def _optional(cast, value):
+    return cast(value) if value not in (None, "") else None
+
+
+def spec_from_env(node: str) -> ModelSpec:
+    """
+    Model settings for one node: <NODE>_LLM_<SETTING>, falling back to LLM_<SETTING>,
+    e.g. ORCHESTRATOR_LLM_MODEL=gemini-2.5-flash-lite or LLM_PROVIDER=openai.
+    """
+    def setting(name, default=None):
+        return os.getenv(f"{node.upper()}_LLM_{name}", os.getenv(f"LLM_{name}", default))
+
+    provider = setting("PROVIDER", "google")
+    # Keeps the earlier OpenRouter setup (OPENROUTER_API_KEY / MODEL) working for provider=openai
+    default_model = "gemini-2.5-flash" if provider == "google" else os.getenv("MODEL", "gpt-4o-mini")
+    default_key = None if provider == "google" else os.getenv("OPENROUTER_API_KEY")
+    default_url = None if provider == "google" or not default_key else "https://openrouter.ai/api/v1"
+    return ModelSpec(
+        provider=provider,
+        model=setting("MODEL", default_model),
+        temperature=float(setting("TEMPERATURE", 0)),
+        max_tokens=_optional(int, setting("MAX_TOKENS")),
+        base_url=setting("BASE_URL", default_url),
+        api_key=setting("API_KEY", default_key),
+        structured_method=setting("STRUCTURED_METHOD"),
+        input_cost=_optional(float, setting("INPUT_COST")),
+        output_cost=_optional(float, setting("OUTPUT_COST")),
+    )
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    Records latency, token usage and estimated cost of every call made by one
+    node's model, as llm.<node>.* metrics and in `records` for comparisons.
+    """
+    run_inline = True
+
+    def __init__(self, node: str, spec: ModelSpec, keep_records: bool = False):
+        self.node = node
+        self.spec = spec
+        self.keep_records = keep_records
+        self.records: List[Dict] = []
+        self._started: Dict = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        latency = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        cost = self.spec.cost(input_tokens, output_tokens)
+
+        prefix = f"llm.{self.node}"
+        metrics.incr(f"{prefix}.calls")
+        metrics.observe(f"{prefix}.latency", latency)
+        metrics.incr(f"{prefix}.input_tokens", input_tokens)
+        metrics.incr(f"{prefix}.output_tokens", output_tokens)
+        metrics.incr(f"{prefix}.cost_micro_usd", round(cost * 1_000_000))
+        if self.keep_records:
+            self.records.append({"latency": latency, "input_tokens": input_tokens,
+                                 "output_tokens": output_tokens, "cost": cost})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+        metrics.incr(f"llm.{self.node}.errors")
+
+
+def build_llm(spec: ModelSpec, callbacks: Optional[list] = None):
+    if spec.provider == "google":
+        # Without an explicit key the client reads GOOGLE_API_KEY
+        key = {"google_api_key": spec.api_key} if spec.api_key else {}
+        return ChatGoogleGenerativeAI(
+            model=spec.model,
+            temperature=spec.temperature,
+            max_output_tokens=spec.max_tokens,
+            # This is important for compatibility with LangGraph's SystemMessages
+            convert_system_message_to_human=True,
+            callbacks=callbacks,
+            **key,
+        )
+    if spec.provider == "openai":
+        return ChatOpenAI(
+            # Local OpenAI-compatible servers usually accept any key
+            api_key=spec.api_key or os.getenv("OPENAI_API_KEY") or "not-needed",
+            base_url=spec.base_url,
+            model=spec.model,
+            temperature=spec.temperature,
+            max_tokens=spec.max_tokens,
+            callbacks=callbacks,
+        )
+    raise ValueError(f"Unknown LLM provider {spec.provider!r} (expected 'google' or 'openai')")
+
+
+# Per-node model registry: each graph node that calls an LLM gets its own
+# provider/model/temperature/max tokens from the environment
+NODE_MODELS: Dict[str, ModelSpec] = {node: spec_from_env(node) for node in ("orchestrator", "synthesizer", "summarizer")}
+_clients: Dict[str, object] = {}
+
+
+def get_llm(node: str):
+    """Chat model for a graph node, built once from its ModelSpec with usage tracking."""
+    if node not in _clients:
+        spec = NODE_MODELS.get(node) or spec_from_env(node)
+        _clients[node] = build_llm(spec, callbacks=[LLMUsageCallback(node, spec)])
+    return _clients[node]
+
+
+def get_structured_llm(node: str, schema):
+    """
+    Structured-output runnable for a node. Nodes listed in HEDGE_NODES are
+    wrapped in a HedgedRunnable whose backup is <NODE>_LLM_HEDGE_MODEL
+    ("provider:model[@base_url]") or, if unset, the same model. Only these
+    non-streaming calls are hedged; get_llm(node).astream is not.
+    """
+    spec = NODE_MODELS.get(node) or spec_from_env(node)
+    kwargs = {"method": spec.structured_method} if spec.structured_method else {}
+    runnable = get_llm(node).with_structured_output(schema, **kwargs)
+    if node not in HEDGE_NODES:
+        return runnable
+
+    backup = None
+    hedge_model = os.getenv(f"{node.upper()}_LLM_HEDGE_MODEL")
+    if hedge_model:
+        backup_spec = ModelSpec.parse(hedge_model, spec)
+        backup_kwargs = {"method": backup_spec.structured_method} if backup_spec.structured_method else {}
+        backup_llm = build_llm(backup_spec, callbacks=[LLMUsageCallback(f"{node}_hedge", backup_spec)])
+        backup = backup_llm.with_structured_output(schema, **backup_kwargs)
+    return HedgedRunnable(node, runnable, backup)
+
+
+# Default model, kept for scripts and notebooks that import `llm`
+llm = build_llm(spec_from_env("default"))
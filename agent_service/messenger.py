@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+from agent_service.config import (
+    GRAPH_API_URL, WEBHOOK_WORKERS, WEBHOOK_MAX_PENDING, DEBOUNCE_WINDOW_MS, DEBOUNCE_MAX_WAIT_MS,
+    SYNTHESIZER_STREAMING,
+)
+from agent_service.runner import acode_runner
+from agent_service.utils.debounce import Debouncer
+from agent_service.utils.http import get_http_client
+from agent_service.utils.intent_router import intent_router
+from agent_service.utils.messenger_sender import MessengerSender
+from agent_service.utils.metrics import metrics
+from agent_service.utils.profile_cache import ProfileCache
+from agent_service.utils.worker_pool import KeyedWorkerPool
+
+# Messenger turn pipeline shared by the webhook (inline mode) and the stream
+# workers: profile lookup, graph run and reply delivery for one sender's turn.
+
+FB_PAGE_ACCESS_TOKEN = os.getenv("FB_PAGE_ACCESS_TOKEN")
+
+profile_cache = ProfileCache()
+sender = MessengerSender(FB_PAGE_ACCESS_TOKEN)
+
+
+async def fetch_user_profile(sender_id: str) -> Optional[str]:
+    """
+    Calls the Facebook Graph API to get the user's first and last name.
+    Returns None when the name cannot be fetched.
+    """
+    if not FB_PAGE_ACCESS_TOKEN:
+        print("WARNING: FB_PAGE_ACCESS_TOKEN is not set. Cannot fetch user name.")
+        return None
+
+    url = f"{GRAPH_API_URL}/{sender_id}"
+    params = {
+        "fields": "first_name,last_name",
+        "access_token": FB_PAGE_ACCESS_TOKEN
+    }
+    try:
+        response = await get_http_client().get(url, params=params, timeout=5)
+        response.raise_for_status()
+        data = response.json()
+        first_name = data.get("first_name", "")
+        last_name = data.get("last_name", "")
+
+        if first_name and last_name:
+            return f"{first_name} {last_name}"
+        return first_name or None
+
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"❌ Error fetching user profile for {sender_id}: {e}")
+        return None
+
+async def get_user_profile(sender_id: str) -> str:
+    """
+    Cached display name for the sender, falling back to a generic label.
+    """
+    name = await profile_cache.get_or_fetch(sender_id, fetch_user_profile)
+    return name or f"User {sender_id}"
+
+async def send_to_meta_api(recipient_id: str, text: str, page_id: Optional[str] = None) -> bool:
+    return await sender.send_text(recipient_id, text, page_id)
+
+
+class ReplyStream:
+    """
+    Delivers one turn's reply messages in order from a background task, so a
+    streaming synthesizer is never blocked on the Send API. Records time to
+    first byte from when the webhook accepted the message.
+    """
+
+    def __init__(self, recipient_id: str, page_id: Optional[str], received_at: float):
+        self.recipient_id = recipient_id
+        self.page_id = page_id
+        self.received_at = received_at
+        self.started = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._drain())
+
+    async def put(self, text: str):
+        self.started = True
+        self._queue.put_nowait(text)
+
+    async def close(self):
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _drain(self):
+        first = True
+        while (text := await self._queue.get()) is not None:
+            if await send_to_meta_api(self.recipient_id, text, self.page_id) and first:
+                metrics.observe("turn.ttfb", time.time() - self.received_at)
+                first = False
+
+
+async def process_message(sender_id: str, messages: List[dict]):
+    """
+    Runs one Messenger turn end to end. Called by the worker pool, never by the
+    request handler, so Meta's delivery request is not held open. `messages` are
+    the sender's debounced messages, answered together as a single turn.
+    """
+    message_texts = [m["text"] for m in messages]
+    received_at = messages[0].get("received_at") or time.time()
+    print(f"⬅️ Message from {sender_id}: {' | '.join(message_texts)}")
+
+    replies = ReplyStream(sender_id, messages[-1].get("page_id"), received_at)
+    try:
+        # The profile lookup runs concurrently with the history load inside the runner
+        ai_reply = await acode_runner(
+            get_user_profile(sender_id), message_texts, sender_id,
+            on_chunk=replies.put if SYNTHESIZER_STREAMING else None,
+        )
+
+    except Exception as e:
+        ai_reply = "Sorry, I'm having trouble. Please try again."
+        print(f"LangGraph Error: {e}")
+
+    # Nothing was streamed (streaming off, or the turn ended before the synthesizer)
+    if not replies.started:
+        await replies.put(ai_reply)
+    await replies.close()
+    metrics.observe("turn.e2e", time.time() - received_at)
+
+
+class TurnQueue:
+    """
+    Debounces each sender's messages into turns and runs the turns on a keyed
+    worker pool: different senders in parallel, one sender strictly in order.
+    `after_turn` runs once a turn is finished (e.g. to ack stream entries).
+    """
+
+    def __init__(
+        self,
+        name: str = "webhook",
+        workers: int = WEBHOOK_WORKERS,
+        max_pending: int = WEBHOOK_MAX_PENDING,
+        after_turn: Optional[Callable[[str, List[dict]], Awaitable[None]]] = None,
+    ):
+        self.after_turn = after_turn
+        self.pool = KeyedWorkerPool(self._run_turn, workers=workers, max_pending=max_pending, name=name)
+        # The caller checks is_full before add(), so a flushed batch is always enqueued
+        self.debouncer = Debouncer(
+            lambda sender_id, batch: self.pool.submit(sender_id, batch, force=True),
+            window=DEBOUNCE_WINDOW_MS / 1000,
+            max_wait=DEBOUNCE_MAX_WAIT_MS / 1000,
+        )
+
+    @property
+    def is_full(self) -> bool:
+        return self.pool.is_full
+
+    def add(self, message: dict):
+        self.debouncer.add(message["sender_id"], message)
+
+    async def start(self):
+        # Load the intent router's model now rather than on the first turn
+        await asyncio.to_thread(intent_router.warmup)
+        await self.pool.start()
+
+    async def stop(self):
+        self.debouncer.flush_all()
+        await self.pool.stop(drain=True)
+
+    def stats(self) -> dict:
+        return self.pool.stats()
+
+    async def _run_turn(self, sender_id: str, messages: List[dict]):
+        try:
+            await process_message(sender_id, messages)
+        finally:
+            if self.after_turn is not None:
+                await self.after_turn(sender_id, messages)
@@ -5,11 +5,13 @@ from .info_agent import info_agent
 from .menu_agent import menu_agent
 from .synthesizer import synthesizer_node
 from .escalation_agent import escalation_agent
+from .direct_responder import direct_responder
 
 __all__ = [
     "orchestrator_node",
     "info_agent",
     "menu_agent",
     "synthesizer_node",
-    "escalation_agent"
+    "escalation_agent",
+    "direct_responder"
 ]
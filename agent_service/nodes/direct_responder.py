@@ -0,0 +1,56 @@
+import re
+from typing import Dict, List, Optional
+from agent_service.utils.classification_cache import normalize_query
+from agent_service.utils.metrics import metrics
+
+# Canned replies for small talk that carries no question. Only short messages
+# made of these phrases match, anything longer goes to the synthesizer.
+CHITCHAT_TEMPLATES = [
+    (re.compile(r"^(hi|hello|hey|hey there|hii+|namaste|good (morning|afternoon|evening))( there)?$"),
+     "Hello! Welcome to Lumina Bistro. How can I help you today? I can share our menu, opening hours, location and more."),
+    (re.compile(r"^(how are you|how are you doing|how s it going|whats up|what s up|sup)$"),
+     "I'm doing great, thanks for asking! How can I help you today?"),
+    (re.compile(r"^((ok|okay|great|nice|cool|perfect|awesome)\s*)?(thanks|thank you|thank you so much|thanks a lot|thx|ty)$"),
+     "You're welcome! Let me know if there's anything else I can help you with."),
+    (re.compile(r"^(bye|goodbye|good bye|see you|see you later|see ya|have a nice day|good night)$"),
+     "Thank you for chatting with Lumina Bistro. Have a lovely day!"),
+]
+
+
+def template_reply(query: str) -> Optional[str]:
+    normalized = normalize_query(query)
+    for pattern, reply in CHITCHAT_TEMPLATES:
+        if pattern.match(normalized):
+            return reply
+    return None
+
+
+def direct_reply(query_types: List[Dict], query: str) -> Optional[str]:
+    """
+    The final answer for a turn that needs no retrieval, or None when the
+    synthesizer has to write it. Ambiguous items answer with the orchestrator's
+    clarifying question, chitchat with the orchestrator's reply or a template.
+    """
+    parts = []
+    for qt in query_types or []:
+        if qt.get("type") == "ambiguous":
+            text = qt.get("clarification")
+        elif qt.get("type") == "chitchat":
+            text = qt.get("reply") or template_reply(query)
+        else:
+            return None
+        if not text:
+            return None
+        if text not in parts:
+            parts.append(text)
+    return " ".join(parts) or None
+
+
+# Direct Responder Node
+async def direct_responder(state: Dict) -> Dict:
+    """
+    Short-circuit for ambiguous/chitchat turns: returns the reply prepared by
+    assign_subagents without a second LLM round trip through the synthesizer.
+    """
+    metrics.incr("turn.direct_reply")
+    return {"final_response": state["reply"]}
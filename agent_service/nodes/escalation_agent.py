@@ -1,21 +1,23 @@
 import os
-import requests
+import httpx
+from agent_service.utils.deadline import DeadlineExceeded, backend_call_options
+from agent_service.utils.http import get_http_client
 
-def escalation_agent(state: dict) -> dict:
+async def escalation_agent(state: dict) -> dict:
     """
     Triggers a notification to the admin and informs the user that
     the message has been forwarded to the admin.
 
     Args:
-        state (dict): The current conversation state. Should include:
-            - user_name (str): Name of the user.
-            - parameters (dict): Should include 'topic' describing the reason for escalation.
+        state (dict): The Send payload from assign_subagents. Should include:
+            - params (dict): 'topic' describing the reason for escalation and 'user_name'.
+            - deadline (float): the turn's deadline, bounding the notify call.
 
     Returns:
-        dict: Status and message of the escalation attempt.
+        dict: The escalation status and message, wrapped in subagent_outputs.
     """
-    user_name = state.get("user_name", "Unknown User")
-    parameters = state.get("parameters", {})
+    parameters = state.get("params", {})
+    user_name = parameters.get("user_name") or "Unknown User"
     escalation_topic = parameters.get("topic", "(No topic provided)")
 
     base_url = os.getenv("BASE_URL")
@@ -31,9 +33,19 @@ def escalation_agent(state: dict) -> dict:
     }
 
     try:
-        response = requests.post(notify_url, json=json_data, timeout=10)
+        response = await get_http_client().post(notify_url, json=json_data, **backend_call_options(state.get("deadline")))
         response.raise_for_status()
-        return {"status": "success", "message": "Admin has been notified."}
-    except requests.exceptions.RequestException as e:
+        result = {"status": "success", "message": "Admin has been notified."}
+    except (httpx.HTTPError, DeadlineExceeded) as e:
         print(f"Error calling backend: {e}")
-        return {"status": "error", "message": str(e)}
+        result = {"status": "error", "message": str(e)}
+
+    return {
+        "subagent_outputs": [
+            {
+                "type": "escalation",
+                "parameters": {"topic": escalation_topic},
+                "output": result
+            }
+        ]
+    }
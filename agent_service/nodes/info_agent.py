@@ -1,30 +1,47 @@
-import requests
+import httpx
+from typing import Optional
 from agent_service.config import BASE_URL
+from agent_service.utils.answer_cache import answer_cache, KB_VERSION_HEADER
+from agent_service.utils.deadline import DeadlineExceeded, backend_call_options
+from agent_service.utils.http import get_http_client
 
-def info_agent(state:dict) -> dict:
+async def search_knowledge(query_str: str, deadline: Optional[float] = None):
     """
-    Retrieves restaurant knowledge base information based on a user query.
+    Calls the backend knowledge base semantic search within the turn's remaining
+    budget; returns {"error": ...} on failure.
     """
-    info_params = state.get("params", {})
-    query_str = info_params.get("topic", "")
-
     kb_url = BASE_URL + "/knowledge/semantic-search"
     params = {
         "search": query_str
     }
 
     try:
-        response = requests.get(kb_url, params=params, timeout=10)
+        response = await get_http_client().get(kb_url, params=params, **backend_call_options(deadline))
         response.raise_for_status()
-        info_data= response.json()
-    except requests.exceptions.RequestException as e:
+        # A changed knowledge base invalidates cached answers right away
+        answer_cache.observe_version(response.headers.get(KB_VERSION_HEADER))
+        return response.json()
+    except (httpx.HTTPError, ValueError, DeadlineExceeded) as e:
         print(f"Error calling backend: {e}")
-        info_data ={"error": str(e)}
+        return {"error": str(e)}
+
+async def info_agent(state:dict) -> dict:
+    """
+    Retrieves restaurant knowledge base information based on a user query.
+    """
+    info_params = state.get("params", {})
+    query_str = info_params.get("topic", "")
+
+    # Reuse the speculative search started with the raw query, if it searched the same topic
+    speculation = state.get("speculation")
+    info_data = await speculation.take_kb(query_str) if speculation else None
+    if info_data is None:
+        info_data = await search_knowledge(query_str, state.get("deadline"))
     
     return {
         "subagent_outputs": [
             {
-                "type": "menu",
+                "type": "info",
                 "parameters": info_params,  # only non-None params if you want
                 "output": info_data
             }
@@ -1,20 +1,47 @@
-import requests
+import httpx
+from typing import Optional
 from agent_service.config import BASE_URL
+from agent_service.utils.deadline import DeadlineExceeded, backend_call_options
+from agent_service.utils.http import get_http_client
+from agent_service.utils.metrics import metrics
+from agent_service.utils.turn_results import refine_menu
 
-def menu_agent(state: dict) -> dict:
+async def fetch_menu_items(menu_params: dict, deadline: Optional[float] = None):
     """
-    Retrieves restaurant menu items based on the provided criteria
-    and returns in the structured format for subagent aggregation.
+    Calls the backend /items search within the turn's remaining budget;
+    returns {"error": ...} on failure.
     """
-    menu_params = state.get("params", {})
     items_url = BASE_URL + "/items"
 
     try:
-        response = requests.get(items_url, params=menu_params, timeout=10)
+        response = await get_http_client().get(items_url, params=menu_params, **backend_call_options(deadline))
         response.raise_for_status()
-        menu_data = response.json()
-    except requests.exceptions.RequestException as e:
-        menu_data = {"error": str(e)}
+        return response.json()
+    except (httpx.HTTPError, ValueError, DeadlineExceeded) as e:
+        return {"error": str(e)}
+
+async def menu_agent(state: dict) -> dict:
+    """
+    Retrieves restaurant menu items based on the provided criteria
+    and returns in the structured format for subagent aggregation.
+    """
+    menu_params = state.get("params", {})
+
+    # Follow-ups about the items shown last turn are answered from those items
+    menu_data = refine_menu(state.get("query"), menu_params, state.get("previous_results"))
+    if menu_data is not None:
+        metrics.incr("menu.previous_results_reused")
+        return {
+            "subagent_outputs": [
+                {"type": "menu", "parameters": menu_params, "output": menu_data, "source": "previous_turn"}
+            ]
+        }
+
+    # Reuse the speculative search started with the raw query, if it used the same parameters
+    speculation = state.get("speculation")
+    menu_data = await speculation.take_menu(menu_params) if speculation else None
+    if menu_data is None:
+        menu_data = await fetch_menu_items(menu_params, state.get("deadline"))
 
     # Return wrapped in subagent_outputs for operator.add merging
     return {
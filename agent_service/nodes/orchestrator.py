@@ -1,24 +1,100 @@
+import asyncio
+import random
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
-from agent_service.llm import llm
+from agent_service.config import INTENT_ROUTER_SHADOW_RATE, ORCHESTRATOR_HISTORY_TOKENS
+from agent_service.llm import get_structured_llm
 from agent_service.state import State, OrchestratorOutput
 from agent_service.prompts import ORCHESTRATOR_PROMPT
+from agent_service.nodes.direct_responder import template_reply
+from agent_service.utils.classification_cache import classification_cache
+from agent_service.utils.deadline import DeadlineExceeded, remaining
+from agent_service.utils.history import format_history
+from agent_service.utils.intent_router import classify_by_rules, intent_router
+from agent_service.utils.metrics import metrics
+
+orchestrator_llm = get_structured_llm("orchestrator", OrchestratorOutput)
+
+# Strong references to background shadow checks so they are not garbage collected
+_shadow_tasks = set()
+
+# Asked when the turn's budget ran out before the query could be classified
+DEADLINE_CLARIFICATION = (
+    "Sorry, I didn't quite get that. Could you tell me whether you're asking about our menu, "
+    "or about something like opening hours, location or reservations?"
+)
+
+
+def _deadline_fallback(user_query) -> OrchestratorOutput:
+    """Best-effort classification without the LLM: rules, a canned greeting reply, or a clarifying question."""
+    routed = classify_by_rules(user_query)
+    if routed is not None:
+        return routed
+    reply = template_reply(user_query)
+    if reply:
+        return OrchestratorOutput(query_types=[{"type": "chitchat", "reply": reply}])
+    return OrchestratorOutput(query_types=[{"type": "ambiguous", "clarification": DEADLINE_CLARIFICATION}])
+
+
+def _build_messages(user_query, chat_history, history_summary=""):
+    history = format_history(chat_history, history_summary, ORCHESTRATOR_HISTORY_TOKENS)
+    return [
+        SystemMessage(content=ORCHESTRATOR_PROMPT),
+        HumanMessage(content=f"Chat history:\n{history}\nUser query: {user_query}")
+    ]
+
+
+async def _shadow_check(user_query, chat_history, history_summary, routed: OrchestratorOutput):
+    """Asks the LLM as well, off the critical path, to measure the router's accuracy."""
+    try:
+        parsed = await orchestrator_llm.ainvoke(_build_messages(user_query, chat_history, history_summary))
+    except Exception as e:
+        print(f"Intent router shadow check failed: {e}")
+        return
+    intent_router.record_shadow(user_query, routed, parsed)
 
-orchestrator_llm = llm.with_structured_output(OrchestratorOutput)
 
 # Orchestrator Node
-def orchestrator_node(state: State):
+async def orchestrator_node(state: State):
     """Classify user query and extract menu parameters for subagents."""
 
     user_query = state["query"]
     chat_history = state.get("chat_history", [])
+    history_summary = state.get("history_summary") or ""
+
+    # Repeated standalone questions reuse an earlier classification
+    cache_key = classification_cache.key_for(user_query, chat_history)
+    if cache_key is not None:
+        cached = await classification_cache.get(cache_key)
+        if cached is not None:
+            state["query_types"] = cached.model_dump()["query_types"]
+            return state
+
+    # Confident single-intent queries are classified locally without an LLM call
+    if intent_router.enabled:
+        routed = await asyncio.to_thread(intent_router.route, user_query, chat_history)
+        if routed is not None:
+            if random.random() < INTENT_ROUTER_SHADOW_RATE:
+                task = asyncio.create_task(_shadow_check(user_query, chat_history, history_summary, routed))
+                _shadow_tasks.add(task)
+                task.add_done_callback(_shadow_tasks.discard)
+            state["query_types"] = routed.model_dump()["query_types"]
+            return state
+
     # Construct LLM messages
-    messages = [
-        SystemMessage(content=ORCHESTRATOR_PROMPT),
-        HumanMessage(content=f"Chat history:\n{chat_history}\nUser query: {user_query}")
-    ]
+    messages = _build_messages(user_query, chat_history, history_summary)
 
-    # Call the LLM (replace `llm` with your LangChain/LLM client)
-    parsed: OrchestratorOutput = orchestrator_llm.invoke(messages)  # Should return JSON string
+    # Call the LLM (replace `llm` with your LangChain/LLM client), bounded by the turn's remaining budget
+    try:
+        timeout = remaining(state.get("deadline"))
+        parsed: OrchestratorOutput = await asyncio.wait_for(orchestrator_llm.ainvoke(messages), timeout=timeout)
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        # Degrade instead of failing the turn: the agents and synthesizer then
+        # answer from whatever is left (speculative results, templates)
+        metrics.incr("orchestrator.deadline_exceeded")
+        state["query_types"] = _deadline_fallback(user_query).model_dump()["query_types"]
+        return state
+    if cache_key is not None:
+        await classification_cache.set(cache_key, parsed)
 
     state["query_types"] = parsed.model_dump()["query_types"]
 
@@ -1,14 +1,26 @@
+import asyncio
+import time
 from langchain.schema import SystemMessage, HumanMessage
-from typing import Dict
-from agent_service.prompts import SYNTHESIZER_PROMPT
+from typing import Dict, Optional
+from langgraph.config import get_stream_writer
+from agent_service.config import (
+    SYNTHESIZER_STREAMING, STREAM_MIN_CHUNK_CHARS, SYNTHESIZER_TIMEOUT_SECONDS, SYNTHESIZER_MIN_BUDGET_SECONDS,
+    SYNTHESIZER_HISTORY_TOKENS, SYNTHESIZER_SUBAGENT_TOKENS,
+)
+from agent_service.prompts import SYNTHESIZER_PROMPT, SYNTHESIZER_STREAM_PROMPT
 from agent_service.state import SynthesizerOutput
-from agent_service.llm import llm  
+from agent_service.llm import get_llm, get_structured_llm
+from agent_service.utils.degraded_answer import build_degraded_answer
+from agent_service.utils.history import format_history
+from agent_service.utils.metrics import metrics
+from agent_service.utils.sentence_chunker import SentenceChunker
+from agent_service.utils.subagent_format import serialize_subagent_outputs, record_prompt_size
 
 # Wrap the LLM
-synthesizer_llm = llm.with_structured_output(SynthesizerOutput)
+synthesizer_llm = get_structured_llm("synthesizer", SynthesizerOutput)
 
 # Synthesizer Node
-def synthesizer_node(state: Dict) -> Dict:
+async def synthesizer_node(state: Dict) -> Dict:
     """
     Generate a coherent response from subagent outputs.
     """
@@ -16,28 +28,101 @@ def synthesizer_node(state: Dict) -> Dict:
     chat_history = state.get("chat_history", [])
     subagent_outputs = state.get("subagent_outputs", [])
 
-    # Format chat history
-    # chat_str = "\n".join([f"User: {c['user']}\nBot: {c['bot']}" for c in chat_history])
+    # Format chat history: rolling summary plus the most recent messages, within budget
+    chat_str = format_history(chat_history, state.get("history_summary") or "", SYNTHESIZER_HISTORY_TOKENS)
 
-    # Format subagent outputs
-    subagent_str = ""
-    for sa in subagent_outputs:
-        sa_type = sa["type"]
-        sa_params = sa.get("parameters", {})
-        sa_output = sa.get("output")
-        subagent_str += f"\n\n---\nSubagent type: {sa_type}\nParameters: {sa_params}\nOutput: {sa_output}"
+    # Format subagent outputs: one compact line per result, lowest-ranked dropped first to fit the budget
+    subagent_str, subagent_stats = serialize_subagent_outputs(subagent_outputs, SYNTHESIZER_SUBAGENT_TOKENS)
+
+    human_content = f"Chat history:\n{chat_str}\nUser query: {user_query}\nSubagent outputs:\n{subagent_str}"
+    record_prompt_size("synthesizer", SYNTHESIZER_PROMPT + human_content, subagent_str, subagent_stats)
+
+    # Whatever is left of the turn's latency budget, capped per call
+    budget = _llm_budget(state.get("deadline"))
+    if budget < SYNTHESIZER_MIN_BUDGET_SECONDS:
+        return _degrade(state, "budget_exhausted")
+
+    if SYNTHESIZER_STREAMING and state.get("stream"):
+        answer = await _stream_answer(human_content, budget)
+        if answer is None:
+            return _degrade(state, "timeout")
+        return {"final_response": answer, "degraded": False}
 
     # Construct messages using the separate prompt
     messages = [
         SystemMessage(content=SYNTHESIZER_PROMPT),
-        HumanMessage(content=f"Chat history:\n{chat_history}\nUser query: {user_query}\nSubagent outputs:\n{subagent_str}")
+        HumanMessage(content=human_content)
     ]
 
     # Call the LLM
-    parsed: SynthesizerOutput = synthesizer_llm.invoke(messages)
+    try:
+        parsed: SynthesizerOutput = await asyncio.wait_for(synthesizer_llm.ainvoke(messages), timeout=budget)
+    except asyncio.TimeoutError:
+        return _degrade(state, "timeout")
+    except Exception as e:
+        print(f"Synthesizer LLM failed: {e}")
+        return _degrade(state, "error")
     # parsed = llm.invoke(messages)
 
-    # Store in state
-    state["final_response"] = parsed.model_dump()["final_answer"]
+    # Only the keys this node sets: returning the whole state would re-add
+    # subagent_outputs through its `add` reducer
+    return {"final_response": parsed.model_dump()["final_answer"], "degraded": False}
+
+
+def _llm_budget(deadline: Optional[float]) -> float:
+    if deadline is None:
+        return SYNTHESIZER_TIMEOUT_SECONDS
+    return min(SYNTHESIZER_TIMEOUT_SECONDS, deadline - time.time())
+
+
+def _degrade(state: Dict, reason: str) -> Dict:
+    """Answers from the subagent outputs with templates instead of the LLM."""
+    metrics.incr("synthesizer.degraded")
+    metrics.incr(f"synthesizer.degraded.{reason}")
+    return {
+        "final_response": build_degraded_answer(state["query"], state.get("subagent_outputs", [])),
+        "degraded": True,
+    }
+
+
+async def _stream_answer(human_content: str, budget: float) -> Optional[str]:
+    """
+    Streams a plain-text answer and emits it to the graph's custom stream in
+    sentence-aligned chunks, so the caller can start replying before the LLM is done.
+    Returns None if the budget ran out before anything was emitted; after that,
+    the partial answer is flushed and returned.
+    """
+    writer = get_stream_writer()
+    chunker = SentenceChunker(min_chars=STREAM_MIN_CHUNK_CHARS)
+    messages = [
+        SystemMessage(content=SYNTHESIZER_STREAM_PROMPT),
+        HumanMessage(content=human_content)
+    ]
+
+    answer = ""
+    emitted = False
+
+    async def consume():
+        nonlocal answer, emitted
+        async for chunk in get_llm("synthesizer").astream(messages):
+            delta = chunk.content if isinstance(chunk.content, str) else "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+            )
+            answer += delta
+            for text in chunker.feed(delta):
+                writer({"answer_chunk": text})
+                emitted = True
+
+    try:
+        await asyncio.wait_for(consume(), timeout=budget)
+    except Exception as e:
+        if not emitted:
+            if not isinstance(e, asyncio.TimeoutError):
+                print(f"Synthesizer LLM failed: {e}")
+            return None
+        metrics.incr("synthesizer.stream_truncated")
+
+    for text in chunker.flush():
+        writer({"answer_chunk": text})
 
-    return state
+    return answer.strip()
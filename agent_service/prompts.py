@@ -27,6 +27,7 @@ Special instructions:
 - Normalize non-vegetarian types to "non-veg".
 - If user asks for recommendations, use menu search with search parameter "specials".
 - If user asks for reservation, order or any bookings, first classify it as chitchat until user confirms they want human assistance. After confirmation, classify it as escalation. 
+- For chitchat intents, also write the final `reply` to the user: one or two warm sentences as the assistant of Lumina Bistro. Never state menu items, prices or restaurant details in it. For reservation, order or booking requests, say you cannot do that directly and offer to connect the user with our staff.
 - Return data that matches the structured schema provided by the system.
 """
 
@@ -74,3 +75,25 @@ Output format (JSON):
 }
 """
 
+
+# Same instructions, but the answer is streamed to the user as it is generated
+SYNTHESIZER_STREAM_PROMPT = SYNTHESIZER_PROMPT.split("Output format (JSON):")[0] + """Output format:
+Reply with the final user-facing message only, as plain text. No JSON, no markdown.
+"""
+
+
+HISTORY_SUMMARY_PROMPT = """SYSTEM:
+You maintain a running summary of a customer's conversation with the Lumina Bistro assistant.
+You are given the current summary (possibly empty) and the next older messages, which will be removed from the chat history.
+Update the summary so that it still makes sense without those messages.
+
+Keep:
+- What the user asked about (dishes, categories, restaurant info) and what they were told.
+- User preferences and constraints: veg / non-veg, budget or price range, allergies, party size.
+- Open questions, pending clarifications and whether the user asked for or was offered human assistance.
+
+Rules:
+- At most 80 words, plain text, third person ("The user asked ...").
+- Do not invent anything that is not in the summary or the messages.
+- Reply with the updated summary only.
+"""
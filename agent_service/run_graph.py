@@ -1,45 +1,47 @@
+import asyncio
 from agent_service.graph import build_graph
-from agent_service.utils.redis import save_message, load_history
+from agent_service.utils.chat_store import chat_store
 
 graph = build_graph()
 
-def interactive_loop(user_id="user05", user_name="camus"):
+async def interactive_loop(user_id="user05", user_name="camus"):
     print("Chat loop (type 'exit' to quit)\n")
 
     while True:
-        user_input = input("You: ").strip()
+        user_input = (await asyncio.to_thread(input, "You: ")).strip()
         if user_input.lower() in {"exit", "quit"}:
             print("Goodbye.")
             break
         if not user_input:
             continue
 
-        # Load history for this user
-        chat_history = load_history(user_id)
+        # Load history for this user and save the user's new message
+        chat_history, history_summary, previous_results = await chat_store.append_and_load(
+            user_id, [("user", user_input)]
+        )
 
-        # Save the user's new message
-        save_message(user_id, "user", user_input)
-        
         # Fresh state for this run
         state = {
             "query": user_input,
             "chat_history": chat_history,
+            "history_summary": history_summary,
+            "previous_results": previous_results,
             "subagent_outputs": [],
             "user_id": user_id,
             "user_name": user_name
         }
      
         # Invoke the graph
-        result = graph.invoke(state)
+        result = await graph.ainvoke(state)
         final_answer = result.get("final_response", "(no response)")
 
         # Print assistant's reply
         print("\nAssistant:", final_answer)
 
         # Save the assistant's reply
-        save_message(user_id, "assistant", final_answer)
+        await chat_store.append(user_id, [("assistant", final_answer)])
 
         print()  # blank line for readability
 
 if __name__ == "__main__":
-    interactive_loop()
+    asyncio.run(interactive_loop())
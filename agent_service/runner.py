@@ -1,29 +1,129 @@
+import asyncio
+import inspect
+import time
+from typing import Awaitable, Callable, List, Optional, Union
+from agent_service.config import (
+    SPECULATIVE_RETRIEVAL, TURN_LATENCY_BUDGET_SECONDS, HISTORY_SUMMARY_ENABLED, HISTORY_SUMMARY_TRIGGER,
+    TURN_RESULTS_ENABLED,
+)
 from agent_service.graph import build_graph
-from agent_service.utils.redis import save_message,load_history
+from agent_service.utils.answer_cache import answer_cache
+from agent_service.utils.history import compact_history
+from agent_service.utils.chat_store import chat_store
+from agent_service.utils.turn_results import compact_results
+from agent_service.utils.speculative import SpeculativeRetrieval
 
 graph = build_graph()
 
-def code_runner(user_name:str, user_input:str, user_id:str):
-        # fresh state for this run
-    chat_history = load_history(user_id)
+# Strong references to background history compactions so they are not garbage collected
+_compaction_tasks = set()
+
+async def acode_runner(
+    user_name:Union[str, Awaitable[str]],
+    user_input:Union[str, List[str]],
+    user_id:str,
+    on_chunk:Optional[Callable[[str], Awaitable[None]]] = None,
+    deadline:Optional[float] = None,
+):
+    """
+    Async entry point: runs one conversation turn through the graph with ainvoke,
+    so many turns can be in flight on a single event loop.
+
+    `user_input` may be a list of messages the user sent in quick succession; they
+    are stored as separate history entries and answered as a single turn.
+    `user_name` may be an awaitable (e.g. a profile lookup), resolved concurrently
+    with the history load so it stays off the critical path.
+    With `on_chunk`, a streaming synthesizer hands each sentence-aligned piece of
+    the answer to the callback as soon as it is generated.
+    The turn has a deadline (epoch seconds, TURN_LATENCY_BUDGET_SECONDS from now
+    unless given) carried in graph state: every backend and LLM call only gets the
+    remaining budget, and when it runs out the synthesizer falls back to a
+    templated answer built from retrieval results.
+    With SPECULATIVE_RETRIEVAL, menu and knowledge base searches on the raw query
+    start before anything else and overlap with the orchestrator.
+    Once the history grows past HISTORY_SUMMARY_TRIGGER messages, older turns are
+    folded into a rolling summary in the background after the reply is saved.
+    The turn's menu/info results are stored too, so a follow-up about them can be
+    answered by filtering them instead of searching the backend again.
+    Standalone knowledge base questions similar enough to an earlier one are
+    answered from the answer cache without running the graph.
+    """
+    user_inputs = [user_input] if isinstance(user_input, str) else list(user_input)
+    query = "\n".join(user_inputs)
+    if deadline is None:
+        deadline = time.time() + TURN_LATENCY_BUDGET_SECONDS
+    speculation = SpeculativeRetrieval(query, deadline) if SPECULATIVE_RETRIEVAL else None
+
+    # Load the conversation and save the user's new message(s) in one round trip
+    user_messages = [("user", text) for text in user_inputs]
+    if inspect.isawaitable(user_name):
+        (chat_history, history_summary, previous_results), user_name = await asyncio.gather(
+            chat_store.append_and_load(user_id, user_messages), user_name
+        )
+    else:
+        chat_history, history_summary, previous_results = await chat_store.append_and_load(user_id, user_messages)
 
-    # Save the user's new message
-    save_message(user_id, "user", user_input)
-    
     # Fresh state for this run
     state = {
-        "query": user_input,
+        "query": query,
         "chat_history": chat_history,
+        "history_summary": history_summary,
+        "previous_results": previous_results if TURN_RESULTS_ENABLED else [],
         "subagent_outputs": [],
         "user_id": user_id,
-        "user_name": user_name
+        "user_name": user_name,
+        "stream": on_chunk is not None,
+        "speculation": speculation,
+        "deadline": deadline,
     }
-    
-    # Invoke the graph
-    result = graph.invoke(state)
+
+    # Invoke the graph, unless the same knowledge base question was answered before
+    try:
+        cached_answer, answer_key = await answer_cache.lookup(query, chat_history, deadline)
+        if cached_answer is not None:
+            result = {"final_response": cached_answer}
+            if on_chunk is not None:
+                await on_chunk(cached_answer)
+        elif on_chunk is None:
+            result = await graph.ainvoke(state)
+        else:
+            result = {}
+            async for mode, chunk in graph.astream(state, stream_mode=["custom", "values"]):
+                if mode == "custom" and "answer_chunk" in chunk:
+                    await on_chunk(chunk["answer_chunk"])
+                elif mode == "values":
+                    result = chunk
+    finally:
+        if speculation is not None:
+            speculation.finish()
+    answer_cache.store(answer_key, result)
     final_answer = result.get("final_response", "(no response)")
 
-    # Save the assistant's reply
-    save_message(user_id, "assistant", final_answer)
+    # Save the assistant's reply, and what this turn retrieved for follow-ups
+    # (turns without retrieval keep the previous set)
+    results = compact_results(result.get("subagent_outputs")) if TURN_RESULTS_ENABLED else []
+    await chat_store.append(user_id, [("assistant", final_answer)], results or None)
+
+    # Fold older turns into the rolling summary off the critical path, once the
+    # history (as loaded, plus this turn's messages) is long enough
+    history_length = min(len(chat_history) + len(user_messages) + 1, chat_store.max_messages)
+    if HISTORY_SUMMARY_ENABLED and history_length >= HISTORY_SUMMARY_TRIGGER:
+        task = asyncio.create_task(compact_history(user_id, history_length))
+        _compaction_tasks.add(task)
+        task.add_done_callback(_compaction_tasks.discard)
 
     return final_answer
+
+def code_runner(user_name:str, user_input:Union[str, List[str]], user_id:str):
+    """
+    Blocking wrapper around acode_runner for scripts and threads without a running loop.
+    asyncio.run() cancels leftover tasks when it returns, so this also waits for
+    the turn's history compaction (if any) before returning.
+    """
+    return asyncio.run(_run_turn_to_completion(user_name, user_input, user_id))
+
+async def _run_turn_to_completion(user_name, user_input, user_id):
+    answer = await acode_runner(user_name, user_input, user_id)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(task for task in list(_compaction_tasks) if task.get_loop() is loop))
+    return answer
@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, TypedDict, Annotated, Literal
+from typing import Any, List, Dict, Optional, TypedDict, Annotated, Literal
 from operator import add
 from pydantic import BaseModel
 
@@ -6,6 +6,10 @@ from pydantic import BaseModel
 class State(TypedDict):
     query: str
     chat_history: List[Dict[str, str]] 
+    # Rolling summary of messages older than chat_history
+    history_summary: Optional[str]
+    # Compact menu/info results of the last turn that retrieved anything
+    previous_results: Optional[List[Dict]]
 
     user_id: str
     user_name: Optional[str]
@@ -13,6 +17,14 @@ class State(TypedDict):
     query_types: Optional[List[Dict]]  
     subagent_outputs: Annotated[list, add]
     final_response: Optional[str]
+    # Set when the synthesizer fell back to a templated answer
+    degraded: Optional[bool]
+
+    stream: Optional[bool]
+    # SpeculativeRetrieval started by the runner, handed to menu/info agents
+    speculation: Optional[Any]
+    # Epoch seconds by which the turn should be answered
+    deadline: Optional[float]
 
 
 class Parameters(BaseModel):
@@ -26,6 +38,7 @@ class QueryTypeItem(BaseModel):
     type: Literal["menu", "info", "escalation", "chitchat", "ambiguous"]
     parameters: Optional[Parameters] = None
     clarification: Optional[str] = None
+    reply: Optional[str] = None
 
 class OrchestratorOutput(BaseModel):
     query_types: List[QueryTypeItem]
@@ -0,0 +1,180 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+import httpx
+from agent_service.config import (
+    BASE_URL, ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAXSIZE, ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_VERSION_TTL_SECONDS,
+)
+from agent_service.utils.classification_cache import normalize_query, is_context_dependent
+from agent_service.utils.deadline import DeadlineExceeded, backend_call_options
+from agent_service.utils.http import get_http_client
+from agent_service.utils.intent_router import intent_router, match_info_topic
+from agent_service.utils.metrics import metrics
+
+# Sent by the backend with knowledge base search results
+KB_VERSION_HEADER = "X-KB-Version"
+
+# Words that change the answer to otherwise near-identical questions
+# ("open on saturday" / "open on sunday", "pay with esewa" / "pay with khalti")
+_ENTITY = re.compile(
+    r"\b(?:(?:mon|tues|wednes|thurs|fri|satur|sun)days?|weekdays?|weekends?|today|tonight|tomorrow|"
+    r"morning|afternoon|evening|night|holidays?|dashain|tihar|christmas|new year|"
+    r"esewa|khalti|fonepay|visa|mastercard|card|cards|cash|foodmandu|pathao|"
+    r"kids?|children|pets?|dogs?|\d+)\b"
+)
+
+
+class Fingerprint(NamedTuple):
+    topic: str
+    entities: FrozenSet[str]
+
+
+def fingerprint(normalized_query: str) -> Optional[Fingerprint]:
+    """Topic and entities a cached answer must share with the query; None when it is not about a known KB topic."""
+    topic = match_info_topic(normalized_query)
+    if topic is None:
+        return None
+    # Singular and plural are the same entity ("saturday" / "saturdays")
+    return Fingerprint(topic, frozenset(entity.rstrip("s") for entity in _ENTITY.findall(normalized_query)))
+
+
+class AnswerKey(NamedTuple):
+    normalized: str
+    vector: object
+    kb_version: str
+    fingerprint: Fingerprint
+
+
+class AnswerCache:
+    """
+    Answer-level cache for standalone knowledge base questions ("do you have
+    parking", "are you open on saturday"). A query whose embedding is at least
+    `threshold` similar to a cached one gets the earlier synthesized answer,
+    skipping the orchestrator, the KB search and the synthesizer. Embeddings
+    alone cannot tell "open on saturday" from "open on sunday", so a hit also
+    needs the same rule-extracted topic and entities; queries without a known
+    topic (menu requests, small talk) are not looked up at all.
+
+    Entries are tied to the knowledge base content version: the backend's
+    version is re-checked at most every `version_ttl` seconds and is also read
+    from every KB search response, and any change drops the whole cache.
+    Embeddings come from the intent router's model; without it the cache is off.
+    Entries are per process.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        maxsize: int = ANSWER_CACHE_MAXSIZE,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+        version_ttl: float = ANSWER_CACHE_VERSION_TTL_SECONDS,
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        # normalized query -> (vector, fingerprint, answer, kb_version, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._version_checked = 0.0
+        metrics.gauge("answer_cache.hit_rate", lambda: metrics.ratio("answer_cache.hits", "answer_cache.misses"))
+        metrics.gauge("answer_cache.size", lambda: len(self._entries))
+
+    def observe_version(self, version: Optional[str]):
+        """Records the KB version seen by the backend; a new one invalidates every entry."""
+        if not version:
+            return
+        if self._version is not None and version != self._version:
+            metrics.incr("answer_cache.invalidations")
+            self._entries.clear()
+        self._version = version
+        self._version_checked = time.monotonic()
+
+    async def kb_version(self, deadline: Optional[float] = None) -> Optional[str]:
+        """The current KB version, fetched from the backend when the known one is stale."""
+        if self._version is not None and time.monotonic() - self._version_checked < self.version_ttl:
+            return self._version
+        try:
+            response = await get_http_client().get(BASE_URL + "/knowledge/version", **backend_call_options(deadline))
+            response.raise_for_status()
+            self.observe_version(response.json().get("version"))
+        except (httpx.HTTPError, ValueError, DeadlineExceeded) as e:
+            print(f"Answer cache: could not fetch the knowledge base version: {e}")
+            return None
+        return self._version
+
+    async def lookup(
+        self, query: str, chat_history: List[Dict[str, str]], deadline: Optional[float] = None
+    ) -> Tuple[Optional[str], Optional[AnswerKey]]:
+        """
+        Returns (answer, None) on a hit. On a miss returns (None, key), and the
+        key is passed to store() once the turn is answered; key is None when the
+        query cannot be cached (not about a KB topic, follow-up, no embedding
+        model, no KB version); those return without any embedding or backend call.
+        """
+        if not self.enabled:
+            return None, None
+        normalized = normalize_query(query)
+        key_fingerprint = fingerprint(normalized)
+        if key_fingerprint is None or is_context_dependent(normalized, chat_history):
+            metrics.incr("answer_cache.bypass")
+            return None, None
+
+        vector, version = await asyncio.gather(asyncio.to_thread(intent_router.embed, normalized),
+                                               self.kb_version(deadline))
+        if vector is None or version is None:
+            return None, None
+
+        answer, similarity = self._best_match(vector, key_fingerprint, version)
+        if answer is not None and similarity >= self.threshold:
+            metrics.incr("answer_cache.hits")
+            return answer, None
+        metrics.incr("answer_cache.misses")
+        return None, AnswerKey(normalized, vector, version, key_fingerprint)
+
+    def _best_match(self, vector, key_fingerprint: Fingerprint, version: str) -> Tuple[Optional[str], float]:
+        now = time.monotonic()
+        best_answer, best_similarity = None, -1.0
+        for normalized, entry in list(self._entries.items()):
+            cached_vector, cached_fingerprint, answer, cached_version, expires_at = entry
+            if expires_at <= now or cached_version != version:
+                del self._entries[normalized]
+                continue
+            if cached_fingerprint != key_fingerprint:
+                continue
+            similarity = float(cached_vector @ vector)
+            if similarity > best_similarity:
+                best_answer, best_similarity = answer, similarity
+        return best_answer, best_similarity
+
+    def store(self, key: Optional[AnswerKey], result: Dict):
+        """
+        Caches the turn's answer if it was a single knowledge base question that
+        the synthesizer answered from a successful search on an unchanged KB.
+        """
+        if key is None or key.kb_version != self._version or result.get("degraded"):
+            return
+        query_types = result.get("query_types") or []
+        if len(query_types) != 1 or query_types[0].get("type") != "info":
+            return
+        info_outputs = [sa.get("output") for sa in result.get("subagent_outputs") or [] if sa.get("type") == "info"]
+        if not info_outputs or not all(isinstance(output, list) and output for output in info_outputs):
+            return
+        answer = result.get("final_response")
+        if not answer:
+            return
+
+        entry = (key.vector, key.fingerprint, answer, key.kb_version, time.monotonic() + self.ttl)
+        self._entries[key.normalized] = entry
+        self._entries.move_to_end(key.normalized)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        metrics.incr("answer_cache.stores")
+
+
+answer_cache = AnswerCache()
@@ -1,5 +1,6 @@
 from langgraph.types import Send
 from agent_service.state import State
+from agent_service.nodes.direct_responder import direct_reply
 
 def assign_subagents(state: State):
     sends = []
@@ -10,15 +11,18 @@ def assign_subagents(state: State):
         parameters = {k: v for k, v in raw_params.items() if v is not None}
 
         if qtype == "menu":
-            sends.append(Send("menu_agent", {"params": parameters}))
+            sends.append(Send("menu_agent", {"params": parameters, "speculation": state.get("speculation"),
+                                             "deadline": state.get("deadline"), "query": state.get("query"),
+                                             "previous_results": state.get("previous_results")}))
 
         elif qtype == "info":
-            sends.append(Send("info_agent", {"params": parameters}))
+            sends.append(Send("info_agent", {"params": parameters, "speculation": state.get("speculation"),
+                                             "deadline": state.get("deadline")}))
 
         elif qtype == "escalation":
             esc_params = parameters.copy()
             esc_params["user_name"] = state.get("user_name")
-            sends.append(Send("escalation_agent", {"params": esc_params}))
+            sends.append(Send("escalation_agent", {"params": esc_params, "deadline": state.get("deadline")}))
 
         elif qt["type"] == "ambiguous":
             state.setdefault("subagent_outputs", []).append({
@@ -34,12 +38,21 @@ def assign_subagents(state: State):
                 "output": None
             })
 
+    # Nothing to retrieve: answer with the clarification/chitchat reply directly when there is one
+    if not sends:
+        reply = direct_reply(state.get("query_types", []), state.get("query", ""))
+        if reply is not None:
+            return [Send("direct_responder", {"reply": reply})]
+
     # If no subagents were scheduled, explicitly tell the graph to run synthesizer next
     if not sends:
         return [Send("synthesizer", {
                 "query": state.get("query"),
                 "chat_history": state.get("chat_history", []),
+                "history_summary": state.get("history_summary"),
                 "subagent_outputs": state.get("subagent_outputs", []),
-                "memory_results": state.get("memory_results", [])})]
+                "memory_results": state.get("memory_results", []),
+                "stream": state.get("stream"),
+                "deadline": state.get("deadline")})]
 
     return sends
@@ -0,0 +1,78 @@
+import json
+import zlib
+from typing import Any, Dict, Union
+from agent_service.config import CHAT_ENCODING, CHAT_COMPRESS_MIN_BYTES
+
+try:
+    import ormsgpack
+except ImportError:  # optional: without it everything is stored as JSON
+    ormsgpack = None
+
+# Storage format of chat history entries and retrieval results in Redis.
+# Entries written as JSON text (the original format) start with "{" or "[";
+# compact entries start with a one-byte tag, so both can be read side by side
+# and old JSON entries simply age out with the history trim and TTL.
+
+MSGPACK = b"\x00"
+MSGPACK_ZLIB = b"\x01"
+
+ROLE_CODES = {"user": 0, "assistant": 1, "system": 2}
+ROLES = {code: role for role, code in ROLE_CODES.items()}
+
+if CHAT_ENCODING == "msgpack" and ormsgpack is None:
+    print("CHAT_ENCODING=msgpack but ormsgpack is not installed; storing chat history as JSON.")
+COMPACT = CHAT_ENCODING == "msgpack" and ormsgpack is not None
+
+
+def _frame(value: Any) -> bytes:
+    payload = ormsgpack.packb(value)
+    if len(payload) >= CHAT_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            return MSGPACK_ZLIB + compressed
+    return MSGPACK + payload
+
+
+def _unframe(raw: bytes) -> Any:
+    tag, payload = raw[:1], raw[1:]
+    if tag == MSGPACK_ZLIB:
+        payload = zlib.decompress(payload)
+    elif tag != MSGPACK:
+        raise ValueError(f"Unknown chat entry format {tag!r}")
+    if ormsgpack is None:
+        raise RuntimeError("ormsgpack is required to read msgpack-encoded chat history")
+    return ormsgpack.unpackb(payload)
+
+
+def is_json(raw: Union[bytes, str]) -> bool:
+    """True for JSON entries (objects, lists and bare strings), False for tagged msgpack frames."""
+    return isinstance(raw, str) or raw[:1] in (b"{", b"[", b'"')
+
+
+def encode_message(role: str, content: str, compact: bool = COMPACT) -> Union[bytes, str]:
+    if not compact:
+        return json.dumps({"role": role, "content": content})
+    return _frame([ROLE_CODES.get(role, role), content])
+
+
+def decode_message(raw: Union[bytes, str]) -> Dict[str, str]:
+    if is_json(raw):
+        return json.loads(raw)
+    role, content = _unframe(raw)
+    return {"role": ROLES.get(role, role), "content": content}
+
+
+def encode_value(value: Any) -> Union[bytes, str]:
+    """Any JSON-compatible value, e.g. a turn's compact retrieval results."""
+    return _frame(value) if COMPACT else json.dumps(value)
+
+
+def decode_value(raw: Union[bytes, str]) -> Any:
+    return json.loads(raw) if is_json(raw) else _unframe(raw)
+
+
+def decode_text(raw: Union[bytes, str, None]) -> str:
+    """Plain text values (the rolling summary) stored as UTF-8."""
+    if raw is None:
+        return ""
+    return raw.decode("utf-8") if isinstance(raw, bytes) else raw
@@ -0,0 +1,297 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import redis
+import redis.asyncio as aioredis
+from agent_service.config import (
+    CHAT_TTL_SECONDS, CHAT_MAX_MESSAGES, CHAT_STORE, CHAT_MEMORY_MAX_CONVERSATIONS,
+)
+from agent_service.utils.chat_codec import encode_message, decode_message, encode_value, decode_value, decode_text
+from agent_service.utils.metrics import metrics
+from agent_service.utils.redis import get_async_redis, get_user_key, get_summary_key, get_results_key
+
+# (role, content) pairs, appended in order
+Messages = Sequence[Tuple[str, str]]
+# (history, summary, results) as the runner puts them in graph state
+Context = Tuple[List[Dict[str, str]], str, List[Dict]]
+
+
+class ChatStore(ABC):
+    """
+    Async chat history store: per-user message list (at most `max_messages`),
+    rolling summary and last retrieval results, each kept for `ttl` seconds
+    after the last message. Backends: RedisChatStore and MemoryChatStore,
+    selected with CHAT_STORE.
+    """
+
+    def __init__(self, max_messages: int = CHAT_MAX_MESSAGES, ttl: int = CHAT_TTL_SECONDS):
+        self.max_messages = max_messages
+        self.ttl = ttl
+
+    @abstractmethod
+    async def load(self, user_id: str) -> Context:
+        """(history, summary, results); empty values for an unknown or expired conversation."""
+
+    @abstractmethod
+    async def append_and_load(self, user_id: str, messages: Messages) -> Context:
+        """
+        Atomically returns the context as it was before this turn and appends the
+        turn's messages, trimming the history and refreshing the TTLs.
+        """
+
+    @abstractmethod
+    async def append(self, user_id: str, messages: Messages, results: Optional[List[Dict]] = None):
+        """Appends messages (and replaces the stored retrieval results when given)."""
+
+    async def append_many(self, entries: Sequence[Tuple[str, Messages, Optional[List[Dict]]]]):
+        """(user_id, messages, results) appends for many users."""
+        for user_id, messages, results in entries:
+            await self.append(user_id, messages, results)
+
+    async def load_many(self, user_ids: Sequence[str]) -> Dict[str, Context]:
+        """Contexts of many users."""
+        return {user_id: await self.load(user_id) for user_id in user_ids}
+
+    @abstractmethod
+    async def load_raw_history(self, user_id: str) -> Tuple[List[bytes], str]:
+        """The stored (encoded) messages and the summary, for history compaction."""
+
+    @abstractmethod
+    async def fold_into_summary(self, user_id: str, folded: List[bytes], summary: str) -> bool:
+        """
+        Atomically drops the `folded` oldest raw messages and stores the new summary.
+        Returns False (and changes nothing) if the history changed in the meantime.
+        """
+
+
+class RedisChatStore(ChatStore):
+    """
+    Chat store in Redis, shared by every webhook and worker process.
+
+    Every operation is a single round trip. append_and_load() reads the context
+    and appends the user's messages in one MULTI pipeline; append() calls made
+    in the same event loop iteration (e.g. by concurrent turns in the worker
+    pool) are flushed together through one pipeline. load_many()/append_many()
+    do the same for explicit batches.
+    Connections come from get_async_redis(), one pool per event loop.
+    """
+
+    def __init__(self, max_messages: int = CHAT_MAX_MESSAGES, ttl: int = CHAT_TTL_SECONDS):
+        super().__init__(max_messages, ttl)
+        self._batches: Dict[asyncio.AbstractEventLoop, list] = {}
+        self._flushes = set()
+
+    def _redis(self) -> aioredis.Redis:
+        # Raw bytes: entries may be msgpack-encoded (see chat_codec)
+        return get_async_redis(decode_responses=False)
+
+    def _queue_read(self, pipe, user_id: str):
+        pipe.lrange(get_user_key(user_id), 0, -1)
+        pipe.get(get_summary_key(user_id))
+        pipe.get(get_results_key(user_id))
+
+    def _queue_append(self, pipe, user_id: str, messages: Messages, results: Optional[List[Dict]] = None):
+        user_key = get_user_key(user_id)
+        if messages:
+            pipe.rpush(user_key, *(encode_message(role, content) for role, content in messages))
+            pipe.ltrim(user_key, -self.max_messages, -1)
+        if results:
+            pipe.set(get_results_key(user_id), encode_value(results), ex=self.ttl)
+        # The summary and retrieval results live as long as the conversation
+        for key in (user_key, get_summary_key(user_id), get_results_key(user_id)):
+            pipe.expire(key, self.ttl)
+
+    @staticmethod
+    def _parse_context(raw_messages, summary, results) -> Context:
+        return [decode_message(m) for m in raw_messages], decode_text(summary), decode_value(results) if results else []
+
+    async def load(self, user_id: str) -> Context:
+        pipe = self._redis().pipeline(transaction=False)
+        self._queue_read(pipe, user_id)
+        return self._parse_context(*await pipe.execute())
+
+    async def append_and_load(self, user_id: str, messages: Messages) -> Context:
+        # One MULTI pipeline: reads before the append, atomically
+        pipe = self._redis().pipeline(transaction=True)
+        self._queue_read(pipe, user_id)
+        self._queue_append(pipe, user_id, messages)
+        replies = await pipe.execute()
+        return self._parse_context(*replies[:3])
+
+    async def append(self, user_id: str, messages: Messages, results: Optional[List[Dict]] = None):
+        """Concurrent calls are coalesced into one pipeline per loop iteration."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._batches.setdefault(loop, [])
+        batch.append((user_id, messages, results, future))
+        if len(batch) == 1:
+            loop.call_soon(self._start_flush, loop)
+        await future
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop):
+        batch = self._batches.pop(loop, [])
+        task = loop.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list):
+        try:
+            await self.append_many([(user_id, messages, results) for user_id, messages, results, _ in batch])
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for *_, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def append_many(self, entries: Sequence[Tuple[str, Messages, Optional[List[Dict]]]]):
+        """One round trip for all the appends."""
+        if not entries:
+            return
+        pipe = self._redis().pipeline(transaction=False)
+        for user_id, messages, results in entries:
+            self._queue_append(pipe, user_id, messages, results)
+        await pipe.execute()
+        metrics.incr("chat_store.flushes")
+        metrics.incr("chat_store.appends", len(entries))
+
+    async def load_many(self, user_ids: Sequence[str]) -> Dict[str, Context]:
+        """One round trip for all the contexts."""
+        if not user_ids:
+            return {}
+        pipe = self._redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            self._queue_read(pipe, user_id)
+        replies = await pipe.execute()
+        return {user_id: self._parse_context(*replies[3 * i:3 * i + 3]) for i, user_id in enumerate(user_ids)}
+
+    async def load_raw_history(self, user_id: str) -> Tuple[List[bytes], str]:
+        pipe = self._redis().pipeline(transaction=False)
+        pipe.lrange(get_user_key(user_id), 0, -1)
+        pipe.get(get_summary_key(user_id))
+        raw_messages, summary = await pipe.execute()
+        return raw_messages, decode_text(summary)
+
+    async def fold_into_summary(self, user_id: str, folded: List[bytes], summary: str) -> bool:
+        # Optimistic: WATCH the history and only swap if the folded prefix is unchanged
+        user_key = get_user_key(user_id)
+        async with self._redis().pipeline() as pipe:
+            try:
+                await pipe.watch(user_key)
+                if await pipe.lrange(user_key, 0, len(folded) - 1) != folded:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.ltrim(user_key, len(folded), -1)
+                pipe.set(get_summary_key(user_id), summary, ex=self.ttl)
+                await pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+
+class _Conversation:
+    __slots__ = ("messages", "summary", "results", "expires_at")
+
+    def __init__(self):
+        self.messages: List = []
+        self.summary = ""
+        self.results = None
+        self.expires_at = 0.0
+
+
+class MemoryChatStore(ChatStore):
+    """
+    In-process chat store with the same semantics as RedisChatStore: entries
+    are encoded the same way (see chat_codec), trimmed to `max_messages` and
+    expire `ttl` seconds after the last append. At most `max_conversations`
+    are kept; the least recently used is evicted first.
+
+    For single-node deployments, benchmarks and tests: no network hop, but
+    history is lost on restart and not shared between processes.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = CHAT_MAX_MESSAGES,
+        ttl: int = CHAT_TTL_SECONDS,
+        max_conversations: int = CHAT_MEMORY_MAX_CONVERSATIONS,
+    ):
+        super().__init__(max_messages, ttl)
+        self.max_conversations = max_conversations
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        metrics.gauge("chat_store.conversations", lambda: len(self._conversations))
+
+    def _get(self, user_id: str) -> Optional[_Conversation]:
+        conversation = self._conversations.get(user_id)
+        if conversation is None:
+            return None
+        if conversation.expires_at <= time.monotonic():
+            del self._conversations[user_id]
+            return None
+        self._conversations.move_to_end(user_id)
+        return conversation
+
+    def _context(self, conversation: Optional[_Conversation]) -> Context:
+        if conversation is None:
+            return [], "", []
+        results = decode_value(conversation.results) if conversation.results else []
+        return [decode_message(m) for m in conversation.messages], conversation.summary, results
+
+    def _append(self, user_id: str, messages: Messages, results: Optional[List[Dict]] = None):
+        conversation = self._get(user_id)
+        if conversation is None:
+            # Like Redis, refreshing the TTL of a conversation that does not exist is a no-op
+            if not messages and not results:
+                return
+            conversation = self._conversations[user_id] = _Conversation()
+            metrics.incr("chat_store.conversations_created")
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+                metrics.incr("chat_store.evicted")
+        if messages:
+            conversation.messages.extend(encode_message(role, content) for role, content in messages)
+            del conversation.messages[:-self.max_messages]
+        if results:
+            conversation.results = encode_value(results)
+        conversation.expires_at = time.monotonic() + self.ttl
+
+    async def load(self, user_id: str) -> Context:
+        return self._context(self._get(user_id))
+
+    async def append_and_load(self, user_id: str, messages: Messages) -> Context:
+        context = self._context(self._get(user_id))
+        self._append(user_id, messages)
+        return context
+
+    async def append(self, user_id: str, messages: Messages, results: Optional[List[Dict]] = None):
+        self._append(user_id, messages, results)
+
+    async def load_raw_history(self, user_id: str) -> Tuple[List[bytes], str]:
+        conversation = self._get(user_id)
+        if conversation is None:
+            return [], ""
+        return list(conversation.messages), conversation.summary
+
+    async def fold_into_summary(self, user_id: str, folded: List[bytes], summary: str) -> bool:
+        conversation = self._get(user_id)
+        if conversation is None or conversation.messages[:len(folded)] != folded:
+            return False
+        del conversation.messages[:len(folded)]
+        conversation.summary = summary
+        return True
+
+
+def build_chat_store(backend: str = CHAT_STORE) -> ChatStore:
+    if backend == "memory":
+        return MemoryChatStore()
+    if backend != "redis":
+        raise ValueError(f"Unknown CHAT_STORE {backend!r}, expected 'redis' or 'memory'")
+    return RedisChatStore()
+
+
+chat_store = build_chat_store()
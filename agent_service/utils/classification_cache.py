@@ -0,0 +1,131 @@
+import hashlib
+import json
+import re
+from typing import List, Dict, Optional
+from redis.exceptions import RedisError
+from agent_service.config import (
+    ORCHESTRATOR_CACHE_ENABLED, ORCHESTRATOR_CACHE_TTL_SECONDS, ORCHESTRATOR_CACHE_MAXSIZE,
+    ORCHESTRATOR_CACHE_REDIS, ORCHESTRATOR_CACHE_BYPASS_FOLLOWUPS, ORCHESTRATOR_CACHE_CONTEXT_MESSAGES,
+)
+from agent_service.prompts import ORCHESTRATOR_PROMPT
+from agent_service.state import OrchestratorOutput
+from agent_service.utils.metrics import metrics
+from agent_service.utils.redis import get_async_redis
+from agent_service.utils.ttl_cache import TTLCache
+
+# Changing the prompt (or the output schema) must not serve stale classifications
+_PROMPT_VERSION = hashlib.sha1(
+    (ORCHESTRATOR_PROMPT + json.dumps(OrchestratorOutput.model_json_schema(), sort_keys=True)).encode()
+).hexdigest()[:8]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# Queries that only make sense with the previous turns: anaphora ("is it spicy"),
+# refinements ("cheaper ones", "what about veg") and bare confirmations ("yes please")
+_FOLLOWUP = re.compile(
+    r"\b(it|its|that|this|those|these|them|they|ones|same|another|other|more|less|else|"
+    r"cheaper|instead|also|too|then|what about|how about)\b"
+)
+_CONFIRMATION = re.compile(r"^(and|but|yes|yeah|yep|yup|sure|ok|okay|no|nope|nah|please|pls|thanks|thank you)\b")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", query.lower())).strip()
+
+
+def is_context_dependent(normalized_query: str, chat_history: List[Dict[str, str]]) -> bool:
+    """
+    True when the classification of this query depends on earlier turns. Without
+    history nothing can be referred to, so every query counts as standalone.
+    """
+    if not chat_history:
+        return False
+    return bool(_FOLLOWUP.search(normalized_query) or _CONFIRMATION.match(normalized_query))
+
+
+class ClassificationCache:
+    """
+    Caches orchestrator classifications: an in-process LRU with TTL in front of a
+    Redis layer shared by every webhook/worker process.
+
+    The key is the normalized query plus a digest of the history that can change
+    its meaning. Standalone queries ignore history entirely, so "what are your
+    opening hours" is shared by every user. Context-dependent follow-ups either
+    bypass the cache (the default) or are keyed on the last few messages.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ORCHESTRATOR_CACHE_ENABLED,
+        ttl: int = ORCHESTRATOR_CACHE_TTL_SECONDS,
+        maxsize: int = ORCHESTRATOR_CACHE_MAXSIZE,
+        use_redis: bool = ORCHESTRATOR_CACHE_REDIS,
+        bypass_followups: bool = ORCHESTRATOR_CACHE_BYPASS_FOLLOWUPS,
+        context_messages: int = ORCHESTRATOR_CACHE_CONTEXT_MESSAGES,
+        prefix: str = "orchestrator:",
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.bypass_followups = bypass_followups
+        self.context_messages = context_messages
+        self.prefix = f"{prefix}{_PROMPT_VERSION}:"
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        metrics.gauge("orchestrator_cache.hit_rate",
+                      lambda: metrics.ratio("orchestrator_cache.hits", "orchestrator_cache.misses"))
+
+    def key_for(self, query: str, chat_history: List[Dict[str, str]]) -> Optional[str]:
+        """Cache key for this turn, or None when the turn must not use the cache."""
+        if not self.enabled:
+            return None
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+
+        context = ""
+        if is_context_dependent(normalized, chat_history):
+            if self.bypass_followups or self.context_messages <= 0:
+                metrics.incr("orchestrator_cache.bypass")
+                return None
+            recent = chat_history[-self.context_messages:]
+            context = "\n".join(f"{m.get('role')}:{normalize_query(m.get('content') or '')}" for m in recent)
+
+        digest = hashlib.sha1(f"{normalized}\x00{context}".encode()).hexdigest()
+        return self.prefix + digest
+
+    async def get(self, key: str) -> Optional[OrchestratorOutput]:
+        cached = self._local.get(key)
+        if cached is None and self.use_redis:
+            cached = await self._redis_get(key)
+            if cached is not None:
+                self._local.set(key, cached)
+
+        if cached is None:
+            metrics.incr("orchestrator_cache.misses")
+            return None
+        metrics.incr("orchestrator_cache.hits")
+        return OrchestratorOutput.model_validate_json(cached)
+
+    async def set(self, key: str, parsed: OrchestratorOutput):
+        value = parsed.model_dump_json()
+        self._local.set(key, value)
+        if self.use_redis:
+            await self._redis_set(key, value)
+
+    async def _redis_get(self, key: str) -> Optional[str]:
+        try:
+            return await get_async_redis().get(key)
+        except RedisError as e:
+            print(f"Orchestrator cache Redis read failed: {e}")
+            return None
+
+    async def _redis_set(self, key: str, value: str):
+        try:
+            await get_async_redis().set(key, value, ex=self.ttl)
+        except RedisError as e:
+            print(f"Orchestrator cache Redis write failed: {e}")
+
+
+classification_cache = ClassificationCache()
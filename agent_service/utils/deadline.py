@@ -0,0 +1,40 @@
+import time
+from typing import Dict, Optional
+from agent_service.config import HTTP_TIMEOUT_SECONDS
+
+# Sent with every backend call so the backend can stop work the agent will not wait for.
+# The relative timeout is what the backend acts on (no clock skew); the absolute
+# deadline is there for logs and tracing.
+DEADLINE_HEADER = "X-Request-Deadline"
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+
+class DeadlineExceeded(Exception):
+    """The turn's deadline passed before a call could be made."""
+
+
+def remaining(deadline: Optional[float], cap: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds left until `deadline` (epoch seconds), at most `cap`. None means no
+    limit at all (no deadline and no cap). Raises DeadlineExceeded when none is left.
+    """
+    if deadline is None:
+        return cap
+    left = deadline - time.time()
+    if left <= 0:
+        raise DeadlineExceeded(f"deadline passed {-left:.2f}s ago")
+    return left if cap is None else min(cap, left)
+
+
+def backend_call_options(deadline: Optional[float]) -> Dict:
+    """httpx keyword arguments for a backend call: remaining-budget timeout plus deadline headers."""
+    timeout = remaining(deadline, cap=HTTP_TIMEOUT_SECONDS)
+    if deadline is None:
+        return {"timeout": timeout}
+    return {
+        "timeout": timeout,
+        "headers": {
+            DEADLINE_HEADER: f"{deadline:.3f}",
+            TIMEOUT_HEADER: str(int(timeout * 1000)),
+        },
+    }
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Hashable, List
+
+from agent_service.utils.metrics import metrics
+
+
+class Debouncer:
+    """
+    Buffers items per key and flushes them as one batch once the key has been
+    quiet for `window` seconds, or `max_wait` seconds after the first buffered
+    item so a steady stream of messages still gets answered.
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[Any]], None], window: float, max_wait: float):
+        self.flush = flush
+        self.window = window
+        self.max_wait = max(max_wait, window)
+        self._buffers: Dict[Hashable, List[Any]] = {}
+        self._first_seen: Dict[Hashable, float] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        metrics.gauge("debounce.buffered_keys", lambda: len(self._buffers))
+
+    def add(self, key: Hashable, item: Any):
+        if self.window <= 0:
+            self.flush(key, [item])
+            return
+
+        now = time.monotonic()
+        self._buffers.setdefault(key, []).append(item)
+        first = self._first_seen.setdefault(key, now)
+
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        delay = min(self.window, max(0.0, first + self.max_wait - now))
+        self._timers[key] = asyncio.get_running_loop().call_later(delay, self._fire, key)
+
+    def _fire(self, key: Hashable):
+        self._timers.pop(key, None)
+        self._first_seen.pop(key, None)
+        items = self._buffers.pop(key, [])
+        if not items:
+            return
+        metrics.incr("debounce.turns")
+        metrics.incr("debounce.messages", len(items))
+        if len(items) > 1:
+            metrics.incr("debounce.coalesced", len(items) - 1)
+        self.flush(key, items)
+
+    def flush_all(self):
+        """Flushes every pending buffer immediately (used on shutdown)."""
+        for key in list(self._buffers):
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._fire(key)
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from redis.exceptions import RedisError
+from agent_service.config import DEDUP_TTL_SECONDS, DEDUP_REDIS_TIMEOUT_SECONDS, DEDUP_REDIS
+from agent_service.utils.metrics import metrics
+from agent_service.utils.redis import get_async_redis
+
+
+class MessageDeduplicator:
+    """
+    Drops Meta webhook redeliveries before any graph work, keyed on message.mid.
+
+    Uses SET NX EX in Redis so every webhook process sees the same marks; if Redis
+    is slow or unreachable it falls back to a per-process set with the same TTL.
+    Every Redis call is bounded by `timeout`, since it runs before the webhook ack,
+    and after a failure Redis is skipped for a short cooldown. Without `use_redis`
+    (a single node, e.g. CHAT_STORE=memory) only the per-process set is used.
+    """
+
+    REDIS_COOLDOWN_SECONDS = 5
+
+    def __init__(self, ttl: int = DEDUP_TTL_SECONDS, prefix: str = "webhook:mid:",
+                 timeout: float = DEDUP_REDIS_TIMEOUT_SECONDS, use_redis: bool = DEDUP_REDIS):
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self.use_redis = use_redis
+        self._local = {}
+        self._redis_down_until = 0.0
+        metrics.gauge("dedup.hit_rate", lambda: metrics.ratio("dedup.hits", "dedup.misses"))
+
+    async def is_duplicate(self, mid: str) -> bool:
+        """Marks `mid` as seen and returns True if it had already been seen."""
+        if not mid:
+            return False
+
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            first_seen = self._mark_local(mid)
+        else:
+            try:
+                first_seen = await asyncio.wait_for(
+                    get_async_redis().set(self.prefix + mid, 1, nx=True, ex=self.ttl), timeout=self.timeout
+                )
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                print(f"Dedup falling back to local store: {e!r}")
+                metrics.incr("dedup.redis_failures")
+                self._redis_down_until = time.monotonic() + self.REDIS_COOLDOWN_SECONDS
+                first_seen = self._mark_local(mid)
+
+        metrics.incr("dedup.misses" if first_seen else "dedup.hits")
+        return not first_seen
+
+    async def release(self, mid: str):
+        """Forgets a mark, e.g. when the event was not accepted and Meta must redeliver it."""
+        if not mid:
+            return
+        self._local.pop(mid, None)
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return
+        try:
+            await asyncio.wait_for(get_async_redis().delete(self.prefix + mid), timeout=self.timeout)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            print(f"Dedup release failed for {mid}: {e!r}")
+
+    def _mark_local(self, mid: str) -> bool:
+        now = time.monotonic()
+        if len(self._local) > 10000:
+            self._local = {k: exp for k, exp in self._local.items() if exp > now}
+        expires = self._local.get(mid)
+        if expires and expires > now:
+            return False
+        self._local[mid] = now + self.ttl
+        return True
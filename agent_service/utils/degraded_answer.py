@@ -0,0 +1,75 @@
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List
+from agent_service.config import DEGRADED_MENU_ITEMS
+
+# Deterministic answers built straight from subagent outputs, used when the
+# synthesizer LLM cannot answer within the turn's latency budget.
+
+GENERIC_FALLBACK = "Sorry, I'm having trouble. Please try again."
+
+
+def format_price(value) -> str:
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return str(value)
+    return f"Rs {amount.normalize():f}" if amount == amount.to_integral() else f"Rs {amount:.2f}"
+
+
+def _menu_line(item: Dict) -> str:
+    variations = [v for v in item.get("variations") or [] if v.get("is_available", True)]
+    if len(variations) == 1:
+        price = format_price(variations[0].get("final_price"))
+    else:
+        price = " / ".join(f"{format_price(v.get('final_price'))} ({v.get('label')})" for v in variations)
+    return f"• {item.get('name', 'Item')}" + (f" — {price}" if price else "")
+
+
+def _menu_answer(output, parameters: Dict) -> str:
+    if not isinstance(output, list):
+        return "I couldn't load our menu right now. Please try again in a moment."
+    items = [item for item in output if isinstance(item, dict) and item.get("is_available", True)]
+    if not items:
+        wanted = parameters.get("search") or parameters.get("type") or "that"
+        return f"I couldn't find any menu items matching {wanted}. Would you like to try something else?"
+
+    lines = [_menu_line(item) for item in items[:DEGRADED_MENU_ITEMS]]
+    more = f"\n…and {len(items) - DEGRADED_MENU_ITEMS} more." if len(items) > DEGRADED_MENU_ITEMS else ""
+    return "Here's what I found on our menu:\n" + "\n".join(lines) + more
+
+
+def _info_answer(output) -> str:
+    passages = [p for p in output if isinstance(p, dict) and p.get("content")] if isinstance(output, list) else []
+    if not passages:
+        return "I couldn't find that information right now. Please try again in a moment."
+    # The knowledge base search returns passages best match first
+    return passages[0]["content"].strip()
+
+
+def _escalation_answer(output) -> str:
+    if isinstance(output, dict) and output.get("status") == "success":
+        return "I've let our team know, and someone will get back to you shortly."
+    return "I couldn't reach our team just now. Please try again in a moment."
+
+
+def build_degraded_answer(query: str, subagent_outputs: List[Dict]) -> str:
+    """Combines one templated section per subagent output into the reply."""
+    sections = []
+    for sa in subagent_outputs or []:
+        sa_type, output = sa.get("type"), sa.get("output")
+        if sa_type == "menu":
+            section = _menu_answer(output, sa.get("parameters") or {})
+        elif sa_type == "info":
+            section = _info_answer(output)
+        elif sa_type == "escalation":
+            section = _escalation_answer(output)
+        elif sa_type == "ambiguous":
+            section = output
+        elif sa_type == "chitchat":
+            from agent_service.nodes.direct_responder import template_reply  # nodes import this module
+            section = template_reply(query) or "How can I help you today?"
+        else:
+            section = None
+        if section and section not in sections:
+            sections.append(section)
+    return "\n\n".join(sections) or GENERIC_FALLBACK
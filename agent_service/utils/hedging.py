@@ -0,0 +1,96 @@
+import asyncio
+import time
+from collections import deque
+from agent_service.config import (
+    HEDGE_PERCENTILE, HEDGE_DEFAULT_DELAY_MS, HEDGE_MIN_DELAY_MS, HEDGE_MAX_DELAY_MS,
+    HEDGE_MIN_SAMPLES, HEDGE_MAX_FRACTION,
+)
+from agent_service.utils.metrics import metrics, LatencyStat
+
+
+class HedgedRunnable:
+    """
+    Wraps an LLM runnable with request hedging: if the primary call has not
+    returned after the recent p`percentile` latency, a second identical call
+    goes to `backup` (the same model or a fallback) and whichever finishes
+    first wins; the other is cancelled.
+
+    At most `max_fraction` of recent calls are hedged, so a general slowdown
+    does not double the load on the provider.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        primary,
+        backup=None,
+        percentile: float = HEDGE_PERCENTILE,
+        default_delay_ms: float = HEDGE_DEFAULT_DELAY_MS,
+        min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+        max_delay_ms: float = HEDGE_MAX_DELAY_MS,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        max_fraction: float = HEDGE_MAX_FRACTION,
+    ):
+        self.name = name
+        self.primary = primary
+        self.backup = backup or primary
+        self.percentile = percentile
+        self.default_delay = default_delay_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.min_samples = min_samples
+        self.max_fraction = max_fraction
+        self._latency = LatencyStat(window=500)
+        self._recent_hedges = deque(maxlen=200)
+        metrics.gauge(f"hedge.{name}.delay_ms", lambda: round(1000 * self.delay(), 1))
+
+    def delay(self) -> float:
+        """Seconds to wait before hedging: the recent latency percentile, clamped."""
+        if self._latency.count < self.min_samples:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, self._latency.percentile(self.percentile)))
+
+    def _hedge_allowed(self) -> bool:
+        recent = self._recent_hedges
+        return not recent or sum(recent) / len(recent) < self.max_fraction
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        metrics.incr(f"hedge.{self.name}.calls")
+        started = time.perf_counter()
+        primary = asyncio.create_task(self.primary.ainvoke(input, config, **kwargs))
+        tasks = [primary]
+        # Whole body: a caller's cancellation (e.g. wait_for) must not orphan either call
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.delay())
+            if done:
+                self._latency.observe(time.perf_counter() - started)
+                self._recent_hedges.append(False)
+                return primary.result()
+
+            if not self._hedge_allowed():
+                metrics.incr(f"hedge.{self.name}.skipped")
+                self._recent_hedges.append(False)
+                result = await primary
+                self._latency.observe(time.perf_counter() - started)
+                return result
+
+            metrics.incr(f"hedge.{self.name}.fired")
+            self._recent_hedges.append(True)
+            backup = asyncio.create_task(self.backup.ainvoke(input, config, **kwargs))
+            tasks.append(backup)
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Successful results first; a failed request loses to one still running
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    if task.exception() is not None and pending:
+                        continue
+                    if task is backup and task.exception() is None:
+                        metrics.incr(f"hedge.{self.name}.won")
+                    # Censored sample: the primary took at least this long
+                    self._latency.observe(time.perf_counter() - started)
+                    return task.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
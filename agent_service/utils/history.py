@@ -0,0 +1,103 @@
+import asyncio
+from typing import Dict, List, Optional
+from langchain.schema import HumanMessage, SystemMessage
+from agent_service.config import (
+    HISTORY_SUMMARY_ENABLED, HISTORY_VERBATIM_MESSAGES, HISTORY_SUMMARY_TRIGGER,
+    HISTORY_SUMMARY_TIMEOUT_SECONDS, HISTORY_MESSAGE_MAX_CHARS,
+)
+from agent_service.llm import get_llm
+from agent_service.prompts import HISTORY_SUMMARY_PROMPT
+from agent_service.utils.metrics import metrics
+from agent_service.utils.chat_codec import decode_message
+from agent_service.utils.chat_store import chat_store
+
+# Conversation history compaction: prompts get a rolling summary of older turns
+# plus the last few messages verbatim, within a per-node token budget.
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def format_history(chat_history: List[Dict[str, str]], summary: str, max_tokens: int) -> str:
+    """
+    Renders the summary and recent messages as prompt text within `max_tokens`.
+    The newest messages are kept first; the summary gets at least a third of the
+    budget when there is one, and is cut to whatever remains after the messages.
+    """
+    summary = " ".join((summary or "").split())
+    reserved = min(estimate_tokens(summary), max_tokens // 3) if summary else 0
+
+    lines, used = [], reserved
+    for message in reversed(chat_history or []):
+        speaker = "User" if message.get("role") == "user" else "Assistant"
+        line = f"{speaker}: {truncate_text(message.get('content'), HISTORY_MESSAGE_MAX_CHARS)}"
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    lines.reverse()
+
+    if summary:
+        room = max(reserved, max_tokens - (used - reserved))
+        lines.insert(0, f"Summary of earlier conversation: {truncate_text(summary, room * 4)}")
+    return "\n".join(lines) if lines else "(no previous messages)"
+
+
+async def _summarize(summary: str, messages: List[Dict[str, str]]) -> str:
+    transcript = "\n".join(
+        f"{'User' if m.get('role') == 'user' else 'Assistant'}: {truncate_text(m.get('content'), HISTORY_MESSAGE_MAX_CHARS)}"
+        for m in messages
+    )
+    prompt = [
+        SystemMessage(content=HISTORY_SUMMARY_PROMPT),
+        HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nMessages to fold in:\n{transcript}"),
+    ]
+    response = await asyncio.wait_for(get_llm("summarizer").ainvoke(prompt), timeout=HISTORY_SUMMARY_TIMEOUT_SECONDS)
+    return response.content.strip() if isinstance(response.content, str) else str(response.content)
+
+
+# Users whose history is being compacted by this process
+_compacting = set()
+
+
+async def compact_history(user_id: str, history_length: Optional[int] = None):
+    """
+    Folds all but the last HISTORY_VERBATIM_MESSAGES messages into the rolling
+    summary once the history reaches HISTORY_SUMMARY_TRIGGER messages. Meant to
+    run in the background after a turn, on a loop that outlives it; a concurrent
+    change to the history (e.g. the user's next message) just leaves the work
+    for the next turn. `history_length`, when the caller already knows it,
+    saves the history read for short conversations.
+    """
+    if not HISTORY_SUMMARY_ENABLED or user_id in _compacting:
+        return
+    if history_length is not None and history_length < HISTORY_SUMMARY_TRIGGER:
+        return
+    _compacting.add(user_id)
+    try:
+        raw_messages, summary = await chat_store.load_raw_history(user_id)
+        if len(raw_messages) < HISTORY_SUMMARY_TRIGGER:
+            return
+        folded = raw_messages[:len(raw_messages) - HISTORY_VERBATIM_MESSAGES]
+
+        with metrics.timer("history.summarize"):
+            new_summary = await _summarize(summary, [decode_message(m) for m in folded])
+
+        if await chat_store.fold_into_summary(user_id, folded, new_summary):
+            metrics.incr("history.compactions")
+            metrics.incr("history.messages_folded", len(folded))
+        else:
+            metrics.incr("history.compaction_conflicts")
+    except Exception as e:
+        metrics.incr("history.compaction_failed")
+        print(f"History compaction failed for {user_id}: {e}")
+    finally:
+        _compacting.discard(user_id)
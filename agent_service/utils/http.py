@@ -0,0 +1,41 @@
+import asyncio
+import httpx
+from agent_service.config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT_SECONDS
+)
+
+# One keep-alive pool per event loop. httpx connections are bound to the loop
+# that opened them, so scripts that call asyncio.run() repeatedly get a fresh pool.
+_clients: dict = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared AsyncClient for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [l for l in _clients if l.is_closed()]:
+        _clients.pop(stale)
+
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=HTTP_TIMEOUT_SECONDS,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    """
+    Closes the pool owned by the running event loop (call on shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, List
+
+from redis.exceptions import RedisError, ResponseError
+from agent_service.config import (
+    STREAM_PREFIX, STREAM_PARTITIONS, STREAM_GROUP, STREAM_MAXLEN, STREAM_READ_COUNT,
+    STREAM_BLOCK_MS, STREAM_CLAIM_IDLE_MS,
+)
+from agent_service.utils.metrics import metrics
+from agent_service.utils.redis import get_async_redis
+
+
+def partition_for(sender_id: str, partitions: int = STREAM_PARTITIONS) -> int:
+    """Stable sender -> partition mapping; all of a sender's events share one stream."""
+    return zlib.crc32(sender_id.encode()) % partitions
+
+def stream_key(partition: int) -> str:
+    return f"{STREAM_PREFIX}:{partition}"
+
+
+async def publish(messages: List[dict]):
+    """
+    Appends webhook messages to their partition streams in one pipeline.
+    Raises RedisError if the events could not be stored.
+    """
+    pipe = get_async_redis().pipeline(transaction=False)
+    for message in messages:
+        pipe.xadd(
+            stream_key(partition_for(message["sender_id"])),
+            {"data": json.dumps(message)},
+            maxlen=STREAM_MAXLEN,
+            approximate=True,
+        )
+    await pipe.execute()
+    metrics.incr("stream.published", len(messages))
+
+
+class StreamConsumer:
+    """
+    Reads the partitions owned by one worker through a consumer group.
+
+    Each partition is owned by exactly one worker index, so a sender's events are
+    consumed in order. Entries stay pending until ack() (at-least-once): on start
+    the consumer re-reads its own pending entries, and it periodically reclaims,
+    with XAUTOCLAIM, idle entries of its partitions still pending for another
+    consumer name (e.g. after --num-workers changed).
+
+    Nothing reads or reclaims the partitions of a worker index that is down, so
+    every index must be kept running (restarted by its supervisor on exit).
+    """
+
+    def __init__(
+        self,
+        partitions: List[int],
+        consumer_name: str,
+        handler: Callable[[dict], Awaitable[None]],
+        has_capacity: Callable[[], bool] = lambda: True,
+    ):
+        self.partitions = partitions
+        self.consumer_name = consumer_name
+        self.handler = handler
+        self.has_capacity = has_capacity
+        self._running = False
+        # (stream, entry id) pairs handed to the handler and not yet acked; never dispatched twice
+        self._inflight = set()
+
+    async def ensure_groups(self):
+        redis = get_async_redis()
+        for p in self.partitions:
+            try:
+                await redis.xgroup_create(stream_key(p), STREAM_GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def ack(self, messages: List[dict]):
+        by_stream: Dict[str, List[str]] = {}
+        for m in messages:
+            if m.get("stream_id"):
+                by_stream.setdefault(m["stream_key"], []).append(m["stream_id"])
+        if not by_stream:
+            return
+        pipe = get_async_redis().pipeline(transaction=False)
+        for key, ids in by_stream.items():
+            pipe.xack(key, STREAM_GROUP, *ids)
+        await pipe.execute()
+        for key, ids in by_stream.items():
+            self._inflight.difference_update((key, entry_id) for entry_id in ids)
+        metrics.incr("stream.acked", sum(len(ids) for ids in by_stream.values()))
+
+    async def run(self):
+        await self.ensure_groups()
+        self._running = True
+
+        # Entries delivered to this consumer name before a crash/restart come first
+        await self._replay_pending()
+        last_claim = time.monotonic()
+
+        while self._running:
+            if not self.has_capacity():
+                await asyncio.sleep(0.05)
+                continue
+            try:
+                if time.monotonic() - last_claim > STREAM_CLAIM_IDLE_MS / 1000:
+                    await self._reclaim()
+                    last_claim = time.monotonic()
+                await self._read(">")
+            except RedisError as e:
+                metrics.incr("stream.errors")
+                print(f"❌ Stream read failed: {e}")
+                await asyncio.sleep(1)
+
+    def stop(self):
+        self._running = False
+
+    async def _read(self, start_id: str):
+        response = await get_async_redis().xreadgroup(
+            STREAM_GROUP, self.consumer_name,
+            {stream_key(p): start_id for p in self.partitions},
+            count=STREAM_READ_COUNT, block=STREAM_BLOCK_MS,
+        )
+        for key, entries in response or []:
+            await self._dispatch(key, entries)
+
+    async def _replay_pending(self):
+        # Reading from an explicit id returns this consumer's pending entries after it
+        for p in self.partitions:
+            key, last_id = stream_key(p), "0"
+            while True:
+                response = await get_async_redis().xreadgroup(
+                    STREAM_GROUP, self.consumer_name, {key: last_id}, count=STREAM_READ_COUNT
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                metrics.incr("stream.replayed", len(entries))
+                await self._dispatch(key, entries)
+                last_id = entries[-1][0]
+
+    async def _reclaim(self):
+        # Own partitions only: taking over another index's entries would break per-sender order
+        redis = get_async_redis()
+        for p in self.partitions:
+            key = stream_key(p)
+            _, entries, *_ = await redis.xautoclaim(
+                key, STREAM_GROUP, self.consumer_name,
+                min_idle_time=STREAM_CLAIM_IDLE_MS, start_id="0-0", count=STREAM_READ_COUNT,
+            )
+            if entries:
+                metrics.incr("stream.reclaimed", len(entries))
+                await self._dispatch(key, entries)
+
+    async def _dispatch(self, key: str, entries):
+        for entry_id, fields in entries:
+            if (key, entry_id) in self._inflight:
+                continue
+            if not fields:
+                # Trimmed away while pending: nothing left to process
+                await get_async_redis().xack(key, STREAM_GROUP, entry_id)
+                continue
+            try:
+                message = json.loads(fields["data"])
+            except (KeyError, ValueError) as e:
+                print(f"❌ Dropping malformed stream entry {entry_id}: {e}")
+                await get_async_redis().xack(key, STREAM_GROUP, entry_id)
+                continue
+            message["stream_key"] = key
+            message["stream_id"] = entry_id
+            self._inflight.add((key, entry_id))
+            metrics.incr("stream.consumed")
+            if message.get("received_at"):
+                metrics.observe("stream.lag", time.time() - message["received_at"])
+            await self.handler(message)
@@ -0,0 +1,318 @@
+import argparse
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from agent_service.config import (
+    INTENT_ROUTER_ENABLED, INTENT_ROUTER_MODEL, INTENT_ROUTER_EXAMPLES,
+    INTENT_ROUTER_THRESHOLD, INTENT_ROUTER_MIN_MARGIN,
+)
+from agent_service.state import OrchestratorOutput
+from agent_service.utils.classification_cache import normalize_query, is_context_dependent
+from agent_service.utils.metrics import metrics
+
+# --- Rule-based parameter extraction ---------------------------------------
+
+_AMOUNT = r"(?:rs\.?|npr|rupees?|\$)?\s*(\d+(?:\.\d+)?)"
+_PRICE_RANGE = re.compile(rf"\bbetween\s*{_AMOUNT}\s*(?:and|to|-)\s*{_AMOUNT}")
+_PRICE_MAX = re.compile(rf"\b(?:under|below|less than|cheaper than|within|upto|up to|max(?:imum)?|at most)\s*{_AMOUNT}")
+_PRICE_MIN = re.compile(rf"\b(?:above|over|more than|at least|min(?:imum)?|starting from)\s*{_AMOUNT}")
+_NON_VEG = re.compile(r"\bnon\s?veg(?:etarian)?\b")
+_VEG = re.compile(r"\b(?:veg|vegetarian|vegan|veggie)\b")
+_RECOMMEND = re.compile(r"\b(?:recommend\w*|suggest\w*|special|specials|best|popular|signature)\b")
+# Phrasings that ask for dishes ("do you have momo", "anything spicy", "what's good to eat")
+_MENU_CUE = re.compile(
+    r"\b(?:menu|menus|dish|dishes|food|foods|eat|drink|drinks|serve|serves|order|have|got|any|anything|"
+    r"spicy|sweet|dessert|desserts|breakfast|lunch|dinner|starter|starters)\b"
+)
+
+# Words that carry no search signal in a menu request
+_MENU_STOPWORDS = set("""
+a an the me my i we you your u our us is are am be do does did have has had can could would will should
+show tell give list get see want wanna like need looking look find any some something anything what whats
+which who how much many price prices cost costs menu menus item items dish dishes food foods option options
+serve served serving available there here please pls for of to in on with at from today now eat order
+rs npr rupees rupee and or
+""".split())
+
+# First matching group wins; the topic is what info_agent searches the knowledge base for
+_INFO_TOPICS = [
+    ("opening hours", r"\b(?:open|opens|opening|close|closes|closing|hours|timings?)\b"),
+    ("address", r"\b(?:where|address|location|located|directions?|reach|get there|get to)\b"),
+    ("delivery options", r"\b(?:deliver|delivers|delivery|takeout|takeaway|take away|pickup|foodmandu|pathao)\b"),
+    ("payment options", r"\b(?:pay|payment|card|cards|cash|esewa|khalti)\b"),
+    ("contact", r"\b(?:phone|number|contact|call|email|website)\b"),
+    ("parking", r"\bparking\b"),
+    ("wifi", r"\b(?:wifi|wi fi|internet)\b"),
+    ("accessibility", r"\b(?:wheelchair|accessible|accessibility|ramp)\b"),
+    ("seating", r"\b(?:seating|outdoor|indoor|terrace|garden|private dining)\b"),
+    ("events", r"\b(?:live music|music|events?|festivals?|workshops?)\b"),
+    ("policies", r"\b(?:refund|cancellation|policy|policies|allergy|allergies|allergen|hygiene)\b"),
+]
+_INFO_TOPICS = [(topic, re.compile(pattern)) for topic, pattern in _INFO_TOPICS]
+
+
+def extract_menu_parameters(normalized_query: str) -> Dict:
+    """Price range, veg/non-veg and the leftover search words of a menu request."""
+    params = {}
+    text = normalized_query
+
+    if match := _PRICE_RANGE.search(text):
+        low, high = sorted((float(match.group(1)), float(match.group(2))))
+        params["price_min"], params["price_max"] = low, high
+        text = text.replace(match.group(0), " ")
+    else:
+        if match := _PRICE_MAX.search(text):
+            params["price_max"] = float(match.group(1))
+            text = text.replace(match.group(0), " ")
+        if match := _PRICE_MIN.search(text):
+            params["price_min"] = float(match.group(1))
+            text = text.replace(match.group(0), " ")
+
+    if _NON_VEG.search(text):
+        params["type"] = "non-veg"
+        text = _NON_VEG.sub(" ", text)
+    elif _VEG.search(text):
+        params["type"] = "veg"
+        text = _VEG.sub(" ", text)
+
+    if _RECOMMEND.search(text):
+        params["search"] = "specials"
+    else:
+        words = [w for w in text.split() if w not in _MENU_STOPWORDS and not w.isdigit()]
+        if words:
+            params["search"] = " ".join(words)
+    return params
+
+
+def is_menu_request(normalized_query: str) -> bool:
+    """
+    True when the rules are confident the query asks about dishes: a menu cue
+    or a price/veg filter, and no knowledge base topic ("do you have parking").
+    """
+    if not normalized_query or match_info_topic(normalized_query) is not None:
+        return False
+    return bool(_MENU_CUE.search(normalized_query) or _RECOMMEND.search(normalized_query)
+                or _VEG.search(normalized_query) or _NON_VEG.search(normalized_query)
+                or _PRICE_MAX.search(normalized_query) or _PRICE_MIN.search(normalized_query)
+                or _PRICE_RANGE.search(normalized_query))
+
+
+def match_info_topic(normalized_query: str) -> Optional[str]:
+    """The known knowledge base topic the query is about, if any."""
+    for topic, pattern in _INFO_TOPICS:
+        if pattern.search(normalized_query):
+            return topic
+    return None
+
+
+def extract_info_topic(normalized_query: str) -> str:
+    return match_info_topic(normalized_query) or normalized_query
+
+
+def classify_by_rules(query: str) -> Optional[OrchestratorOutput]:
+    """
+    Rules-only classification, for when the LLM cannot be asked (e.g. the turn's
+    deadline ran out): a menu request or a known knowledge base topic, else None.
+    """
+    normalized = normalize_query(query)
+    items = []
+    if is_menu_request(normalized):
+        params = extract_menu_parameters(normalized)
+        if params:
+            items.append({"type": "menu", "parameters": params})
+    topic = match_info_topic(normalized)
+    if topic:
+        items.append({"type": "info", "parameters": {"topic": topic}})
+    return OrchestratorOutput(query_types=items) if items else None
+
+
+# --- Embedding classifier ----------------------------------------------------
+
+class IntentRouter:
+    """
+    Fast-path intent classifier that runs ahead of the LLM orchestrator.
+
+    Embeds the query with the backend's MiniLM model and compares it with the
+    centroid of labelled example queries for each intent. A confident, single
+    intent is answered locally in the same OrchestratorOutput shape, with menu
+    and info parameters extracted by rules; anything else returns None and the
+    LLM decides. sentence-transformers is optional: without it the router is off.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = INTENT_ROUTER_ENABLED,
+        model_name: str = INTENT_ROUTER_MODEL,
+        examples_path: str = INTENT_ROUTER_EXAMPLES,
+        threshold: float = INTENT_ROUTER_THRESHOLD,
+        min_margin: float = INTENT_ROUTER_MIN_MARGIN,
+    ):
+        self.enabled = enabled
+        self.model_name = model_name
+        self.examples_path = examples_path
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        self._model = None
+        self._labels: List[str] = []
+        self._centroids = None
+        metrics.gauge("intent_router.hit_rate", lambda: metrics.ratio("intent_router.hits", "intent_router.fallbacks"))
+        metrics.gauge("intent_router.shadow_accuracy",
+                      lambda: metrics.ratio("intent_router.shadow_agree", "intent_router.shadow_disagree"))
+
+    def warmup(self) -> bool:
+        """Loads the model and builds the centroids. Blocking; returns whether the router is usable."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._centroids is None:
+                try:
+                    self._load()
+                except (ImportError, OSError) as e:
+                    # Missing sentence-transformers, or the model could not be downloaded
+                    print(f"Intent router disabled, model {self.model_name} could not be loaded: {e}")
+                    self.enabled = False
+                    return False
+        return True
+
+    def _load(self):
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        print(f"Loading intent router model {self.model_name}...")
+        self._model = SentenceTransformer(self.model_name)
+        with open(self.examples_path, encoding="utf-8") as f:
+            examples = json.load(f)
+
+        labels, centroids = [], []
+        for label, queries in examples.items():
+            vectors = self._model.encode([normalize_query(q) for q in queries], normalize_embeddings=True)
+            centroid = vectors.mean(axis=0)
+            labels.append(label)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self._labels = labels
+        self._centroids = np.stack(centroids)
+
+    def embed(self, normalized_query: str):
+        """Unit-length embedding of the query, or None when the model is not loaded. Blocking."""
+        if not self.enabled or self._centroids is None:
+            return None
+        return self._model.encode([normalized_query], normalize_embeddings=True)[0]
+
+    def scores(self, normalized_query: str) -> List[Tuple[str, float]]:
+        """(intent, cosine similarity) pairs, best first."""
+        vector = self._model.encode([normalized_query], normalize_embeddings=True)[0]
+        similarities = self._centroids @ vector
+        return sorted(zip(self._labels, similarities.tolist()), key=lambda pair: pair[1], reverse=True)
+
+    def route(self, query: str, chat_history: List[Dict[str, str]]) -> Optional[OrchestratorOutput]:
+        """
+        Classifies the query, or returns None to fall back to the LLM. Blocking
+        (runs the encoder), so call it through asyncio.to_thread.
+        """
+        if not self.warmup():
+            return None
+
+        normalized = normalize_query(query)
+        if not normalized:
+            return self._fallback("empty")
+        # The LLM sees the chat history, the router does not
+        if is_context_dependent(normalized, chat_history):
+            return self._fallback("followup")
+
+        with metrics.timer("intent_router.classify"):
+            ranked = self.scores(normalized)
+        (intent, best), (_, second) = ranked[0], ranked[1]
+        if best < self.threshold:
+            return self._fallback("low_confidence")
+        # Close runner-up: likely a multi-intent query ("menu and opening hours")
+        if best - second < self.min_margin:
+            return self._fallback("low_margin")
+
+        item = self._build_item(intent, query, normalized)
+        if item is None:
+            # e.g. a menu intent without a single usable parameter, which the LLM turns into a clarifying
+            # question, or small talk without a canned reply, which the LLM answers itself
+            return self._fallback("no_parameters")
+
+        metrics.incr("intent_router.hits")
+        metrics.incr(f"intent_router.hits.{intent}")
+        return OrchestratorOutput(query_types=[item])
+
+    def _build_item(self, intent: str, query: str, normalized: str) -> Optional[Dict]:
+        if intent == "menu":
+            params = extract_menu_parameters(normalized)
+            return {"type": "menu", "parameters": params} if params else None
+        if intent == "info":
+            return {"type": "info", "parameters": {"topic": extract_info_topic(normalized)}}
+        if intent == "escalation":
+            return {"type": "escalation", "parameters": {"topic": f"User asked for human assistance: {query.strip()[:200]}"}}
+        if intent == "chitchat":
+            # Only with a canned reply, so the turn is answered without the synthesizer
+            from agent_service.nodes.direct_responder import template_reply  # nodes import this module
+            reply = template_reply(query)
+            return {"type": "chitchat", "reply": reply} if reply else None
+        return None
+
+    def _fallback(self, reason: str) -> None:
+        metrics.incr("intent_router.fallbacks")
+        metrics.incr(f"intent_router.fallbacks.{reason}")
+        return None
+
+    def record_shadow(self, query: str, routed: OrchestratorOutput, llm_output: OrchestratorOutput):
+        """Compares a fast-path decision with the LLM's, for accuracy tracking."""
+        routed_types = sorted(item.type for item in routed.query_types)
+        llm_types = sorted(item.type for item in llm_output.query_types)
+        if routed_types == llm_types:
+            metrics.incr("intent_router.shadow_agree")
+        else:
+            metrics.incr("intent_router.shadow_disagree")
+            print(f"Intent router disagreed with the LLM on {query!r}: {routed_types} vs {llm_types}")
+
+
+intent_router = IntentRouter()
+
+
+def evaluate(router: IntentRouter, thresholds: List[float]):
+    """
+    Leave-one-out evaluation over the labelled examples: for every threshold,
+    the share of queries answered locally and how many of those were correct.
+    """
+    import numpy as np
+
+    router.enabled = True
+    router.warmup()
+    with open(router.examples_path, encoding="utf-8") as f:
+        examples = json.load(f)
+
+    encoded = {label: router._model.encode([normalize_query(q) for q in queries], normalize_embeddings=True)
+               for label, queries in examples.items()}
+    results = []  # (true label, predicted label, best, margin)
+    for label, vectors in encoded.items():
+        for i, vector in enumerate(vectors):
+            scored = []
+            for other, other_vectors in encoded.items():
+                pool = np.delete(other_vectors, i, axis=0) if other == label else other_vectors
+                centroid = pool.mean(axis=0)
+                scored.append((other, float(centroid @ vector / np.linalg.norm(centroid))))
+            scored.sort(key=lambda pair: pair[1], reverse=True)
+            results.append((label, scored[0][0], scored[0][1], scored[0][1] - scored[1][1]))
+
+    print(f"{len(results)} labelled queries, min margin {router.min_margin}")
+    for threshold in thresholds:
+        routed = [r for r in results if r[2] >= threshold and r[3] >= router.min_margin]
+        correct = sum(1 for r in routed if r[0] == r[1])
+        coverage = len(routed) / len(results)
+        accuracy = correct / len(routed) if routed else 0.0
+        print(f"threshold={threshold:.2f}  coverage={coverage:.1%}  accuracy={accuracy:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the fast-path intent router on its labelled examples.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    parser.add_argument("--min-margin", type=float, default=INTENT_ROUTER_MIN_MARGIN)
+    args = parser.parse_args()
+
+    evaluate(IntentRouter(min_margin=args.min_margin), args.thresholds)
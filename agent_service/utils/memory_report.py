@@ -0,0 +1,126 @@
+import argparse
+import random
+from typing import Dict, List, Tuple
+from agent_service.config import CHAT_ENCODING, CHAT_TTL_SECONDS, CHAT_MAX_MESSAGES
+from agent_service.utils.chat_codec import decode_message, encode_message, is_json, ormsgpack
+from agent_service.utils.redis import r, get_user_key, get_summary_key, get_results_key
+
+# Estimates Redis memory per active conversation (history + summary + last
+# retrieval results) from a sample of live keys, to size Redis for a target
+# number of concurrent users:
+#
+#   python -m agent_service.utils.memory_report --sample 500 --users 100000 500000
+
+
+def _percentile(values: List[int], q: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def sample_conversations(sample: int) -> Tuple[int, List[str]]:
+    """Counts active conversations and reservoir-samples up to `sample` user ids."""
+    prefix = get_user_key("")
+    total, chosen = 0, []
+    for key in r.scan_iter(match=f"{prefix}*", count=1000):
+        total += 1
+        user_id = key.decode()[len(prefix):]
+        if len(chosen) < sample:
+            chosen.append(user_id)
+        else:
+            slot = random.randrange(total)
+            if slot < sample:
+                chosen[slot] = user_id
+    return total, chosen
+
+
+def measure(user_ids: List[str]) -> Dict:
+    """Per-conversation Redis bytes (MEMORY USAGE) and entry encodings for the sampled users."""
+    pipe = r.pipeline(transaction=False)
+    for user_id in user_ids:
+        for key in (get_user_key(user_id), get_summary_key(user_id), get_results_key(user_id)):
+            pipe.memory_usage(key, samples=0)
+        pipe.lrange(get_user_key(user_id), 0, -1)
+    replies = pipe.execute()
+
+    per_conversation, history_bytes, summary_bytes, results_bytes = [], [], [], []
+    messages = json_entries = compact_entries = 0
+    json_size = compact_size = 0
+    for i in range(len(user_ids)):
+        history, summary, results, entries = replies[4 * i:4 * i + 4]
+        history, summary, results = history or 0, summary or 0, results or 0
+        per_conversation.append(history + summary + results)
+        history_bytes.append(history)
+        summary_bytes.append(summary)
+        results_bytes.append(results)
+        for raw in entries:
+            messages += 1
+            if is_json(raw):
+                json_entries += 1
+            else:
+                compact_entries += 1
+            message = decode_message(raw)
+            json_size += len(encode_message(message["role"], message["content"], compact=False).encode())
+            if ormsgpack is not None:
+                compact_size += len(encode_message(message["role"], message["content"], compact=True))
+
+    count = len(user_ids) or 1
+    return {
+        "sampled": len(user_ids),
+        "bytes_per_conversation": {
+            "avg": round(sum(per_conversation) / count),
+            "p50": _percentile(per_conversation, 0.50),
+            "p95": _percentile(per_conversation, 0.95),
+            "max": max(per_conversation, default=0),
+        },
+        "avg_bytes": {
+            "history": round(sum(history_bytes) / count),
+            "summary": round(sum(summary_bytes) / count),
+            "results": round(sum(results_bytes) / count),
+        },
+        "messages_per_conversation": round(messages / count, 1),
+        "entries": {"json": json_entries, "msgpack": compact_entries},
+        # Payload bytes of the sampled messages in each format (excluding Redis overhead)
+        "payload_bytes": {"json": json_size, "msgpack": compact_size if ormsgpack is not None else None},
+    }
+
+
+def report(sample: int, users: List[int]):
+    total, user_ids = sample_conversations(sample)
+    stats = measure(user_ids)
+    memory = r.info("memory")
+
+    print(f"Active conversations: {total} (TTL {CHAT_TTL_SECONDS}s, up to {CHAT_MAX_MESSAGES} messages, "
+          f"CHAT_ENCODING={CHAT_ENCODING})")
+    print(f"Redis used_memory: {memory.get('used_memory_human')}, "
+          f"fragmentation ratio: {memory.get('mem_fragmentation_ratio')}")
+    if not user_ids:
+        return
+    per_conversation = stats["bytes_per_conversation"]
+    print(f"Sampled {stats['sampled']} conversations, {stats['messages_per_conversation']} messages each on average")
+    print("Bytes per conversation: " + ", ".join(f"{k} {v}" for k, v in per_conversation.items()))
+    print("Average bytes by key: " + ", ".join(f"{k} {v}" for k, v in stats["avg_bytes"].items()))
+    print(f"Entries: {stats['entries']['json']} JSON, {stats['entries']['msgpack']} msgpack")
+
+    payload = stats["payload_bytes"]
+    if payload["msgpack"]:
+        print(f"Message payloads: {payload['json']} bytes as JSON, {payload['msgpack']} as msgpack "
+              f"({100 * (1 - payload['msgpack'] / payload['json']):.0f}% smaller)")
+    elif payload["msgpack"] is None:
+        print("Install ormsgpack to estimate the msgpack encoding's savings")
+
+    fragmentation = memory.get("mem_fragmentation_ratio") or 1.0
+    for n in users:
+        avg = n * per_conversation["avg"] * max(1.0, fragmentation)
+        p95 = n * per_conversation["p95"] * max(1.0, fragmentation)
+        print(f"{n} concurrent conversations: ~{avg / 2**20:.0f} MiB (at p95 size: ~{p95 / 2**20:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate Redis memory per active conversation.")
+    parser.add_argument("--sample", type=int, default=200, help="Conversations to measure.")
+    parser.add_argument("--users", type=int, nargs="*", default=[100_000, 500_000],
+                        help="Concurrent conversation counts to project memory for.")
+    args = parser.parse_args()
+    report(args.sample, args.users)
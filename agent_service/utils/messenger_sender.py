@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+
+import httpx
+from agent_service.config import (
+    GRAPH_API_URL, SEND_RATE_PER_SECOND, SEND_BURST, SEND_MAX_RETRIES,
+    SEND_BACKOFF_BASE_SECONDS, SEND_BACKOFF_MAX_SECONDS, SEND_TIMEOUT_SECONDS, SEND_MAX_CONNECTIONS,
+)
+from agent_service.utils.metrics import metrics
+
+# Responses that say the message was not accepted: rate limited or unavailable.
+# A 500/504 may come after Meta delivered it, and a retry would send it twice
+RETRYABLE_STATUS = {429, 503}
+# Failures before the request reached Meta
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns how long the caller was held back."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class MessengerSender:
+    """
+    Outbound client for the Messenger Send API with its own keep-alive pool,
+    a token bucket per page so reply bursts drain at the allowed rate, and
+    retries with full-jitter exponential backoff.
+
+    Sending a message is not idempotent: it is only retried when it provably
+    was not accepted (connect errors, 429/503). A read timeout or a 500 may
+    follow a delivered message, so those are not retried. Sender actions
+    (typing indicators) are harmless to repeat and retry on any network error
+    or 5xx.
+    """
+
+    def __init__(
+        self,
+        access_token: Optional[str],
+        base_url: str = GRAPH_API_URL,
+        rate: float = SEND_RATE_PER_SECOND,
+        burst: int = SEND_BURST,
+        max_retries: int = SEND_MAX_RETRIES,
+    ):
+        self.access_token = access_token
+        self.base_url = base_url
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(max_connections=SEND_MAX_CONNECTIONS, max_keepalive_connections=SEND_MAX_CONNECTIONS),
+                timeout=SEND_TIMEOUT_SECONDS,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send_text(self, recipient_id: str, text: str, page_id: Optional[str] = None) -> bool:
+        payload = {
+            "messaging_type": "RESPONSE",
+            "recipient": {"id": recipient_id},
+            "message": {"text": text},
+        }
+        ok = await self._post(payload, page_id, idempotent=False)
+        if ok:
+            print(f"Reply sent to {recipient_id}: {text[:30]}...")
+        return ok
+
+    async def send_action(self, recipient_id: str, action: str, page_id: Optional[str] = None) -> bool:
+        """Sends a sender action such as 'typing_on' or 'mark_seen'."""
+        payload = {"recipient": {"id": recipient_id}, "sender_action": action}
+        return await self._post(payload, page_id, idempotent=True)
+
+    def _bucket(self, page_id: Optional[str]) -> TokenBucket:
+        key = page_id or "me"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def _post(self, payload: dict, page_id: Optional[str], idempotent: bool) -> bool:
+        if not self.access_token:
+            print("ERROR: Missing FB_PAGE_ACCESS_TOKEN")
+            return False
+
+        started = time.perf_counter()
+        bucket = self._bucket(page_id)
+        for attempt in range(self.max_retries + 1):
+            waited = await bucket.acquire()
+            if waited:
+                metrics.observe("send.rate_limit_wait", waited)
+
+            retry_after = None
+            try:
+                with metrics.timer("send.request"):
+                    response = await self.client.post(
+                        "/me/messages", params={"access_token": self.access_token}, json=payload
+                    )
+                if response.status_code < 400:
+                    metrics.incr("send.ok")
+                    metrics.observe("send.latency", time.perf_counter() - started)
+                    return True
+                retryable = response.status_code in RETRYABLE_STATUS or (idempotent and response.status_code >= 500)
+                if not retryable:
+                    metrics.incr("send.failed")
+                    print(f"Failed to send message: {response.status_code} {response.text[:200]}")
+                    return False
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+                if not idempotent and not isinstance(e, NOT_SENT_ERRORS):
+                    # e.g. a read timeout: the message may have been delivered already
+                    metrics.incr("send.failed")
+                    metrics.incr("send.not_retried")
+                    print(f"Failed to send message, not retried as it may have been delivered: {error}")
+                    return False
+
+            if attempt == self.max_retries:
+                break
+            metrics.incr("send.retries")
+            backoff = random.uniform(0, min(SEND_BACKOFF_MAX_SECONDS, SEND_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            await asyncio.sleep(max(backoff, retry_after or 0))
+
+        metrics.incr("send.failed")
+        metrics.observe("send.latency", time.perf_counter() - started)
+        print(f"Failed to send message after {self.max_retries + 1} attempts: {error}")
+        return False
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return min(float(value), SEND_BACKOFF_MAX_SECONDS) if value else None
+    except ValueError:
+        return None
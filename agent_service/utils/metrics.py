@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+
+class LatencyStat:
+    """Rolling window of observations (seconds) with count and percentile summary."""
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(1000 * self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(1000 * self.percentile(0.50), 2),
+            "p95_ms": round(1000 * self.percentile(0.95), 2),
+            "p99_ms": round(1000 * self.percentile(0.99), 2),
+            "max_ms": round(1000 * max(self.samples), 2) if self.samples else 0.0,
+        }
+
+
+class Metrics:
+    """
+    Process-wide counters and latency stats. Cheap enough to call on every
+    message; exported as JSON by the webhook's /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.latencies: Dict[str, LatencyStat] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stat = self.latencies.get(name)
+            if stat is None:
+                stat = self.latencies[name] = LatencyStat()
+            stat.observe(seconds)
+
+    def timer(self, name: str):
+        return _Timer(self, name)
+
+    def gauge(self, name: str, fn):
+        """Registers a callable evaluated at snapshot time."""
+        self.gauges[name] = fn
+
+    def ratio(self, hits: str, misses: str) -> float:
+        h = self.counters.get(hits, 0)
+        total = h + self.counters.get(misses, 0)
+        return round(h / total, 4) if total else 0.0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            latency = {k: v.summary() for k, v in self.latencies.items()}
+        return {
+            "counters": counters,
+            "latency": latency,
+            "gauges": {k: fn() for k, fn in self.gauges.items()},
+        }
+
+
+class _Timer:
+    def __init__(self, registry: Metrics, name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+metrics = Metrics()
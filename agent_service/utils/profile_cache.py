@@ -0,0 +1,76 @@
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from agent_service.config import (
+    PROFILE_CACHE_TTL_SECONDS, PROFILE_CACHE_NEGATIVE_TTL_SECONDS, PROFILE_CACHE_MAXSIZE, PROFILE_CACHE_REDIS
+)
+from agent_service.utils.metrics import metrics
+from agent_service.utils.redis import get_async_redis
+from agent_service.utils.ttl_cache import TTLCache
+
+_MISSING = object()
+# Stored for failed lookups so a broken profile is not re-fetched on every message
+_NEGATIVE = ""
+
+
+class ProfileCache:
+    """
+    Caches Messenger display names per sender: an in-process LRU with TTL, and
+    optionally a Redis layer shared by every webhook/worker process.
+    """
+
+    def __init__(
+        self,
+        ttl: int = PROFILE_CACHE_TTL_SECONDS,
+        negative_ttl: int = PROFILE_CACHE_NEGATIVE_TTL_SECONDS,
+        maxsize: int = PROFILE_CACHE_MAXSIZE,
+        use_redis: bool = PROFILE_CACHE_REDIS,
+        prefix: str = "profile:",
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.use_redis = use_redis
+        self.prefix = prefix
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        metrics.gauge("profile_cache.hit_rate", lambda: metrics.ratio("profile_cache.hits", "profile_cache.misses"))
+
+    async def get_or_fetch(self, sender_id: str, fetch: Callable[[str], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Returns the cached name, or calls `fetch` (which returns None on failure)
+        and caches the result. Returns None for a cached or fresh failure.
+        """
+        cached = self._local.get(sender_id, _MISSING)
+        if cached is _MISSING and self.use_redis:
+            cached = await self._redis_get(sender_id)
+            if cached is not _MISSING:
+                self._local.set(sender_id, cached, ttl=self._ttl_for(cached))
+
+        if cached is not _MISSING:
+            metrics.incr("profile_cache.hits")
+            return cached or None
+
+        metrics.incr("profile_cache.misses")
+        with metrics.timer("profile_cache.fetch"):
+            name = await fetch(sender_id)
+
+        value = name or _NEGATIVE
+        self._local.set(sender_id, value, ttl=self._ttl_for(value))
+        if self.use_redis:
+            await self._redis_set(sender_id, value)
+        return name
+
+    def _ttl_for(self, value: str) -> int:
+        return self.ttl if value else self.negative_ttl
+
+    async def _redis_get(self, sender_id: str):
+        try:
+            value = await get_async_redis().get(self.prefix + sender_id)
+        except RedisError as e:
+            print(f"Profile cache Redis read failed: {e}")
+            return _MISSING
+        return _MISSING if value is None else value
+
+    async def _redis_set(self, sender_id: str, value: str):
+        try:
+            await get_async_redis().set(self.prefix + sender_id, value, ex=self._ttl_for(value))
+        except RedisError as e:
+            print(f"Profile cache Redis write failed: {e}")
@@ -1,26 +1,70 @@
-import redis, json
-from agent_service.config import REDIS_HOST, REDIS_PASSWORD, REDIS_PORT, REDIS_USERNAME, CHAT_TTL_SECONDS, CHAT_MAX_MESSAGES
+import asyncio
+import redis
+import redis.asyncio as aioredis
+from agent_service.config import (
+    REDIS_HOST, REDIS_PASSWORD, REDIS_PORT, REDIS_USERNAME, REDIS_MAX_CONNECTIONS, CHAT_TTL_SECONDS, CHAT_MAX_MESSAGES,
+)
+from agent_service.utils.chat_codec import encode_message, decode_message
+# Raw bytes: history entries may be msgpack-encoded (see chat_codec)
 r = redis.Redis(
     host= REDIS_HOST,
     port= REDIS_PORT,
-    decode_responses=True,
+    decode_responses=False,
     username= REDIS_USERNAME,
     password= REDIS_PASSWORD,
 )
 
+# One asyncio client (connection pool) per event loop and response mode. asyncio
+# connections are bound to the loop that opened them, so scripts that call
+# asyncio.run() repeatedly (code_runner) get a fresh pool, like utils/http.py.
+_async_clients: dict = {}
+
+def get_async_redis(decode_responses: bool = True) -> aioredis.Redis:
+    """
+    Returns the asyncio client for the same Redis as `r` on the running event
+    loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [key for key in _async_clients if key[0].is_closed()]:
+        _async_clients.pop(stale)
+
+    client = _async_clients.get((loop, decode_responses))
+    if client is None:
+        client = _async_clients[(loop, decode_responses)] = aioredis.Redis(
+            host= REDIS_HOST,
+            port= REDIS_PORT,
+            decode_responses=decode_responses,
+            username= REDIS_USERNAME,
+            password= REDIS_PASSWORD,
+            max_connections=REDIS_MAX_CONNECTIONS,
+        )
+    return client
+
 def get_user_key(user_id: str):
     return f"chat_history:{user_id}"
 
+def get_summary_key(user_id: str):
+    return f"chat_summary:{user_id}"
+
+def get_results_key(user_id: str):
+    return f"chat_results:{user_id}"
+
 def save_message(user_id: str, role: str, content: str):
+    """Blocking append for scripts; the agent itself uses the async ChatStore."""
     user_key = get_user_key(user_id)  # <- use here
-    msg = json.dumps({"role": role, "content": content})
-    r.rpush(user_key, msg)
-    r.ltrim(user_key, -CHAT_MAX_MESSAGES, -1)
-    r.expire(user_key, CHAT_TTL_SECONDS)
+    msg = encode_message(role, content)
+    pipe = r.pipeline(transaction=False)
+    pipe.rpush(user_key, msg)
+    pipe.ltrim(user_key, -CHAT_MAX_MESSAGES, -1)
+    pipe.expire(user_key, CHAT_TTL_SECONDS)
+    # The summary of older turns and the last retrieval results live as long as the conversation
+    pipe.expire(get_summary_key(user_id), CHAT_TTL_SECONDS)
+    pipe.expire(get_results_key(user_id), CHAT_TTL_SECONDS)
+    pipe.execute()
 
 def load_history(user_id: str):
     user_key = get_user_key(user_id)  # <- and here
     history = []
     for msg_json in r.lrange(user_key, 0, -1):
-        history.append(json.loads(msg_json))
-    return history
\ No newline at end of file
+        history.append(decode_message(msg_json))
+    return history
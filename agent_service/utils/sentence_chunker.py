@@ -0,0 +1,55 @@
+import re
+from typing import List
+
+# End of a sentence: terminal punctuation (optionally closed by a quote/bracket) followed by whitespace
+_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+# Messenger rejects text messages longer than this
+MESSENGER_MAX_CHARS = 2000
+
+
+class SentenceChunker:
+    """
+    Turns a stream of text deltas into Messenger-sized messages split at sentence
+    boundaries. Sentences are grouped until a chunk reaches `min_chars`, so a
+    streamed answer arrives as a few readable messages rather than one per sentence.
+    """
+
+    def __init__(self, min_chars: int = 80, max_chars: int = MESSENGER_MAX_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        chunks = []
+        while True:
+            cut = self._next_cut()
+            if cut is None:
+                break
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest[i:i + self.max_chars] for i in range(0, len(rest), self.max_chars)] if rest else []
+
+    def _next_cut(self):
+        # First sentence boundary past min_chars that still fits in one message
+        last_fit = None
+        for match in _BOUNDARY.finditer(self._buffer):
+            if match.end() > self.max_chars:
+                break
+            last_fit = match.end()
+            if match.start() >= self.min_chars:
+                return last_fit
+
+        if len(self._buffer) > self.max_chars:
+            if last_fit:
+                return last_fit
+            # No sentence boundary at all: split at the last space before the limit
+            space = self._buffer.rfind(" ", 0, self.max_chars)
+            return space if space > 0 else self.max_chars
+        return None
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from agent_service.nodes.info_agent import search_knowledge
+from agent_service.nodes.menu_agent import fetch_menu_items
+from agent_service.utils.classification_cache import normalize_query
+from agent_service.utils.intent_router import extract_menu_parameters, is_menu_request, match_info_topic
+from agent_service.utils.metrics import metrics
+
+metrics.gauge("speculative.hit_rate", lambda: metrics.ratio("speculative.hits", "speculative.wasted"))
+metrics.gauge("speculative.wasted_rate", lambda: metrics.ratio("speculative.wasted", "speculative.hits"))
+
+
+def _canonical(params: Dict) -> Dict:
+    """Parameters in a comparable form: normalized strings, float numbers, no empty values."""
+    canonical = {}
+    for key, value in (params or {}).items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = normalize_query(value)
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        canonical[key] = value
+    return canonical
+
+
+class _Guess:
+    def __init__(self, kind: str, key: Any, coro):
+        self.kind = kind
+        self.key = key
+        self.started_at = time.perf_counter()
+        self.task = asyncio.create_task(coro)
+        self.used = False
+        metrics.incr(f"speculative.started.{kind}")
+
+    async def take(self):
+        self.used = True
+        head_start = time.perf_counter() - self.started_at
+        result = await self.task
+        if isinstance(result, dict) and "error" in result:
+            # Let the agent make the real call (and its own error handling) instead
+            metrics.incr(f"speculative.errors.{self.kind}")
+            metrics.incr("speculative.wasted")
+            return None
+        metrics.incr("speculative.hits")
+        metrics.incr(f"speculative.hits.{self.kind}")
+        metrics.observe("speculative.head_start", head_start)
+        return result
+
+
+class SpeculativeRetrieval:
+    """
+    Starts a menu search and a knowledge base search on the raw user query
+    while the orchestrator is still classifying it. menu_agent / info_agent
+    take a result only if the orchestrator extracted the same parameters; a
+    guess nobody took, or took with different parameters, is counted as waste.
+
+    Guessed parameters come from the intent router's rules, so a turn the
+    router classified always matches. A search is only started when the rules
+    are confident the query is about the menu (is_menu_request) or a known
+    knowledge base topic; other turns (small talk, vague questions) start none.
+    """
+
+    def __init__(self, query: str, deadline: Optional[float] = None):
+        normalized = normalize_query(query)
+        self._menu: Optional[_Guess] = None
+        self._kb: Optional[_Guess] = None
+
+        menu_params = extract_menu_parameters(normalized) if is_menu_request(normalized) else None
+        if menu_params:
+            self._menu = _Guess("menu", _canonical(menu_params), fetch_menu_items(menu_params, deadline))
+        # Only a known topic keyword is likely to equal the orchestrator's topic
+        topic = match_info_topic(normalized)
+        if topic:
+            self._kb = _Guess("kb", topic, search_knowledge(topic, deadline))
+        if self._menu is None and self._kb is None:
+            metrics.incr("speculative.skipped")
+
+    async def take_menu(self, params: Dict):
+        """The speculative /items result if it was fetched with `params`, else None."""
+        return await self._take(self._menu, _canonical(params))
+
+    async def take_kb(self, topic: str):
+        """The speculative knowledge base result if it searched `topic`, else None."""
+        return await self._take(self._kb, normalize_query(topic or ""))
+
+    async def _take(self, guess: Optional[_Guess], key: Any):
+        if guess is None or guess.used:
+            return None
+        if guess.key != key:
+            metrics.incr(f"speculative.mismatch.{guess.kind}")
+            return None
+        return await guess.take()
+
+    def finish(self):
+        """Cancels and counts guesses that were never used. Call once the turn is done."""
+        for guess in (self._menu, self._kb):
+            if guess is None or guess.used:
+                continue
+            metrics.incr("speculative.wasted")
+            metrics.incr(f"speculative.wasted.{guess.kind}")
+            if guess.task.done():
+                metrics.incr(f"speculative.wasted_calls.{guess.kind}")
+            else:
+                guess.task.cancel()
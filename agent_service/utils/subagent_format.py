@@ -0,0 +1,126 @@
+from typing import Dict, List, Tuple
+from agent_service.config import SUBAGENT_TEXT_MAX_CHARS, MENU_DESCRIPTION_MAX_CHARS
+from agent_service.utils.degraded_answer import format_price
+from agent_service.utils.history import estimate_tokens, truncate_text
+from agent_service.utils.metrics import metrics
+
+# Compact, token-budgeted rendering of subagent outputs for the synthesizer prompt.
+# Each output becomes a header line plus one line per result, best match first.
+
+# Below this many characters a truncated result is not worth including
+MIN_TRUNCATED_CHARS = 40
+
+
+def _price_range(variations: List[Dict]) -> str:
+    prices = []
+    for v in variations:
+        try:
+            prices.append(float(v.get("final_price")))
+        except (TypeError, ValueError):
+            continue
+    if not prices:
+        return ""
+    low, high = min(prices), max(prices)
+    if low == high:
+        return format_price(low)
+    return f"{format_price(low)}–{format_price(high)}"
+
+
+def _menu_line(item: Dict) -> str:
+    variations = [v for v in item.get("variations") or [] if v.get("is_available", True)]
+    category = "/".join(c for c in (item.get("category_name"), item.get("subcategory")) if c)
+    parts = [item.get("name") or "Item"]
+    if category:
+        parts.append(category)
+    price = _price_range(variations)
+    if price:
+        labels = ", ".join(v.get("label") for v in variations if v.get("label"))
+        parts.append(f"{price} ({labels})" if len(variations) > 1 and labels else price)
+    if not item.get("is_available", True) or (item.get("variations") and not variations):
+        parts.append("unavailable")
+    if item.get("description"):
+        parts.append(truncate_text(item["description"], MENU_DESCRIPTION_MAX_CHARS))
+    return "- " + " | ".join(parts)
+
+
+def _info_line(passage: Dict) -> str:
+    topic = f"[{passage['topic']}] " if passage.get("topic") else ""
+    return f"- {topic}{truncate_text(passage.get('content'), SUBAGENT_TEXT_MAX_CHARS)}"
+
+
+def _result_lines(sa_type: str, output) -> List[str]:
+    """One line per result, in the order the subagent ranked them."""
+    if output is None:
+        return []
+    if isinstance(output, dict) and "error" in output:
+        return [f"- error: {truncate_text(str(output['error']), SUBAGENT_TEXT_MAX_CHARS)}"]
+    if sa_type in ("menu", "info") and output == []:
+        return ["- (no results)"]
+    if sa_type == "menu" and isinstance(output, list):
+        return [_menu_line(item) for item in output if isinstance(item, dict)]
+    if sa_type == "info" and isinstance(output, list):
+        return [_info_line(p) for p in output if isinstance(p, dict) and p.get("content")]
+    if sa_type == "escalation" and isinstance(output, dict):
+        return [f"- {output.get('status')}: {truncate_text(output.get('message'), SUBAGENT_TEXT_MAX_CHARS)}"]
+    if isinstance(output, list):
+        return [f"- {truncate_text(str(o), SUBAGENT_TEXT_MAX_CHARS)}" for o in output]
+    return [f"- {truncate_text(str(output), SUBAGENT_TEXT_MAX_CHARS)}"]
+
+
+def _header(sa: Dict) -> str:
+    params = sa.get("parameters") or {}
+    rendered = ", ".join(f"{k}={v}" for k, v in params.items() if k != "user_name" and v is not None)
+    source = " [from the previous answer's results]" if sa.get("source") == "previous_turn" else ""
+    return f"Subagent: {sa.get('type')}" + (f" ({rendered})" if rendered else "") + source
+
+
+def serialize_subagent_outputs(subagent_outputs: List[Dict], max_tokens: int) -> Tuple[str, Dict[str, int]]:
+    """
+    Renders subagent outputs within `max_tokens`. Headers are always kept; results
+    are taken round-robin across subagents, best-ranked first, so when the budget
+    runs out it is the lowest-ranked results of each subagent that are dropped.
+    A result that no longer fits is truncated if it is the first of its subagent.
+    Returns the text and counts of results kept, truncated and dropped.
+    """
+    sections = [(_header(sa), _result_lines(sa.get("type"), sa.get("output"))) for sa in subagent_outputs or []]
+    kept: List[List[str]] = [[] for _ in sections]
+    stats = {"kept": 0, "truncated": 0, "dropped": 0}
+
+    used = sum(estimate_tokens(header) for header, _ in sections)
+    rank = 0
+    while any(rank < len(lines) for _, lines in sections):
+        for i, (_, lines) in enumerate(sections):
+            if rank >= len(lines):
+                continue
+            line = lines[rank]
+            cost = estimate_tokens(line)
+            if used + cost <= max_tokens:
+                kept[i].append(line)
+                used += cost
+                stats["kept"] += 1
+            elif not kept[i] and (max_tokens - used) * 4 >= MIN_TRUNCATED_CHARS:
+                line = truncate_text(line, (max_tokens - used) * 4 - 4)
+                kept[i].append(line)
+                used += estimate_tokens(line)
+                stats["truncated"] += 1
+            else:
+                stats["dropped"] += 1
+        rank += 1
+
+    blocks = []
+    for (header, lines), shown in zip(sections, kept):
+        body = shown
+        if len(shown) < len(lines):
+            body = body + [f"- …{len(lines) - len(shown)} more not shown"]
+        blocks.append("\n".join([header] + body))
+    return "\n\n".join(blocks), stats
+
+
+def record_prompt_size(node: str, prompt_text: str, subagent_text: str, stats: Dict[str, int]):
+    """Prompt-size metrics per node: estimated tokens and how many results the budget cut."""
+    metrics.incr(f"prompt.{node}.prompts")
+    metrics.incr(f"prompt.{node}.tokens", estimate_tokens(prompt_text))
+    metrics.incr(f"prompt.{node}.subagent_tokens", estimate_tokens(subagent_text))
+    metrics.incr(f"prompt.{node}.results_kept", stats.get("kept", 0))
+    metrics.incr(f"prompt.{node}.results_truncated", stats.get("truncated", 0))
+    metrics.incr(f"prompt.{node}.results_dropped", stats.get("dropped", 0))
@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional
+from agent_service.config import TURN_RESULTS_MAX_ITEMS, SUBAGENT_TEXT_MAX_CHARS, MENU_DESCRIPTION_MAX_CHARS
+from agent_service.utils.classification_cache import normalize_query
+from agent_service.utils.history import truncate_text
+
+# The previous turn's retrieval results, kept next to the chat history so that
+# follow-ups about them are answered by filtering locally.
+
+# Picking one of them by position: "the second one", "the last dish"
+_ORDINAL = re.compile(r"\bthe (first|second|third|fourth|fifth|last|1st|2nd|3rd|4th|5th) (?:one|item|dish)\b")
+# The user is talking about the results they were just shown
+_REFERENCE = re.compile(
+    r"\b(those|these|them|of the ones|any of|which one|which ones|that one|this one)\b|" + _ORDINAL.pattern
+)
+_ORDINAL_INDEX = {
+    "first": 0, "1st": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2,
+    "fourth": 3, "4th": 3, "fifth": 4, "5th": 4, "last": -1,
+}
+
+
+def _compact_item(item: Dict) -> Dict:
+    return {
+        "id": item.get("id"),
+        "name": item.get("name"),
+        "category_name": item.get("category_name"),
+        "subcategory": item.get("subcategory"),
+        "description": truncate_text(item.get("description"), MENU_DESCRIPTION_MAX_CHARS) or None,
+        "is_available": item.get("is_available", True),
+        "variations": [
+            {"label": v.get("label"), "final_price": str(v.get("final_price")), "is_available": v.get("is_available", True)}
+            for v in item.get("variations") or []
+        ],
+    }
+
+
+def compact_results(subagent_outputs: List[Dict]) -> List[Dict]:
+    """
+    The successful menu and info results of a turn, with only the fields the
+    synthesizer uses and at most TURN_RESULTS_MAX_ITEMS items per result.
+    """
+    results = []
+    for sa in subagent_outputs or []:
+        output = sa.get("output")
+        if not isinstance(output, list):
+            continue
+        if sa.get("type") == "menu":
+            output = [_compact_item(i) for i in output[:TURN_RESULTS_MAX_ITEMS] if isinstance(i, dict)]
+        elif sa.get("type") == "info":
+            output = [
+                {"topic": p.get("topic"), "content": truncate_text(p.get("content"), SUBAGENT_TEXT_MAX_CHARS)}
+                for p in output[:TURN_RESULTS_MAX_ITEMS] if isinstance(p, dict)
+            ]
+        else:
+            continue
+        results.append({"type": sa["type"], "parameters": sa.get("parameters") or {}, "output": output})
+    return results
+
+
+def _price_matches(item: Dict, price_min: Optional[float], price_max: Optional[float]) -> bool:
+    for v in item.get("variations") or []:
+        try:
+            price = float(v.get("final_price"))
+        except (TypeError, ValueError):
+            continue
+        if (price_min is None or price >= price_min) and (price_max is None or price <= price_max):
+            return True
+    return False
+
+
+def _search_matches(item: Dict, words: List[str]) -> bool:
+    text = normalize_query(" ".join(str(item.get(k) or "") for k in ("name", "category_name", "description")))
+    return all(word in text for word in words)
+
+
+def refine_menu(query: str, params: Dict, previous_results: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Answers a menu follow-up from the previous turn's items when the query refers
+    to them ("which of those is veg?", "how much is the second one?"): filters by
+    the type and price parameters, then picks the item by position if one is
+    named. A search for something else only counts if it matches some of the
+    previous items.
+    Returns None when the backend should be queried instead; an empty list is a
+    valid answer ("none of those are veg").
+    """
+    normalized = normalize_query(query or "")
+    if not _REFERENCE.search(normalized):
+        return None
+    previous = next((r for r in reversed(previous_results or []) if r.get("type") == "menu" and r.get("output")), None)
+    if previous is None:
+        return None
+    items = previous["output"]
+
+    search = normalize_query(params.get("search") or "")
+    if search and search != normalize_query(previous["parameters"].get("search") or ""):
+        items = [i for i in items if _search_matches(i, search.split())]
+        if not items:
+            return None
+    if params.get("type"):
+        items = [i for i in items if (i.get("subcategory") or "").lower() == params["type"].lower()]
+    if params.get("price_min") is not None or params.get("price_max") is not None:
+        items = [i for i in items if _price_matches(i, params.get("price_min"), params.get("price_max"))]
+
+    ordinal = _ORDINAL.search(normalized)
+    if ordinal:
+        index = _ORDINAL_INDEX[ordinal.group(1)]
+        if not items or index >= len(items):
+            return None
+        return [items[index]]
+    return items
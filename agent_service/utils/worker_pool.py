@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from agent_service.utils.metrics import metrics
+
+
+class KeyedWorkerPool:
+    """
+    Bounded pool of asyncio workers that runs jobs for different keys in parallel
+    while keeping jobs for the same key (e.g. a Messenger sender id) strictly in
+    submission order.
+
+    Each key owns a FIFO; a key is handed to at most one worker at a time, and is
+    re-queued behind other ready keys after each job so one chatty user cannot
+    starve the rest.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, Any], Awaitable[None]],
+        workers: int = 8,
+        max_pending: int = 1000,
+        name: str = "pool",
+    ):
+        self.handler = handler
+        self.num_workers = workers
+        self.max_pending = max_pending
+        self.name = name
+
+        self._pending: Dict[Hashable, Deque[Tuple[float, Any]]] = {}
+        self._ready: "asyncio.Queue[Hashable]" = asyncio.Queue()
+        self._scheduled = set()
+        self._depth = 0
+        self._in_flight = 0
+        self._tasks = []
+
+        metrics.gauge(f"{name}.queue_depth", lambda: self._depth)
+        metrics.gauge(f"{name}.in_flight", lambda: self._in_flight)
+        metrics.gauge(f"{name}.active_keys", lambda: len(self._scheduled))
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = 30):
+        """Stops the workers, optionally waiting for queued jobs to finish first."""
+        if drain:
+            deadline = time.monotonic() + (timeout or 0)
+            while (self._depth or self._in_flight) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def is_full(self) -> bool:
+        return self._depth >= self.max_pending
+
+    def submit(self, key: Hashable, item: Any, force: bool = False) -> bool:
+        """
+        Enqueues a job without blocking. Returns False when the pool is full so the
+        caller can shed load (e.g. answer 503 and let Meta redeliver). `force`
+        skips the bound for work that was already accepted upstream.
+        """
+        if self.is_full and not force:
+            metrics.incr(f"{self.name}.rejected")
+            return False
+
+        self._pending.setdefault(key, deque()).append((time.monotonic(), item))
+        self._depth += 1
+        metrics.incr(f"{self.name}.submitted")
+
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put_nowait(key)
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            enqueued_at, item = queue.popleft()
+            self._depth -= 1
+            self._in_flight += 1
+            metrics.observe(f"{self.name}.wait", time.monotonic() - enqueued_at)
+
+            try:
+                with metrics.timer(f"{self.name}.run"):
+                    await self.handler(key, item)
+                metrics.incr(f"{self.name}.processed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr(f"{self.name}.failed")
+                print(f"❌ Worker error for {key}: {e}")
+            finally:
+                self._in_flight -= 1
+                if queue:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                    self._scheduled.discard(key)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.num_workers,
+            "queue_depth": self._depth,
+            "in_flight": self._in_flight,
+            "active_keys": len(self._scheduled),
+            "max_pending": self.max_pending,
+        }
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+from agent_service.config import STREAM_PARTITIONS, WEBHOOK_WORKERS, WEBHOOK_MAX_PENDING
+from agent_service.messenger import TurnQueue, sender
+from agent_service.utils.http import close_http_client
+from agent_service.utils.inbound_stream import StreamConsumer
+from agent_service.utils.metrics import metrics
+
+
+async def run_worker(worker_index: int, num_workers: int, concurrency: int, metrics_interval: float):
+    """
+    Stateless agent worker for INGRESS_MODE=stream: consumes the Redis Stream
+    partitions owned by `worker_index` and runs each turn through the agent graph.
+    No other worker takes over these partitions, so each index has to be
+    restarted when it exits (e.g. a restart policy per index).
+    """
+    partitions = [p for p in range(STREAM_PARTITIONS) if p % num_workers == worker_index]
+    if not partitions:
+        raise SystemExit(f"Worker {worker_index} owns no partitions (STREAM_PARTITIONS={STREAM_PARTITIONS})")
+
+    consumer = None
+
+    async def ack_turn(sender_id, messages):
+        await consumer.ack(messages)
+
+    turns = TurnQueue(name="worker", workers=concurrency, max_pending=WEBHOOK_MAX_PENDING, after_turn=ack_turn)
+
+    async def handle(message):
+        turns.add(message)
+
+    # The consumer name is tied to the index so a restarted worker picks up its own pending entries
+    consumer = StreamConsumer(partitions, f"worker-{worker_index}", handle, has_capacity=lambda: not turns.is_full)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, consumer.stop)
+
+    async def report():
+        while True:
+            await asyncio.sleep(metrics_interval)
+            print(json.dumps({"worker": worker_index, "pool": turns.stats(), **metrics.snapshot()}))
+
+    print(f"Worker {worker_index}/{num_workers} consuming partitions {partitions}")
+    await turns.start()
+    reporter = asyncio.create_task(report()) if metrics_interval > 0 else None
+    try:
+        await consumer.run()
+    finally:
+        if reporter:
+            reporter.cancel()
+        # Finish turns already taken off the stream so they get acked
+        await turns.stop()
+        await sender.aclose()
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent worker consuming Messenger events from Redis Streams.")
+    parser.add_argument("--worker-index", type=int, default=int(os.getenv("WORKER_INDEX", 0)))
+    parser.add_argument("--num-workers", type=int, default=int(os.getenv("NUM_WORKERS", 1)))
+    parser.add_argument("--concurrency", type=int, default=WEBHOOK_WORKERS, help="Turns in flight in this process.")
+    parser.add_argument("--metrics-interval", type=float, default=60, help="Seconds between metric dumps (0 disables).")
+    args = parser.parse_args()
+
+    asyncio.run(run_worker(args.worker_index, args.num_workers, args.concurrency, args.metrics_interval))
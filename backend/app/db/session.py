@@ -1,13 +1,32 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-def get_db():
+# Remaining budget the agent service sends with each call (see agent_service/utils/deadline.py)
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+def get_db(request: Request):
+    timeout_ms = _request_timeout_ms(request)
     db = SessionLocal()
     try:
+        if timeout_ms is not None:
+            # Transaction-local, so it is reset when the connection goes back to the pool
+            db.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(timeout_ms)})
         yield db
     finally:
         db.close()
+
+def _request_timeout_ms(request: Request):
+    value = request.headers.get(TIMEOUT_HEADER)
+    if value is None:
+        return None
+    try:
+        timeout_ms = int(value)
+    except ValueError:
+        return None
+    # The agent never sends an exhausted budget; 0 would disable the timeout altogether
+    return timeout_ms if timeout_ms > 0 else None
@@ -1,6 +1,8 @@
 # backend/app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import OperationalError
 # Import the new routers
 from app.routers import auth, restaurants, categories, items, variations, menu, knowledge, notifications
 
@@ -11,6 +13,17 @@ app.add_middleware(
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], allow_credentials=True
 )
 
+# Postgres cancels statements that outlive the caller's deadline (statement_timeout)
+QUERY_CANCELED = "57014"
+
+@app.exception_handler(OperationalError)
+async def handle_operational_error(request: Request, exc: OperationalError):
+    if getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED:
+        return JSONResponse(status_code=504, content={"detail": "Query cancelled: request deadline exceeded"})
+    # Any other database error: the same response as an unhandled exception
+    print(f"Database error on {request.url.path}: {exc}")
+    return PlainTextResponse("Internal Server Error", status_code=500)
+
 # mount all routers
 app.include_router(auth.router)
 app.include_router(restaurants.router)
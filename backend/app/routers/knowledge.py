@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Query # Added Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response # Added Query
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models import KnowledgeBase
@@ -12,6 +13,25 @@ from pgvector.sqlalchemy import Vector
 router = APIRouter(prefix="/knowledge", tags=["knowledge"])
 model = get_embedding_model() 
 
+# Lets clients (the agent's answer cache) tell when knowledge base content changed
+KB_VERSION_HEADER = "X-KB-Version"
+# Postgres' per-table write counters: a catalog lookup, no scan of the table itself
+KB_VERSION_SQL = text("""
+    SELECT n_tup_ins || '-' || n_tup_upd || '-' || n_tup_del
+    FROM pg_stat_user_tables
+    WHERE relid = 'knowledge_base'::regclass
+""")
+
+
+def get_kb_version(db: Session) -> str:
+    """
+    Changes whenever a row is inserted, updated or deleted, including edits made
+    outside this API (seed/backfill scripts). Shared by every backend instance.
+    The counters are updated when a write commits (within a second or so) and
+    restart after a stats reset, which at worst invalidates the agent's cache.
+    """
+    return db.execute(KB_VERSION_SQL).scalar() or "0"
+
 @router.post("", response_model=KnowledgeBaseOut, status_code=201)
 def create_knowledge_item(
     payload: KnowledgeBaseCreate, 
@@ -82,14 +102,24 @@ def delete_knowledge_item(kb_id: int, db: Session = Depends(get_db)):
     db.commit()
 
 
+@router.get("/version")
+def knowledge_version(db: Session = Depends(get_db)):
+    """
+    Current knowledge base content version.
+    """
+    return {"version": get_kb_version(db)}
+
+
 @router.get("/semantic-search", response_model=List[KnowledgeBaseOut])
 def semantic_search_knowledge(
+    response: Response,
     search: str = Query(..., description="A natural language query."),
     limit: int = Query(3, description="Number of results to return."),
     db: Session = Depends(get_db)
 ):
     """
     Performs semantic (vector) search on the knowledge base.
+    The content version the results came from is sent in the X-KB-Version header.
     """
     query_embedding = model.encode(search).tolist() 
 
@@ -99,5 +129,6 @@ def semantic_search_knowledge(
         .limit(limit)
         .all()
     )
+    response.headers[KB_VERSION_HEADER] = get_kb_version(db)
     
     return kb_items
\ No newline at end of file
@@ -0,0 +1,255 @@
+# messenger_webhook/loadtest.py
+"""
+Load generator for the Messenger webhook.
+
+Runs the real webhook app in-process together with a local stand-in for the
+Graph API (profile lookups and the Send API) and a stub agent runner with
+configurable latency, then fires realistic webhook deliveries at it:
+multi-entry / multi-event batches from many users, plus Meta-style
+redeliveries of earlier payloads.
+
+Usage (from the repository root):
+    python -m messenger_webhook.loadtest --rate 200 --duration 30 --users 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+
+STUB_TOKEN = "loadtest-token"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Webhook load test with a local Graph API stub.")
+    parser.add_argument("--rate", type=float, default=50, help="Messages per second.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to generate load.")
+    parser.add_argument("--users", type=int, default=200, help="Distinct senders.")
+    parser.add_argument("--max-entries", type=int, default=2, help="Max entries per delivery.")
+    parser.add_argument("--max-events", type=int, default=3, help="Max messaging events per entry.")
+    parser.add_argument("--redelivery-rate", type=float, default=0.05, help="Share of deliveries sent twice.")
+    parser.add_argument("--agent-latency-ms", type=float, default=1500, help="Mean stub agent latency.")
+    parser.add_argument("--agent-jitter-ms", type=float, default=500, help="Std-dev of stub agent latency.")
+    parser.add_argument("--send-latency-ms", type=float, default=50, help="Latency of the stub Send API.")
+    parser.add_argument("--send-error-rate", type=float, default=0.0, help="Share of Send API calls answered 500.")
+    parser.add_argument("--send-rate", type=float, default=None,
+                        help="Override SEND_RATE_PER_SECOND (per-page Send API token bucket).")
+    parser.add_argument("--grace", type=float, default=15, help="Seconds to wait for replies after the load stops.")
+    parser.add_argument("--webhook-port", type=int, default=8101)
+    parser.add_argument("--stub-port", type=int, default=8102)
+    return parser.parse_args()
+
+
+args = parse_args() if __name__ == "__main__" else None
+
+if args is not None:
+    # Must be set before the agent modules read their configuration
+    os.environ["GRAPH_API_URL"] = f"http://127.0.0.1:{args.stub_port}"
+    os.environ["FB_PAGE_ACCESS_TOKEN"] = STUB_TOKEN
+    os.environ.setdefault("INGRESS_MODE", "inline")
+    if args.send_rate:
+        os.environ["SEND_RATE_PER_SECOND"] = str(args.send_rate)
+        os.environ["SEND_BURST"] = str(int(args.send_rate))
+    # The graph is never called, but building it constructs the LLM client
+    os.environ.setdefault("GOOGLE_API_KEY", "loadtest")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from starlette.responses import JSONResponse
+
+TOKEN_RE = re.compile(r"#lt-(\d+)")
+
+
+class Recorder:
+    """Tracks when every message was posted and when replies mentioning it arrived."""
+
+    def __init__(self):
+        self.posted_at = {}
+        self.replied_at = {}
+        self.reply_counts = {}
+        self.ack_latencies = []
+        self.ack_status = {}
+        self.sends = 0
+        self.profile_lookups = 0
+
+    def on_reply(self, text: str):
+        now = time.perf_counter()
+        self.sends += 1
+        for token in TOKEN_RE.findall(text):
+            self.replied_at.setdefault(token, now)
+            self.reply_counts[token] = self.reply_counts.get(token, 0) + 1
+
+
+def build_graph_stub(recorder: Recorder) -> FastAPI:
+    stub = FastAPI(title="Graph API stub")
+
+    @stub.post("/me/messages")
+    async def send_api(request: Request):
+        await asyncio.sleep(args.send_latency_ms / 1000)
+        if random.random() < args.send_error_rate:
+            return JSONResponse(status_code=500, content={"error": "stub failure"})
+        payload = await request.json()
+        text = (payload.get("message") or {}).get("text")
+        if text:
+            recorder.on_reply(text)
+        return {"recipient_id": payload["recipient"]["id"], "message_id": f"m_{uuid.uuid4().hex}"}
+
+    @stub.get("/{psid}")
+    async def profile(psid: str):
+        recorder.profile_lookups += 1
+        return {"first_name": "Load", "last_name": f"User{psid[-4:]}", "id": psid}
+
+    return stub
+
+
+def install_stub_runner():
+    """Replaces the agent graph with a sleep that echoes the message tokens back."""
+    from agent_service import messenger
+
+    async def stub_runner(user_name, user_input, user_id, on_chunk=None):
+        if not isinstance(user_name, str):
+            user_name = await user_name
+        texts = [user_input] if isinstance(user_input, str) else user_input
+        delay = max(0.0, random.gauss(args.agent_latency_ms, args.agent_jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        tokens = " ".join(f"#lt-{t}" for text in texts for t in TOKEN_RE.findall(text))
+        return f"Stub reply for {user_name}: {tokens}"
+
+    messenger.acode_runner = stub_runner
+
+
+class PayloadFactory:
+    def __init__(self, users: int):
+        self.user_ids = [str(10**15 + i) for i in range(users)]
+        self.page_id = "100000000000001"
+        self.seq = 0
+
+    def delivery(self):
+        entries = []
+        for _ in range(random.randint(1, args.max_entries)):
+            events = []
+            for _ in range(random.randint(1, args.max_events)):
+                self.seq += 1
+                events.append({
+                    "sender": {"id": random.choice(self.user_ids)},
+                    "recipient": {"id": self.page_id},
+                    "timestamp": int(time.time() * 1000),
+                    "message": {"mid": f"m_{uuid.uuid4().hex}", "text": f"do you have momo? #lt-{self.seq}"},
+                })
+            entries.append({"id": self.page_id, "time": int(time.time() * 1000), "messaging": events})
+        return {"object": "page", "entry": entries}
+
+
+def tokens_in(payload):
+    return [t for e in payload["entry"] for m in e["messaging"] for t in TOKEN_RE.findall(m["message"]["text"])]
+
+
+async def post(client: httpx.AsyncClient, recorder: Recorder, payload: dict, redelivery: bool = False):
+    if not redelivery:
+        now = time.perf_counter()
+        for token in tokens_in(payload):
+            recorder.posted_at[token] = now
+    started = time.perf_counter()
+    try:
+        response = await client.post("/webhook", json=payload)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = "error"
+    recorder.ack_latencies.append(time.perf_counter() - started)
+    recorder.ack_status[status] = recorder.ack_status.get(status, 0) + 1
+    if status != 200 and not redelivery:
+        # Meta would retry a failed delivery; do the same once
+        await asyncio.sleep(1)
+        await post(client, recorder, payload, redelivery=True)
+
+
+async def generate(recorder: Recorder):
+    factory = PayloadFactory(args.users)
+    events_per_delivery = (1 + args.max_entries) / 2 * (1 + args.max_events) / 2
+    interval = events_per_delivery / args.rate
+    tasks = []
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.webhook_port}", timeout=30,
+                                 limits=httpx.Limits(max_connections=200)) as client:
+        start = time.perf_counter()
+        next_at = start
+        while time.perf_counter() - start < args.duration:
+            payload = factory.delivery()
+            tasks.append(asyncio.create_task(post(client, recorder, payload)))
+            if random.random() < args.redelivery_rate:
+                tasks.append(asyncio.create_task(_redeliver(client, recorder, payload)))
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+
+
+async def _redeliver(client, recorder, payload):
+    await asyncio.sleep(random.uniform(0.05, 2.0))
+    await post(client, recorder, payload, redelivery=True)
+
+
+def pct(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(recorder: Recorder, webhook_metrics: dict):
+    e2e = [recorder.replied_at[t] - recorder.posted_at[t] for t in recorder.posted_at if t in recorder.replied_at]
+    dropped = [t for t in recorder.posted_at if t not in recorder.replied_at]
+    duplicated = sum(1 for c in recorder.reply_counts.values() if c > 1)
+
+    print("\n--- Load test summary ---")
+    print(f"Messages posted:      {len(recorder.posted_at)}")
+    print(f"Deliveries (incl. redeliveries): {len(recorder.ack_latencies)}  status: {recorder.ack_status}")
+    for label, values in (("Ack latency", recorder.ack_latencies), ("E2E reply latency", e2e)):
+        if values:
+            print(f"{label:<20} p50={1000 * pct(values, .5):.1f}ms  p95={1000 * pct(values, .95):.1f}ms  "
+                  f"p99={1000 * pct(values, .99):.1f}ms  max={1000 * max(values):.1f}ms  "
+                  f"mean={1000 * statistics.mean(values):.1f}ms")
+    print(f"Replies sent:         {recorder.sends}  (messages answered: {len(e2e)})")
+    print(f"Dropped events:       {len(dropped)}")
+    print(f"Answered twice:       {duplicated}")
+    print(f"Profile lookups:      {recorder.profile_lookups}")
+    counters = webhook_metrics.get("counters", {})
+    print(f"Webhook counters:     {counters}")
+    print(f"Webhook pool:         {webhook_metrics.get('pool')}")
+
+
+async def main():
+    recorder = Recorder()
+    install_stub_runner()
+    from messenger_webhook.messenger_bot import app as webhook_app
+
+    servers = [
+        uvicorn.Server(uvicorn.Config(build_graph_stub(recorder), port=args.stub_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(webhook_app, port=args.webhook_port, log_level="warning")),
+    ]
+    serving = [asyncio.create_task(s.serve()) for s in servers]
+    while not all(s.started for s in servers):
+        await asyncio.sleep(0.05)
+
+    print(f"Generating ~{args.rate} msg/s for {args.duration}s across {args.users} users...")
+    await generate(recorder)
+
+    deadline = time.perf_counter() + args.grace
+    while time.perf_counter() < deadline and len(recorder.replied_at) < len(recorder.posted_at):
+        await asyncio.sleep(0.25)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.webhook_port}") as client:
+        webhook_metrics = (await client.get("/metrics")).json()
+
+    report(recorder, webhook_metrics)
+    # Webhook first, so turns still draining can reach the stub Send API
+    for server, task in reversed(list(zip(servers, serving))):
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
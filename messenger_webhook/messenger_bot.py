@@ -1,70 +1,81 @@
 from fastapi import FastAPI, Request, HTTPException
-from starlette.responses import PlainTextResponse
-from typing import Dict, List
+from starlette.responses import PlainTextResponse, JSONResponse
+from typing import List
+from redis.exceptions import RedisError
+import asyncio
 import json
 import os
-import requests
-from agent_service.runner import code_runner
-# Import the ReviewDecision model for state creation if it's in runner.py
-# If not, you might need to import it from agent_service.state
-# from agent_service.state import ReviewDecision 
+import time
+from agent_service.config import INGRESS_MODE
+from agent_service.messenger import TurnQueue, sender
+from agent_service.utils.dedup import MessageDeduplicator
+from agent_service.utils.http import close_http_client
+from agent_service.utils.inbound_stream import publish
+from agent_service.utils.metrics import metrics
 
 
-FB_PAGE_ACCESS_TOKEN = os.getenv("FB_PAGE_ACCESS_TOKEN")
 FB_VERIFY_TOKEN = os.getenv("FB_VERIFY_TOKEN", "MY_DEFAULT_VERIFY_TOKEN")
 
 app = FastAPI(title="Messenger AI Chatbot")
 
-user_histories: Dict[str, str] = {}
 
-def get_user_profile(sender_id: str) -> str:
+def extract_messages(data: dict) -> List[dict]:
     """
-    Calls the Facebook Graph API to get the user's first and last name.
+    Flattens every entry and messaging event of one webhook delivery into text
+    messages. A malformed event is skipped on its own without dropping the rest.
     """
-    if not FB_PAGE_ACCESS_TOKEN:
-        print("WARNING: FB_PAGE_ACCESS_TOKEN is not set. Cannot fetch user name.")
-        return f"User {sender_id}" 
-
-    url = f"https://graph.facebook.com/{sender_id}"
-    params = {
-        "fields": "first_name,last_name",
-        "access_token": FB_PAGE_ACCESS_TOKEN
-    }
-    try:
-        response = requests.get(url, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        first_name = data.get("first_name", "")
-        last_name = data.get("last_name", "")
-        
-        if first_name and last_name:
-            return f"{first_name} {last_name}"
-        elif first_name:
-            return first_name
-        else:
-            return f"User {sender_id}"
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching user profile for {sender_id}: {e}")
-        return f"User {sender_id}"
-
-def send_to_meta_api(recipient_id: str, text: str):
-    if not FB_PAGE_ACCESS_TOKEN:
-        print("ERROR: Missing FB_PAGE_ACCESS_TOKEN")
-        return
-    url = f"https://graph.facebook.com/v19.0/me/messages?access_token={FB_PAGE_ACCESS_TOKEN}"
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "messaging_type": "RESPONSE",
-        "recipient": {"id": recipient_id},
-        "message": {"text": text},
-    }
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
-        print(f"Reply sent to {recipient_id}: {text[:30]}...")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send message: {e}")
+    messages = []
+    for entry in data.get("entry") or []:
+        if not isinstance(entry, dict):
+            metrics.incr("webhook.events_malformed")
+            continue
+        for messaging_event in entry.get("messaging") or []:
+            try:
+                message = messaging_event.get("message") or {}
+                message_text = message.get("text")
+                if not message_text or message.get("is_echo"):
+                    metrics.incr("webhook.events_ignored")
+                    continue
+                messages.append({
+                    "sender_id": messaging_event["sender"]["id"],
+                    "page_id": entry.get("id"),
+                    "mid": message.get("mid"),
+                    "text": message_text,
+                    "timestamp": messaging_event.get("timestamp"),
+                    "received_at": time.time(),
+                })
+            except (KeyError, TypeError, AttributeError) as e:
+                metrics.incr("webhook.events_malformed")
+                print(f"❌ Skipping malformed messaging event: {e}")
+    return messages
+
+
+# Inline mode: turns run in this process, different senders in parallel and
+# one sender's messages in arrival order. Stream mode: only enqueue to Redis.
+turns = TurnQueue(name="webhook") if INGRESS_MODE == "inline" else None
+dedup = MessageDeduplicator()
+
+
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks = set()
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@app.on_event("startup")
+async def startup():
+    if turns is not None:
+        await turns.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if turns is not None:
+        await turns.stop()
+    await sender.aclose()
+    await close_http_client()
 
 
 @app.get("/webhook")
@@ -88,37 +99,68 @@ async def handle_messages(request: Request):
     except json.JSONDecodeError:
         return {"status": "ok", "detail": "Invalid JSON"}
 
-    try:
-        messaging_event = data["entry"][0]["messaging"][0]
-        sender_id = messaging_event["sender"]["id"]
-        message_text = messaging_event.get("message", {}).get("text")
-        if not message_text:
-            return {"status": "ok", "detail": "No text message"}
-    except (KeyError, IndexError):
-        return {"status": "ok", "detail": "Non-message event ignored"}
-
-
-    user_name = get_user_profile(sender_id)
-    print(f"⬅️ Message from {user_name} (ID: {sender_id}): {message_text}")
-
-    # chat_summary = user_histories.get(sender_id, "")
-
+    if not isinstance(data, dict):
+        return {"status": "ok", "detail": "Invalid payload"}
+
+    messages = extract_messages(data)
+    if not messages:
+        return {"status": "ok", "detail": "No text message"}
+
+    # Drop redeliveries before any graph work
+    duplicates = await asyncio.gather(*(dedup.is_duplicate(m["mid"]) for m in messages))
+    fresh = [m for m, dup in zip(messages, duplicates) if not dup]
+
+    # Ack immediately; the agent work happens in the background
+    if turns is None:
+        accepted, rejected = await _enqueue_to_stream(fresh)
+    else:
+        accepted, rejected = _enqueue_inline(fresh)
+    for message in rejected:
+        # Not accepted, so the redelivery must not be treated as a duplicate
+        await dedup.release(message["mid"])
+
+    # Show the typing indicator right away, once per sender in this delivery
+    typing = {m["sender_id"]: m["page_id"] for m in accepted}
+    for sender_id, page_id in typing.items():
+        _spawn(sender.send_action(sender_id, "typing_on", page_id))
+
+    metrics.incr("webhook.deliveries")
+    metrics.incr("webhook.events_duplicate", len(messages) - len(fresh))
+    metrics.incr("webhook.events_accepted", len(accepted))
+    if rejected:
+        # Queue full or stream unavailable: a non-2xx makes Meta redeliver later instead of losing the message
+        return JSONResponse(status_code=503, content={"status": "busy", "rejected": len(rejected)})
+
+    return {"status": "ok", "accepted": len(accepted), "duplicates": len(messages) - len(fresh)}
+
+
+def _enqueue_inline(messages: List[dict]):
+    accepted, rejected = [], []
+    for message in messages:
+        if turns.is_full:
+            rejected.append(message)
+        else:
+            turns.add(message)
+            accepted.append(message)
+    return accepted, rejected
 
+async def _enqueue_to_stream(messages: List[dict]):
+    if not messages:
+        return [], []
     try:
-        ai_reply = code_runner(user_name, message_text,sender_id)
+        await publish(messages)
+    except RedisError as e:
+        print(f"❌ Failed to enqueue events to Redis Stream: {e}")
+        return [], messages
+    return messages, []
 
-    except Exception as e:
-        ai_reply = "Sorry, I'm having trouble. Please try again."
-        print(f"LangGraph Error: {e}")
-        # new_chat_summary = chat_summary 
-    
-    
-    # user_histories[sender_id] = new_chat_summary
 
-    send_to_meta_api(sender_id, ai_reply)
-    return {"status": "ok"}
+@app.get("/metrics")
+async def get_metrics():
+    pool = turns.stats() if turns is not None else {"ingress": INGRESS_MODE}
+    return {"pool": pool, **metrics.snapshot()}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("messenger_bot:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
+    uvicorn.run("messenger_bot:app", host="0.0.0.0", port=8001, reload=True)
@@ -0,0 +1,4 @@
+import os
+
+# The LLM clients are built at import time; no test calls them
+os.environ.setdefault("GOOGLE_API_KEY", "test")
@@ -0,0 +1,86 @@
+import asyncio
+import numpy as np
+import pytest
+from agent_service.utils import answer_cache as answer_cache_module
+from agent_service.utils.answer_cache import AnswerCache, fingerprint
+
+# Stand-in embeddings: the saturday/sunday pair is as close as MiniLM makes them
+VECTORS = {
+    "are you open on saturday": [1.0, 0.0, 0.0],
+    "are you open on saturdays": [0.99, 0.14, 0.0],
+    "are you open on sunday": [0.98, 0.0, 0.2],
+    "do you have parking": [0.0, 1.0, 0.0],
+}
+
+
+class FakeRouter:
+    def embed(self, normalized):
+        vector = np.array(VECTORS.get(normalized, [0.0, 0.0, 1.0]))
+        return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(answer_cache_module, "intent_router", FakeRouter())
+    cache = AnswerCache(enabled=True, threshold=0.92, version_ttl=3600)
+    cache.observe_version("v1")
+    return cache
+
+
+def _info_result(answer):
+    return {
+        "query_types": [{"type": "info", "parameters": {"topic": "opening hours"}}],
+        "subagent_outputs": [{"type": "info", "output": [{"content": "Open 10-10 every day."}]}],
+        "final_response": answer,
+    }
+
+
+def _ask(cache, query, history=None):
+    return asyncio.run(cache.lookup(query, history or []))
+
+
+def test_similar_question_with_the_same_entities_hits(cache):
+    answer, key = _ask(cache, "Are you open on Saturday?")
+    assert answer is None and key is not None
+    cache.store(key, _info_result("Yes, 10 AM to 11 PM on Saturdays."))
+
+    assert _ask(cache, "Are you open on saturdays")[0] == "Yes, 10 AM to 11 PM on Saturdays."
+
+
+def test_near_identical_question_about_another_day_misses(cache):
+    _, key = _ask(cache, "are you open on saturday")
+    cache.store(key, _info_result("Yes, on Saturdays."))
+    assert fingerprint("are you open on sunday") != fingerprint("are you open on saturday")
+    answer, key = _ask(cache, "are you open on sunday")
+    assert answer is None and key is not None
+
+
+def test_queries_that_cannot_hit_are_not_looked_up(cache, monkeypatch):
+    monkeypatch.setattr(FakeRouter, "embed", lambda self, normalized: pytest.fail("embedded"))
+    # Menu request and small talk: no KB topic
+    assert _ask(cache, "veg pizza under 500") == (None, None)
+    assert _ask(cache, "hello") == (None, None)
+    # Follow-up that depends on the history
+    assert _ask(cache, "is it open then", [{"role": "user", "content": "what about christmas"}]) == (None, None)
+
+
+def test_only_successful_single_info_answers_are_stored(cache):
+    _, key = _ask(cache, "do you have parking")
+    cache.store(key, {**_info_result("Yes."), "degraded": True})
+    cache.store(key, {**_info_result("Yes."), "subagent_outputs": [{"type": "info", "output": []}]})
+    cache.store(key, {**_info_result("Yes."), "query_types": [{"type": "info"}, {"type": "menu"}]})
+    assert _ask(cache, "do you have parking")[0] is None
+
+
+def test_a_new_kb_version_invalidates_every_entry(cache):
+    _, key = _ask(cache, "do you have parking")
+    cache.store(key, _info_result("Yes, free parking."))
+    assert _ask(cache, "do you have parking")[0] == "Yes, free parking."
+
+    cache.observe_version("v2")
+    answer, key = _ask(cache, "do you have parking")
+    assert answer is None
+    # An answer computed against the old version is not stored either
+    cache.observe_version("v3")
+    cache.store(key, _info_result("Yes, free parking."))
+    assert _ask(cache, "do you have parking")[0] is None
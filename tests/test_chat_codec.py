@@ -0,0 +1,72 @@
+import json
+import random
+import string
+import pytest
+from agent_service.utils import chat_codec
+from agent_service.utils.chat_codec import (
+    MSGPACK, MSGPACK_ZLIB, decode_message, decode_text, decode_value, encode_message, encode_value, is_json,
+)
+
+needs_msgpack = pytest.mark.skipif(chat_codec.ormsgpack is None, reason="ormsgpack is not installed")
+
+
+def test_json_round_trip_matches_the_original_format():
+    raw = encode_message("user", "Do you have veg pizza? 🍕", compact=False)
+    assert json.loads(raw) == {"role": "user", "content": "Do you have veg pizza? 🍕"}
+    assert decode_message(raw) == {"role": "user", "content": "Do you have veg pizza? 🍕"}
+    # As read back from Redis without decode_responses
+    assert decode_message(raw.encode()) == decode_message(raw)
+
+
+@needs_msgpack
+@pytest.mark.parametrize("role", ["user", "assistant", "system", "tool"])
+def test_msgpack_round_trip(role):
+    raw = encode_message(role, "Rs 650 — Margherita", compact=True)
+    assert raw[:1] == MSGPACK
+    assert len(raw) < len(encode_message(role, "Rs 650 — Margherita", compact=False).encode())
+    assert decode_message(raw) == {"role": role, "content": "Rs 650 — Margherita"}
+
+
+@needs_msgpack
+def test_large_entries_are_compressed_only_when_smaller(monkeypatch):
+    monkeypatch.setattr(chat_codec, "CHAT_COMPRESS_MIN_BYTES", 64)
+    repetitive = "The paneer tikka is grilled in a tandoor. " * 20
+    raw = encode_message("assistant", repetitive, compact=True)
+    assert raw[:1] == MSGPACK_ZLIB
+    assert len(raw) < len(repetitive)
+    assert decode_message(raw)["content"] == repetitive
+
+    # Payloads over the threshold that zlib cannot shrink stay uncompressed
+    noise = "".join(random.Random(0).choices(string.ascii_letters + string.digits, k=80))
+    assert encode_message("assistant", noise, compact=True)[:1] == MSGPACK
+
+    # Below the threshold nothing is compressed
+    assert encode_message("assistant", "short", compact=True)[:1] == MSGPACK
+
+
+@needs_msgpack
+@pytest.mark.parametrize("compact", [False, True])
+def test_values_round_trip(monkeypatch, compact):
+    monkeypatch.setattr(chat_codec, "COMPACT", compact)
+    results = [{"type": "menu", "name": "Margherita Pizza", "price": 650.0, "tags": ["veg"], "available": True}]
+    raw = encode_value(results)
+    assert isinstance(raw, bytes) == compact
+    assert decode_value(raw) == results
+
+
+def test_unknown_tag_is_rejected():
+    with pytest.raises(ValueError):
+        decode_value(b"\x07garbage")
+
+
+def test_decode_text():
+    assert decode_text(None) == ""
+    assert decode_text(b"caf\xc3\xa9") == "café"
+    assert decode_text("summary") == "summary"
+
+
+def test_is_json():
+    assert is_json(b'{"role": "user", "content": "hi"}') and is_json(b"[1, 2]")
+    # Plain-text summaries stored as JSON strings
+    assert is_json(b'"Asked about veg pizza."') and is_json("any str")
+    assert not is_json(MSGPACK + b"payload") and not is_json(MSGPACK_ZLIB + b"payload")
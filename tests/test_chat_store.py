@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from agent_service.utils import chat_codec, chat_store
+from agent_service.utils.chat_store import ChatStore, MemoryChatStore, RedisChatStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+RESULTS = [{"type": "menu", "name": "Paneer Tikka", "price": 450.0}]
+
+
+@pytest.fixture(params=[False, True], ids=["json", "msgpack"])
+def encoding(request, monkeypatch):
+    if request.param and chat_codec.ormsgpack is None:
+        pytest.skip("ormsgpack is not installed")
+    monkeypatch.setattr(chat_codec, "COMPACT", request.param)
+    monkeypatch.setattr(
+        chat_store, "encode_message",
+        lambda role, content: chat_codec.encode_message(role, content, compact=request.param),
+    )
+    return request.param
+
+
+async def _scenario(store: ChatStore):
+    """The runner's calls over a few turns; returns everything the store handed back."""
+    seen = [await store.load("u1")]
+    seen.append(await store.append_and_load("u1", [("user", "hi"), ("user", "any veg dishes?")]))
+    await store.append("u1", [("assistant", "Yes, the paneer tikka.")], RESULTS)
+    seen.append(await store.append_and_load("u1", [("user", "how much is it?")]))
+    # No results: the previous set is kept
+    await store.append("u1", [("assistant", "Rs 450.")])
+    await store.append_many([("u2", [("user", "open today?")], None), ("u3", [("user", "hello")], None)])
+    seen.append(await store.load_many(["u1", "u2", "u3", "unknown"]))
+
+    raw, summary = await store.load_raw_history("u1")
+    seen.append((len(raw), summary))
+    seen.append(await store.fold_into_summary("u1", raw[:2], "Asked about veg dishes."))
+    # The folded prefix is gone now, so folding it again is a conflict
+    seen.append(await store.fold_into_summary("u1", raw[:2], "stale"))
+    seen.append(await store.load("u1"))
+    return seen
+
+
+def _redis_store(monkeypatch, **kwargs) -> RedisChatStore:
+    store = RedisChatStore(**kwargs)
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(store, "_redis", lambda: client)
+    return store
+
+
+def test_backends_are_equivalent(encoding, monkeypatch):
+    redis_seen = asyncio.run(_scenario(_redis_store(monkeypatch, max_messages=5)))
+    memory_seen = asyncio.run(_scenario(MemoryChatStore(max_messages=5)))
+
+    assert redis_seen == memory_seen
+    history, summary, results = memory_seen[-1]
+    assert [m["content"] for m in history] == ["Yes, the paneer tikka.", "how much is it?", "Rs 450."]
+    assert summary == "Asked about veg dishes."
+    assert results == RESULTS
+
+
+def test_history_is_trimmed_to_max_messages(encoding, monkeypatch):
+    async def run(store: ChatStore):
+        for i in range(5):
+            await store.append("u1", [("user", f"m{i}")])
+        return await store.load("u1")
+
+    for store in (_redis_store(monkeypatch, max_messages=3), MemoryChatStore(max_messages=3)):
+        history, _, _ = asyncio.run(run(store))
+        assert [m["content"] for m in history] == ["m2", "m3", "m4"]
+
+
+def test_memory_store_evicts_least_recently_used():
+    async def run(store: MemoryChatStore):
+        await store.append("a", [("user", "1")])
+        await store.append("b", [("user", "2")])
+        await store.load("a")
+        await store.append("c", [("user", "3")])
+        return await store.load_many(["a", "b", "c"])
+
+    contexts = asyncio.run(run(MemoryChatStore(max_conversations=2)))
+    assert contexts["b"] == ([], "", [])
+    assert contexts["a"][0] and contexts["c"][0]
+
+
+def test_chat_store_is_abstract():
+    with pytest.raises(TypeError):
+        ChatStore()
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from agent_service.utils.debounce import Debouncer
+
+
+def _collector():
+    flushed = []
+    return flushed, lambda key, items: flushed.append((key, items, time.monotonic()))
+
+
+def test_messages_within_the_window_are_merged():
+    async def run():
+        flushed, flush = _collector()
+        debouncer = Debouncer(flush, window=0.05, max_wait=1)
+        debouncer.add("a", 1)
+        debouncer.add("b", "x")
+        await asyncio.sleep(0.02)
+        debouncer.add("a", 2)
+        assert flushed == []
+        await asyncio.sleep(0.1)
+        debouncer.add("a", 3)
+        await asyncio.sleep(0.1)
+        return flushed
+
+    flushed = asyncio.run(run())
+    assert [(key, items) for key, items, _ in flushed] == [("b", ["x"]), ("a", [1, 2]), ("a", [3])]
+
+
+def test_max_wait_flushes_a_steady_stream():
+    async def run():
+        flushed, flush = _collector()
+        debouncer = Debouncer(flush, window=0.05, max_wait=0.15)
+        started = time.monotonic()
+        for i in range(10):
+            debouncer.add("a", i)
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(0.1)
+        return started, flushed
+
+    started, flushed = asyncio.run(run())
+    # Never quiet for a whole window, yet flushed every max_wait
+    assert len(flushed) >= 2
+    assert [i for _, items, _ in flushed for i in items] == list(range(10))
+    first_flush = flushed[0][2] - started
+    assert 0.14 <= first_flush < 0.25
+
+
+def test_zero_window_flushes_immediately_and_flush_all_drains():
+    async def run():
+        flushed, flush = _collector()
+        Debouncer(flush, window=0, max_wait=0).add("a", 1)
+        assert [items for _, items, _ in flushed] == [[1]]
+
+        flushed.clear()
+        debouncer = Debouncer(flush, window=10, max_wait=10)
+        debouncer.add("a", 1)
+        debouncer.add("b", 2)
+        debouncer.flush_all()
+        assert sorted(items for _, items, _ in flushed) == [[1], [2]]
+        # Cancelled timers do not flush again
+        await asyncio.sleep(0)
+        assert len(flushed) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from agent_service.utils import dedup
+from agent_service.utils.dedup import MessageDeduplicator
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(dedup, "get_async_redis", lambda: fakeredis.aioredis.FakeRedis(server=server))
+    return server
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_first_delivery_is_new_and_redeliveries_are_duplicates(server):
+    deduplicator = MessageDeduplicator(ttl=60)
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+    assert _run(deduplicator.is_duplicate("m_1")) is True
+    assert _run(deduplicator.is_duplicate("m_2")) is False
+    assert _run(deduplicator.is_duplicate("")) is False
+
+
+def test_marks_are_shared_across_processes_with_a_ttl(server):
+    assert _run(MessageDeduplicator(ttl=60).is_duplicate("m_1")) is False
+    # Another webhook process sees the mark
+    assert _run(MessageDeduplicator(ttl=60).is_duplicate("m_1")) is True
+    ttl = _run(fakeredis.aioredis.FakeRedis(server=server).ttl("webhook:mid:m_1"))
+    assert 0 < ttl <= 60
+
+
+def test_slow_redis_falls_back_to_the_local_set(monkeypatch):
+    calls = []
+
+    class SlowRedis:
+        async def set(self, *args, **kwargs):
+            calls.append("set")
+            await asyncio.sleep(1)
+
+    monkeypatch.setattr(dedup, "get_async_redis", lambda: SlowRedis())
+    deduplicator = MessageDeduplicator(ttl=60, timeout=0.01)
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+    # Within the cooldown Redis is not tried again
+    assert _run(deduplicator.is_duplicate("m_1")) is True
+    assert calls == ["set"]
+
+
+def test_redis_errors_fall_back_to_the_local_set(monkeypatch):
+    class DownRedis:
+        async def set(self, *args, **kwargs):
+            raise ConnectionRefusedError("redis is down")
+
+    monkeypatch.setattr(dedup, "get_async_redis", lambda: DownRedis())
+    deduplicator = MessageDeduplicator(ttl=60)
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+    assert _run(deduplicator.is_duplicate("m_1")) is True
+
+
+def test_released_mids_are_accepted_again(server):
+    deduplicator = MessageDeduplicator(ttl=60)
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+    _run(deduplicator.release("m_1"))
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+
+
+def test_local_only_mode(monkeypatch):
+    monkeypatch.setattr(dedup, "get_async_redis", lambda: pytest.fail("Redis used"))
+    deduplicator = MessageDeduplicator(ttl=60, use_redis=False)
+    assert _run(deduplicator.is_duplicate("m_1")) is False
+    assert _run(deduplicator.is_duplicate("m_1")) is True
+    _run(deduplicator.release("m_1"))
+    assert _run(deduplicator.is_duplicate("m_1")) is False
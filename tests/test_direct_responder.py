@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from agent_service.nodes.direct_responder import CHITCHAT_TEMPLATES, direct_reply, direct_responder, template_reply
+
+HELLO, HOW_ARE_YOU, THANKS, BYE = (reply for _, reply in CHITCHAT_TEMPLATES)
+
+
+@pytest.mark.parametrize("query, reply", [
+    ("Hello!", HELLO),
+    ("hey there", HELLO),
+    ("Good evening", HELLO),
+    ("How's it going?", HOW_ARE_YOU),
+    ("ok thank you", THANKS),
+    ("Thanks a lot!!", THANKS),
+    ("see you later", BYE),
+])
+def test_template_matches(query, reply):
+    assert template_reply(query) == reply
+
+
+@pytest.mark.parametrize("query", [
+    "hello, do you have veg pizza?",
+    "thanks, what time do you close",
+    "tell me a joke",
+    "",
+])
+def test_anything_beyond_small_talk_has_no_template(query):
+    assert template_reply(query) is None
+
+
+def test_chitchat_uses_the_orchestrator_reply_or_a_template():
+    assert direct_reply([{"type": "chitchat", "reply": "Hi Asha!"}], "hello") == "Hi Asha!"
+    assert direct_reply([{"type": "chitchat", "reply": None}], "hello") == HELLO
+
+
+def test_ambiguous_items_answer_with_the_clarification():
+    query_types = [
+        {"type": "ambiguous", "clarification": "Do you mean the menu or the opening hours?"},
+        {"type": "chitchat", "reply": "Hello!"},
+    ]
+    assert direct_reply(query_types, "hi, the thing") == "Do you mean the menu or the opening hours? Hello!"
+
+
+def test_duplicate_replies_are_sent_once():
+    assert direct_reply([{"type": "chitchat"}, {"type": "chitchat"}], "thanks") == THANKS
+
+
+def test_retrieval_items_go_to_the_synthesizer():
+    query_types = [{"type": "chitchat", "reply": "Hello!"}, {"type": "menu", "parameters": {"search": "pizza"}}]
+    assert direct_reply(query_types, "hello, do you have pizza") is None
+    assert direct_reply([{"type": "info", "parameters": {"topic": "parking"}}], "parking?") is None
+    assert direct_reply([], "hello") is None
+
+
+def test_chitchat_without_a_reply_or_template_goes_to_the_synthesizer():
+    assert direct_reply([{"type": "chitchat"}], "tell me a joke") is None
+    assert direct_reply([{"type": "ambiguous", "clarification": ""}], "hmm") is None
+
+
+def test_direct_responder_returns_the_prepared_reply():
+    assert asyncio.run(direct_responder({"reply": "Hello!"})) == {"final_response": "Hello!"}
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from agent_service.utils.hedging import HedgedRunnable
+from agent_service.utils.metrics import metrics
+
+
+class FakeLLM:
+    """Answers after `delay` seconds, recording starts and cancellations."""
+
+    def __init__(self, answer, delay, error=None):
+        self.answer, self.delay, self.error = answer, delay, error
+        self.started = self.cancelled = 0
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+def _hedged(name, primary, backup, **kwargs):
+    kwargs = {"default_delay_ms": 20, "min_samples": 1000, **kwargs}
+    return HedgedRunnable(name, primary, backup, **kwargs)
+
+
+def _counter(name):
+    return metrics.counters.get(name, 0)
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = FakeLLM("primary", 0), FakeLLM("backup", 0)
+    hedged = _hedged("test_fast", primary, backup)
+    assert asyncio.run(hedged.ainvoke("q")) == "primary"
+    assert backup.started == 0
+    assert _counter("hedge.test_fast.calls") == 1 and _counter("hedge.test_fast.fired") == 0
+
+
+def test_hedge_fires_after_the_delay_and_the_loser_is_cancelled():
+    primary, backup = FakeLLM("primary", 1.0), FakeLLM("backup", 0.01)
+    hedged = _hedged("test_fire", primary, backup)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await hedged.ainvoke("q")
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "backup"
+    assert 0.015 <= elapsed < 0.5
+    assert primary.cancelled == 1 and backup.cancelled == 0
+    assert _counter("hedge.test_fire.fired") == 1 and _counter("hedge.test_fire.won") == 1
+
+
+def test_primary_finishing_first_after_the_hedge_is_not_a_win():
+    primary, backup = FakeLLM("primary", 0.04), FakeLLM("backup", 1.0)
+    hedged = _hedged("test_primary_wins", primary, backup)
+    assert asyncio.run(hedged.ainvoke("q")) == "primary"
+    assert backup.started == 1 and backup.cancelled == 1
+    assert _counter("hedge.test_primary_wins.fired") == 1 and _counter("hedge.test_primary_wins.won") == 0
+
+
+def test_a_failed_request_loses_to_one_still_running():
+    primary, backup = FakeLLM("primary", 0.05), FakeLLM(None, 0, error=RuntimeError("503"))
+    assert asyncio.run(_hedged("test_failed", primary, backup).ainvoke("q")) == "primary"
+
+    primary, backup = FakeLLM(None, 0.05, error=RuntimeError("503")), FakeLLM(None, 0, error=RuntimeError("429"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_hedged("test_both_failed", primary, backup).ainvoke("q"))
+
+
+def test_hedges_are_skipped_past_max_fraction():
+    primary, backup = FakeLLM("primary", 0.04), FakeLLM("backup", 0.001)
+    hedged = _hedged("test_skip", primary, backup, max_fraction=0.5)
+
+    async def run():
+        return [await hedged.ainvoke("q") for _ in range(3)]
+
+    # Hedged, then 1/1 recent calls were hedged so skipped, then 1/2 is still not below 0.5
+    assert asyncio.run(run()) == ["backup", "primary", "primary"]
+    assert backup.started == 1
+    assert _counter("hedge.test_skip.fired") == 1 and _counter("hedge.test_skip.skipped") == 2
+
+
+def test_caller_cancellation_cancels_both_requests():
+    primary, backup = FakeLLM("primary", 1.0), FakeLLM("backup", 1.0)
+    hedged = _hedged("test_cancel", primary, backup)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hedged.ainvoke("q"), timeout=0.05)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert primary.cancelled == 1 and backup.cancelled == 1
@@ -0,0 +1,78 @@
+import pytest
+from agent_service.utils.classification_cache import normalize_query
+from agent_service.utils.intent_router import (
+    IntentRouter, classify_by_rules, extract_info_topic, extract_menu_parameters,
+)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Do you have veg pizza under Rs 500?", {"type": "veg", "price_max": 500.0, "search": "pizza"}),
+    ("non-veg momo between 300 and 200", {"type": "non-veg", "price_min": 200.0, "price_max": 300.0, "search": "momo"}),
+    ("burgers above 400", {"price_min": 400.0, "search": "burgers"}),
+    ("what do you recommend?", {"search": "specials"}),
+    ("show me the menu please", {}),
+])
+def test_extract_menu_parameters(query, expected):
+    assert extract_menu_parameters(normalize_query(query)) == expected
+
+
+@pytest.mark.parametrize("query, topic", [
+    ("What time do you open on Saturday?", "opening hours"),
+    ("where are you located", "address"),
+    ("Can I pay with eSewa?", "payment options"),
+    ("is there parking", "parking"),
+    ("tell me about the chef", "tell me about the chef"),
+])
+def test_extract_info_topic(query, topic):
+    assert extract_info_topic(normalize_query(query)) == topic
+
+
+def _router(ranked, threshold=0.55, min_margin=0.08) -> IntentRouter:
+    router = IntentRouter(enabled=True, threshold=threshold, min_margin=min_margin)
+    router._centroids = object()  # skip loading the model
+    router.scores = lambda normalized: ranked
+    return router
+
+
+def test_routes_a_confident_single_intent():
+    routed = _router([("menu", 0.72), ("info", 0.40)]).route("veg pizza under 500", [])
+    [item] = routed.query_types
+    assert item.type == "menu"
+    assert item.parameters.search == "pizza" and item.parameters.price_max == 500
+
+
+@pytest.mark.parametrize("ranked", [
+    [("menu", 0.50), ("info", 0.20)],  # below the threshold
+    [("menu", 0.70), ("info", 0.65)],  # runner-up within the margin: probably both
+])
+def test_falls_back_when_unsure(ranked):
+    assert _router(ranked).route("veg pizza and opening hours", []) is None
+
+
+def test_falls_back_on_followups_and_menu_requests_without_parameters():
+    router = _router([("menu", 0.90), ("info", 0.10)])
+    history = [{"role": "assistant", "content": "We have three pizzas."}]
+    assert router.route("is it spicy", history) is None
+    assert router.route("show me the menu", []) is None
+
+
+def test_routed_chitchat_carries_its_reply():
+    router = _router([("chitchat", 0.90), ("menu", 0.10)])
+    [item] = router.route("Hello!", []).query_types
+    assert item.type == "chitchat" and item.reply.startswith("Hello!")
+    # No canned reply: the LLM answers it
+    assert router.route("tell me a joke", []) is None
+
+
+def test_disabled_router_never_routes():
+    router = IntentRouter(enabled=False)
+    assert router.route("veg pizza", []) is None
+
+
+def test_classify_by_rules():
+    [menu] = classify_by_rules("Any veg pizza under 500?").query_types
+    assert menu.type == "menu" and menu.parameters.type == "veg" and menu.parameters.price_max == 500
+    # A knowledge base topic wins over menu cues ("do you have parking")
+    [info] = classify_by_rules("Do you have parking?").query_types
+    assert info.type == "info" and info.parameters.topic == "parking"
+    assert classify_by_rules("what's the meaning of life") is None
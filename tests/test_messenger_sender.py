@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+import pytest
+from agent_service.utils import messenger_sender
+from agent_service.utils.messenger_sender import MessengerSender
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(messenger_sender, "SEND_BACKOFF_BASE_SECONDS", 0)
+
+
+def _sender(*outcomes):
+    """A sender whose Send API answers with `outcomes` in turn (a status code or an exception class)."""
+    requests = []
+
+    def handler(request):
+        outcome = outcomes[min(len(requests), len(outcomes) - 1)]
+        requests.append(request)
+        if isinstance(outcome, int):
+            return httpx.Response(outcome, json={})
+        raise outcome("boom", request=request)
+
+    sender = MessengerSender("token", base_url="https://graph.test", rate=1000, burst=1000, max_retries=3)
+    sender._client = httpx.AsyncClient(base_url="https://graph.test", transport=httpx.MockTransport(handler))
+    return sender, requests
+
+
+@pytest.mark.parametrize("outcomes, ok, attempts", [
+    ((200,), True, 1),
+    ((429, 503, 200), True, 3),
+    ((httpx.ConnectError, httpx.ConnectTimeout, 200), True, 3),
+    ((503,), False, 4),
+    # May already have been delivered: never sent twice
+    ((httpx.ReadTimeout, 200), False, 1),
+    ((httpx.RemoteProtocolError, 200), False, 1),
+    ((500, 200), False, 1),
+    ((504, 200), False, 1),
+    ((400,), False, 1),
+])
+def test_messages_are_retried_only_when_not_accepted(outcomes, ok, attempts):
+    sender, requests = _sender(*outcomes)
+    assert asyncio.run(sender.send_text("user-1", "Hello!")) is ok
+    assert len(requests) == attempts
+
+
+def test_sender_actions_retry_on_any_transient_failure():
+    sender, requests = _sender(httpx.ReadTimeout, 500, 200)
+    assert asyncio.run(sender.send_action("user-1", "typing_on"))
+    assert len(requests) == 3
@@ -0,0 +1,50 @@
+from agent_service.utils.sentence_chunker import MESSENGER_MAX_CHARS, SentenceChunker
+
+
+def _stream(chunker: SentenceChunker, text: str, step: int = 7):
+    chunks = []
+    for i in range(0, len(text), step):
+        chunks += chunker.feed(text[i:i + step])
+    return chunks + chunker.flush()
+
+
+def test_splits_at_sentence_boundaries_past_min_chars():
+    text = "We have three veg pizzas. The Margherita is Rs 650! Want the list? \"Sure.\" Here it is."
+    chunks = _stream(SentenceChunker(min_chars=30), text)
+    assert chunks == [
+        "We have three veg pizzas. The Margherita is Rs 650!",
+        "Want the list? \"Sure.\" Here it is.",
+    ]
+
+
+def test_newlines_are_boundaries():
+    chunks = _stream(SentenceChunker(min_chars=5), "Menu items\n- Margherita Pizza\n- Garden Veggie Pizza")
+    assert chunks == ["Menu items", "- Margherita Pizza", "- Garden Veggie Pizza"]
+
+
+def test_chunks_never_exceed_the_messenger_limit():
+    sentence = "This dish is made with fresh basil and tomatoes. "
+    text = sentence * 120
+    chunks = _stream(SentenceChunker(min_chars=MESSENGER_MAX_CHARS), text, step=50)
+    assert all(len(c) <= MESSENGER_MAX_CHARS for c in chunks)
+    # Split at the last sentence that fits, not mid-sentence
+    assert all(c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == text.strip()
+
+
+def test_text_without_boundaries_is_split_at_spaces_or_hard():
+    words = " ".join(["word"] * 600)
+    chunks = _stream(SentenceChunker(), words, step=100)
+    assert all(len(c) <= MESSENGER_MAX_CHARS for c in chunks)
+    assert " ".join(chunks) == words
+
+    blob = "x" * 4500
+    chunks = _stream(SentenceChunker(), blob, step=100)
+    assert [len(c) for c in chunks] == [2000, 2000, 500]
+
+
+def test_flush_returns_the_remainder_once():
+    chunker = SentenceChunker(min_chars=80)
+    assert chunker.feed("Short answer. No more") == []
+    assert chunker.flush() == ["Short answer. No more"]
+    assert chunker.flush() == []
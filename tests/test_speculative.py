@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from agent_service.utils import speculative
+from agent_service.utils.speculative import SpeculativeRetrieval
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fetch_menu_items(params, deadline=None):
+        calls.append(("menu", params))
+        return [{"name": "Chicken Momo"}]
+
+    async def search_knowledge(topic, deadline=None):
+        calls.append(("kb", topic))
+        return [{"content": "Open 10 AM to 10 PM."}]
+
+    monkeypatch.setattr(speculative, "fetch_menu_items", fetch_menu_items)
+    monkeypatch.setattr(speculative, "search_knowledge", search_knowledge)
+    return calls
+
+
+def _speculate(query):
+    async def run():
+        speculation = SpeculativeRetrieval(query)
+        await asyncio.sleep(0)
+        speculation.finish()
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What are your opening hours?", [("kb", "opening hours")]),
+    ("do you have parking", [("kb", "parking")]),
+    ("Do you have momo?", [("menu", {"search": "momo"})]),
+    ("veg dishes under 500", [("menu", {"price_max": 500.0, "type": "veg"})]),
+    ("hello", []),
+    ("tell me a joke", []),
+])
+def test_only_confident_guesses_are_fetched(calls, query, expected):
+    _speculate(query)
+    assert calls == expected
+
+
+def test_matching_parameters_take_the_result(calls):
+    async def run():
+        speculation = SpeculativeRetrieval("do you have momo")
+        taken = await speculation.take_menu({"search": "Momo", "type": None})
+        # Taken once only
+        assert await speculation.take_menu({"search": "momo"}) is None
+        speculation.finish()
+        return taken
+
+    assert asyncio.run(run()) == [{"name": "Chicken Momo"}]
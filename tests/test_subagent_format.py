@@ -0,0 +1,67 @@
+from agent_service.utils.history import estimate_tokens
+from agent_service.utils.subagent_format import serialize_subagent_outputs
+
+
+def _menu(names):
+    return {
+        "type": "menu",
+        "parameters": {"search": "pizza", "user_name": "Asha"},
+        "output": [{"name": name, "subcategory": "veg", "variations": [{"label": "Regular", "final_price": "650"}]}
+                   for name in names],
+    }
+
+
+def _info(contents):
+    return {"type": "info", "parameters": {"topic": "opening hours"},
+            "output": [{"topic": "hours", "content": c} for c in contents]}
+
+
+def test_everything_fits():
+    text, stats = serialize_subagent_outputs([_menu(["Margherita"]), _info(["Open 10 AM to 10 PM."])], 1000)
+    assert text == (
+        "Subagent: menu (search=pizza)\n- Margherita | veg | Rs 650\n\n"
+        "Subagent: info (topic=opening hours)\n- [hours] Open 10 AM to 10 PM."
+    )
+    assert stats == {"kept": 2, "truncated": 0, "dropped": 0}
+
+
+def test_lowest_ranked_results_of_each_subagent_are_dropped_first():
+    outputs = [_menu(["Menu One", "Menu Two", "Menu Three"]), _info(["Info one.", "Info two.", "Info three."])]
+    full, _ = serialize_subagent_outputs(outputs, 1000)
+    # Room for everything but the third result of each subagent
+    budget = sum(estimate_tokens(line) for line in full.split("\n") if line and "Three" not in line and "three" not in line)
+    text, stats = serialize_subagent_outputs(outputs, budget)
+
+    assert "Menu One" in text and "Menu Two" in text and "Menu Three" not in text
+    assert "Info one." in text and "Info two." in text and "Info three." not in text
+    assert text.count("- …1 more not shown") == 2
+    assert stats == {"kept": 4, "truncated": 0, "dropped": 2}
+
+
+def test_errors_survive_ahead_of_lower_ranked_results():
+    outputs = [_menu(["Margherita"] * 5), {"type": "info", "parameters": {"topic": "parking"}, "output": {"error": "timeout"}}]
+    budget = sum(estimate_tokens(line) for line in (
+        "Subagent: menu (search=pizza)", "Subagent: info (topic=parking)",
+        "- Margherita | veg | Rs 650", "- error: timeout",
+    ))
+    text, stats = serialize_subagent_outputs(outputs, budget + 3)
+
+    assert text == (
+        "Subagent: menu (search=pizza)\n- Margherita | veg | Rs 650\n- …4 more not shown\n\n"
+        "Subagent: info (topic=parking)\n- error: timeout"
+    )
+    assert stats == {"kept": 2, "truncated": 0, "dropped": 4}
+
+
+def test_headers_are_kept_even_over_budget():
+    text, stats = serialize_subagent_outputs([_menu(["Margherita"])], 1)
+    assert text == "Subagent: menu (search=pizza)\n- …1 more not shown"
+    assert stats == {"kept": 0, "truncated": 0, "dropped": 1}
+
+
+def test_a_first_result_that_does_not_fit_is_truncated():
+    long = "Open every day from 10 AM to 10 PM, including public holidays except Dashain. " * 4
+    text, stats = serialize_subagent_outputs([_info([long, "Second passage."])], 30)
+    line = text.split("\n")[1]
+    assert line.startswith("- [hours] Open every day") and len(line) < len(long)
+    assert stats == {"kept": 0, "truncated": 1, "dropped": 1}
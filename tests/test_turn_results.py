@@ -0,0 +1,64 @@
+import pytest
+from agent_service.utils.turn_results import refine_menu
+
+
+def _item(name, subcategory, price):
+    return {"name": name, "category_name": "Pizza", "subcategory": subcategory,
+            "variations": [{"label": "Regular", "final_price": str(price)}]}
+
+
+MARGHERITA = _item("Margherita Pizza", "veg", 650)
+CHICKEN = _item("Chicken Pizza", "non-veg", 800)
+VEGGIE = _item("Garden Veggie Pizza", "veg", 700)
+PREVIOUS = [{"type": "menu", "parameters": {"search": "pizza"}, "output": [MARGHERITA, CHICKEN, VEGGIE]}]
+
+
+@pytest.mark.parametrize("query", [
+    "do you have momo",
+    "which pizza is the cheapest",
+    "what did you show me first",
+])
+def test_queries_without_a_reference_go_to_the_backend(query):
+    assert refine_menu(query, {}, PREVIOUS) is None
+
+
+def test_no_previous_menu_results_go_to_the_backend():
+    assert refine_menu("which of those is veg", {"type": "veg"}, []) is None
+    assert refine_menu("which of those is veg", {"type": "veg"}, [{"type": "info", "output": [{}]}]) is None
+
+
+def test_type_filter():
+    assert refine_menu("which of those are veg?", {"type": "veg"}, PREVIOUS) == [MARGHERITA, VEGGIE]
+    assert refine_menu("any of them non-veg", {"type": "Non-Veg"}, PREVIOUS) == [CHICKEN]
+
+
+def test_price_filter_and_an_empty_answer():
+    assert refine_menu("which of those are under 700", {"price_max": 700}, PREVIOUS) == [MARGHERITA, VEGGIE]
+    # "None of those" is an answer, not a reason to ask the backend
+    assert refine_menu("any of those under 500", {"price_max": 500}, PREVIOUS) == []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("how much is the second one?", [CHICKEN]),
+    ("tell me about the last dish", [VEGGIE]),
+    ("is the 1st item spicy", [MARGHERITA]),
+])
+def test_ordinals(query, expected):
+    assert refine_menu(query, {}, PREVIOUS) == expected
+
+
+def test_ordinal_words_outside_a_reference_phrase_do_not_pick_an_item():
+    assert refine_menu("which of those did you show last", {}, PREVIOUS) == [MARGHERITA, CHICKEN, VEGGIE]
+
+
+def test_ordinals_index_the_filtered_items():
+    assert refine_menu("the second one that is veg", {"type": "veg"}, PREVIOUS) == [VEGGIE]
+    assert refine_menu("the last one under 700", {"price_max": 700}, PREVIOUS) == [VEGGIE]
+    # Past the end of the filtered list
+    assert refine_menu("the third one that is veg", {"type": "veg"}, PREVIOUS) is None
+    assert refine_menu("the last one under 500", {"price_max": 500}, PREVIOUS) is None
+
+
+def test_searching_for_something_else_only_counts_if_it_matches():
+    assert refine_menu("which of those have chicken", {"search": "chicken"}, PREVIOUS) == [CHICKEN]
+    assert refine_menu("any of those with momo", {"search": "momo"}, PREVIOUS) is None
@@ -0,0 +1,79 @@
+import asyncio
+import random
+from agent_service.utils.worker_pool import KeyedWorkerPool
+
+
+def test_jobs_for_a_key_run_in_submission_order():
+    async def run():
+        seen = {}
+        running, peak = set(), 0
+
+        async def handler(key, item):
+            nonlocal peak
+            assert key not in running, "two jobs of one key ran at the same time"
+            running.add(key)
+            peak = max(peak, len(running))
+            await asyncio.sleep(random.uniform(0, 0.005))
+            seen.setdefault(key, []).append(item)
+            running.discard(key)
+
+        pool = KeyedWorkerPool(handler, workers=4, name="test_order")
+        await pool.start()
+        for i in range(20):
+            for key in ("a", "b", "c"):
+                assert pool.submit(key, i)
+        await pool.stop()
+        return seen, peak
+
+    seen, peak = asyncio.run(run())
+    assert seen == {key: list(range(20)) for key in ("a", "b", "c")}
+    # Different keys still run in parallel
+    assert peak > 1
+
+
+def test_submit_is_bounded_by_max_pending():
+    async def run():
+        release = asyncio.Event()
+        done = []
+
+        async def handler(key, item):
+            await release.wait()
+            done.append(item)
+
+        pool = KeyedWorkerPool(handler, workers=1, max_pending=2, name="test_bound")
+        await pool.start()
+        assert pool.submit("a", 1)
+        await asyncio.sleep(0)  # the worker takes job 1 off the queue
+        assert pool.submit("a", 2) and pool.submit("b", 3)
+        assert pool.is_full
+        assert not pool.submit("c", 4)
+        # Already-accepted work can bypass the bound
+        assert pool.submit("c", 5, force=True)
+        assert pool.stats()["queue_depth"] == 3
+
+        release.set()
+        await pool.stop()
+        return done, pool.stats()
+
+    done, stats = asyncio.run(run())
+    assert sorted(done) == [1, 2, 3, 5]
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_a_failing_job_does_not_stop_the_key():
+    async def run():
+        done = []
+
+        async def handler(key, item):
+            if item == 1:
+                raise RuntimeError("boom")
+            done.append(item)
+
+        pool = KeyedWorkerPool(handler, workers=2, name="test_failure")
+        await pool.start()
+        for i in range(3):
+            pool.submit("a", i)
+        await pool.stop()
+        return done
+
+    assert asyncio.run(run()) == [0, 2]